@@ -28,6 +28,15 @@ __version__ = os.environ.get("APP_VERSION", _read_version())
 __author__ = "Doalou"
 __license__ = "MIT"
 
-from .services.main import create_app
-
 __all__ = ["create_app"]
+
+
+def __getattr__(name: str):
+    # Import paresseux : les processus du pool d'encodage (démarrés en
+    # `spawn`) importent `app.services.media_converter.imaging` sans
+    # charger Flask, les blueprints ni yt-dlp.
+    if name == "create_app":
+        from .services.main import create_app
+
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,125 @@
+"""Annulation coopérative des traitements longs (FFmpeg, yt-dlp).
+
+Un `CancelToken` est levé par `TaskManager.cancel_task` (annulation
+demandée par le client) ou, sur une route synchrone, par la fermeture de
+la connexion du client (`disconnect_token`). Le code qui travaille le
+consulte régulièrement :
+
+- `run_ffmpeg` tue FFmpeg et tout son groupe de processus ;
+- les hooks de progression yt-dlp lèvent `Cancelled`, ce qui interrompt
+  le téléchargement en cours ;
+
+puis l'appelant supprime ses fichiers temporaires, comme pour un échec.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import signal
+import socket
+import ssl
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+# Écart minimal entre deux sondages du socket client.
+DISCONNECT_PROBE_SECONDS = 1.0
+
+
+class Cancelled(Exception):
+    """Traitement interrompu : annulation demandée ou client parti."""
+
+
+class CancelToken:
+    def __init__(
+        self,
+        probe: Optional[Callable[[], bool]] = None,
+        probe_interval: float = DISCONNECT_PROBE_SECONDS,
+    ):
+        self._event = threading.Event()
+        # Sonde facultative (client déconnecté ?), appelée au plus une fois
+        # par `probe_interval`.
+        self._probe = probe
+        self._probe_interval = probe_interval
+        self._probed_at = 0.0
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._probe is not None:
+            now = time.monotonic()
+            if now - self._probed_at >= self._probe_interval:
+                self._probed_at = now
+                if self._probe():
+                    self._event.set()
+        return self._event.is_set()
+
+    def raise_if_cancelled(self, message: str = "Traitement annulé.") -> None:
+        if self.cancelled:
+            raise Cancelled(message)
+
+
+def _client_socket(environ: Mapping[str, Any]) -> Optional[socket.socket]:
+    # gunicorn (sync / gthread) et le serveur de dev Werkzeug exposent le
+    # socket de la connexion.
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if not isinstance(sock, socket.socket) or isinstance(sock, ssl.SSLSocket):
+        return None
+    return sock
+
+
+def _readable(sock: socket.socket) -> bool:
+    # `poll` plutôt que `select` : ce dernier refuse les descripteurs
+    # >= FD_SETSIZE (1024), courants sur un worker chargé.
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        return bool(poller.poll(0))
+    readable, _, _ = select.select([sock], [], [], 0)
+    return bool(readable)
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    """Vrai si le client a fermé la connexion (lecture possible, 0 octet)
+    ou l'a réinitialisée. Le corps de la requête est déjà lu : des octets
+    en attente seraient une requête suivante (keep-alive), pas une
+    fermeture. Toute autre erreur de sondage laisse la requête continuer."""
+    try:
+        return _readable(sock) and sock.recv(1, socket.MSG_PEEK) == b""
+    except ConnectionError:
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def disconnect_token(environ: Mapping[str, Any]) -> CancelToken:
+    """Jeton levé quand le client de la requête courante se déconnecte.
+    Sans socket accessible (TLS terminé par gunicorn...), jamais levé."""
+    sock = _client_socket(environ)
+    return CancelToken(probe=None if sock is None else lambda: _peer_closed(sock))
+
+
+def process_group_kwargs() -> Dict[str, Any]:
+    """Arguments `Popen` qui isolent le processus dans son propre groupe,
+    pour pouvoir tuer aussi ses enfants (`kill_process_group`)."""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_group(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
@@ -0,0 +1,133 @@
+"""Pool de processus pour le travail CPU (encodage d'images Pillow).
+
+Dans un worker gunicorn, un encodage PNG `optimize` ou WebP lent garde le
+GIL une bonne partie du temps et ralentit les threads qui servent les
+requêtes. `CpuPool` l'envoie dans un `ProcessPoolExecutor` :
+
+- démarrage `spawn` (jamais `fork` d'un processus qui a des threads et
+  des verrous en cours) ; les processus n'importent que le module de la
+  fonction appelée, qui doit rester léger (pas Flask ni l'application :
+  `app/__init__.py` n'importe `create_app` qu'à la demande) ;
+- pré-chauffé : `warm()` lance les processus et leur `initializer`
+  (plugins Pillow) avant la première tâche ;
+- les appels passent des chemins de fichiers, pas des octets : rien de
+  volumineux n'est sérialisé entre processus ;
+- `workers = 0` : pas de processus, l'appel s'exécute dans le thread
+  appelant (comportement historique).
+
+Un appel annulé (`CancelToken`) n'est plus attendu ; s'il tournait
+déjà, le processus va au bout et les fichiers `outputs` sont supprimés
+à la fin. Un processus mort (OOM) casse le pool : il est recréé au
+prochain appel.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.core.cancellation import Cancelled, CancelToken
+from app.core.metrics import LatencyStats
+
+# Intervalle de vérification du jeton d'annulation pendant l'attente.
+CANCEL_POLL_SECONDS = 0.2
+
+
+def _noop() -> None:
+    pass
+
+
+def _remove(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class CpuPool:
+    def __init__(self, workers: int, initializer: Optional[Callable[[], None]] = None):
+        self.workers = max(0, workers)
+        self._initializer = initializer
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats = {"submitted": 0, "inline": 0, "cancelled": 0, "broken": 0}
+        self._run_stats = LatencyStats()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self._initializer,
+                )
+            return self._executor
+
+    def warm(self) -> None:
+        """Démarre les processus (et leur initialiseur) sans attendre."""
+        if not self.workers:
+            return
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_noop)
+
+    def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        cancel: Optional[CancelToken] = None,
+        outputs: Iterable[str] = (),
+    ) -> Any:
+        """`fn(*args)` dans un processus du pool ; lève `Cancelled` si
+        `cancel` est levé avant la fin. `fn` et `args` doivent être
+        sérialisables (fonction de module, chemins, options)."""
+        if not self.workers:
+            with self._lock:
+                self._stats["inline"] += 1
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            return fn(*args)
+
+        executor = self._get_executor()
+        with self._lock:
+            self._stats["submitted"] += 1
+        started = time.monotonic()
+        future = executor.submit(fn, *args)
+        try:
+            while not wait([future], timeout=CANCEL_POLL_SECONDS)[0]:
+                if cancel is not None and cancel.cancelled:
+                    future.cancel()
+                    discard = list(outputs)
+                    future.add_done_callback(lambda _f: _remove(discard))
+                    with self._lock:
+                        self._stats["cancelled"] += 1
+                    raise Cancelled("Traitement annulé.")
+            result = future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._stats["broken"] += 1
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        # Durée vue par l'appelant, attente d'un processus libre comprise.
+        self._run_stats.add(time.monotonic() - started)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"workers": self.workers, **self._stats}
+        stats["run"] = self._run_stats.as_dict()
+        return stats
@@ -0,0 +1,173 @@
+"""Livraison des fichiers produits (conversions, téléchargements).
+
+Un fichier publié est déplacé sous `TEMP_FOLDER/deliveries` et reste
+disponible `DELIVERY_TTL_SECONDS` derrière un jeton signé
+(`itsdangerous`, clé = `SECRET_KEY`) : pas d'état partagé entre workers
+gunicorn, le jeton porte le nom du fichier et expire tout seul. Le
+fichier n'est plus supprimé pendant qu'il est envoyé, ce qui autorise
+les reprises (`Range`) et les requêtes conditionnelles (`ETag`).
+
+Derrière un nginx, `DELIVERY_ACCEL_PREFIX` (location `internal` pointant
+sur `TEMP_FOLDER`) fait envoyer le corps par nginx via `X-Accel-Redirect`
+(sendfile noyau) ; `USE_X_SENDFILE=1` fait de même pour Apache/lighttpd.
+Le worker Python ne pousse alors plus aucun octet.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import Response, current_app, send_file
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from app.core.filecache import _link_or_copy
+
+_SALT = "toolbox-delivery"
+# Fréquence max du balayage des fichiers expirés (déclenché à la publication).
+SWEEP_INTERVAL_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Delivery:
+    token: str
+    path: str
+    download_name: str
+    mimetype: Optional[str] = None
+
+
+def _published_at(st: os.stat_result) -> float:
+    """Date de publication d'une livraison. Le ctime couvre les liens durs
+    vers une entrée de cache plus ancienne (mtime non rafraîchi) : créer
+    le lien, renommer le fichier ou supprimer l'entrée le met à jour."""
+    return max(st.st_mtime, st.st_ctime)
+
+
+def _attachment_response(
+    path: str, download_name: str, mimetype: Optional[str]
+) -> Response:
+    """Réponse de fichier : X-Accel-Redirect si configuré, sinon `send_file`
+    (Range / ETag / If-None-Match gérés par Werkzeug, X-Sendfile par Flask
+    si `USE_X_SENDFILE`)."""
+    accel_prefix = current_app.config.get("DELIVERY_ACCEL_PREFIX")
+    temp_root = current_app.config["TEMP_FOLDER"]
+    relative = os.path.relpath(path, temp_root)
+    if accel_prefix and not relative.startswith(".."):
+        guessed = mimetypes.guess_type(download_name)[0]
+        response = Response(mimetype=mimetype or guessed or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = (
+            accel_prefix.rstrip("/") + "/" + relative.replace(os.sep, "/")
+        )
+        response.headers[
+            "Content-Disposition"
+        ] = f'attachment; filename="{download_name}"'
+        return response
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True,
+        max_age=0,
+    )
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+def send_produced_file(
+    path: str, download_name: str, mimetype: Optional[str] = None
+) -> Response:
+    """Envoie un fichier de `TEMP_FOLDER` avec le même mode de livraison
+    que les jetons (résultats de jobs notamment)."""
+    return _attachment_response(path, download_name, mimetype)
+
+
+class DeliveryStore:
+    def __init__(self, root: str, ttl_seconds: int):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _serializer(self) -> URLSafeTimedSerializer:
+        return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=_SALT)
+
+    def publish(
+        self,
+        src_path: str,
+        download_name: str,
+        mimetype: Optional[str] = None,
+        *,
+        keep_source: bool = False,
+    ) -> Delivery:
+        """Publie `src_path` (déplacé, ou lié si `keep_source`) et retourne
+        la livraison avec son jeton."""
+        os.makedirs(self.root, exist_ok=True)
+        self.sweep()
+        ext = os.path.splitext(download_name)[1]
+        name = f"{uuid.uuid4().hex}{ext}"
+        dest = os.path.join(self.root, name)
+        if keep_source:
+            _link_or_copy(src_path, dest)
+        else:
+            try:
+                os.replace(src_path, dest)
+            except OSError:
+                shutil.move(src_path, dest)
+        # L'âge d'une livraison se mesure à partir de sa publication
+        # (`_published_at`). Un fichier partagé par lien dur avec une
+        # entrée de cache garde son mtime : c'est l'âge de cette entrée,
+        # que le cache compare à son TTL. Le lien ou le renommage a mis
+        # son ctime à jour.
+        if os.stat(dest).st_nlink == 1:
+            os.utime(dest)
+        token = self._serializer().dumps({"f": name, "n": download_name, "m": mimetype})
+        return Delivery(token, dest, download_name, mimetype)
+
+    def resolve(self, token: str) -> Optional[Delivery]:
+        try:
+            data = self._serializer().loads(token, max_age=self.ttl_seconds)
+        except BadSignature:  # inclut SignatureExpired
+            return None
+        name = os.path.basename(str(data.get("f", "")))
+        path = os.path.join(self.root, name)
+        if not name or not os.path.isfile(path):
+            return None
+        return Delivery(token, path, data.get("n") or name, data.get("m"))
+
+    def send(self, delivery: Delivery) -> Response:
+        return _attachment_response(
+            delivery.path, delivery.download_name, delivery.mimetype
+        )
+
+    def sweep(self, force: bool = False) -> int:
+        """Supprime les fichiers plus vieux que le TTL. Retourne leur nombre."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+                return 0
+            self._last_sweep = now
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if (
+                    entry.is_file()
+                    and now - _published_at(entry.stat()) > self.ttl_seconds
+                ):
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
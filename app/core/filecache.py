@@ -0,0 +1,218 @@
+"""Cache disque adressé par contenu, avec budget LRU en octets.
+
+Les entrées sont des fichiers nommés par leur clé (sha256 hex) sous
+`root/<2 premiers caractères>/<clé>`. L'insertion se fait par lien dur
+quand c'est possible (même système de fichiers que `TEMP_FOLDER`) : pas
+de copie, et le fichier de l'appelant reste indépendant de l'éviction.
+
+L'index LRU est en mémoire, par processus, mais plusieurs workers
+gunicorn partagent le même dossier : avant d'évincer, chaque insertion
+relit le dossier (tailles et mtime), si bien que `max_bytes` borne le
+dossier entier et non la part de chaque worker. Un fichier évincé par un
+autre worker est simplement compté comme un miss (`get()` vérifie la
+présence sur disque).
+
+Avec `max_age_seconds`, une entrée expire à âge fixe depuis son insertion
+(le mtime n'est alors plus rafraîchi par les hits) : utile quand le
+contenu source peut changer (vidéo remplacée sur la plateforme).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def cache_key(digest: str, **params: Any) -> str:
+    """Clé stable pour (empreinte de l'entrée, paramètres de traitement)."""
+    material = json.dumps({"input": digest, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: str, dest: str) -> None:
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class DiskLRUCache:
+    def __init__(
+        self, root: str, max_bytes: int, max_age_seconds: Optional[int] = None
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _load(self) -> None:
+        with self._lock:
+            self._rescan_locked()
+            self._evict_locked()
+
+    def _rescan_locked(self, newest: Optional[str] = None) -> None:
+        """Reconstruit l'index depuis le disque (ordre LRU = mtime), entrées
+        des autres workers comprises. À mtime égal (horloge du noyau à
+        quelques ms), l'ordre de l'index local départage. `newest` reste en
+        tête : un lien dur garde le mtime, parfois ancien, du fichier de
+        l'appelant."""
+        rank = {key: position for position, key in enumerate(self._index)}
+        entries = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, rank.get(name, -1), name, st.st_size))
+        self._index.clear()
+        self._bytes = 0
+        for _mtime, _rank, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        if newest in self._index:
+            self._index.move_to_end(newest)
+
+    def _expired(self, st: os.stat_result) -> bool:
+        return (
+            self.max_age_seconds is not None
+            and time.time() - st.st_mtime > self.max_age_seconds
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Chemin du fichier en cache (et rafraîchit son rang LRU), ou None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and self._expired(st):
+                self._stats["expirations"] += 1
+                self._remove_locked(key)
+                st = None
+            if st is not None:
+                if key not in self._index:
+                    self._index[key] = st.st_size
+                    self._bytes += st.st_size
+                self._index.move_to_end(key)
+                self._stats["hits"] += 1
+                if self.max_age_seconds is None:
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                return path
+            self._forget_locked(key)
+            self._stats["misses"] += 1
+            return None
+
+    def copy_to(self, key: str, dest: str) -> bool:
+        """Matérialise l'entrée `key` en `dest` (lien dur si possible)."""
+        path = self.get(key)
+        if path is None:
+            return False
+        try:
+            _link_or_copy(path, dest)
+        except OSError:
+            return False  # évincée entre-temps par un autre worker
+        return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def put(self, key: str, src_path: str) -> None:
+        """Insère une copie de `src_path` (le fichier source reste intact)."""
+        if not self.enabled:
+            return
+        self._store(key, lambda tmp: _link_or_copy(src_path, tmp))
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        if not self.enabled:
+            return
+
+        def _write(tmp: str) -> None:
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+
+        self._store(key, _write)
+
+    def _store(self, key: str, writer) -> None:
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            writer(tmp)
+            os.replace(tmp, dest)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            self._rescan_locked(newest=key)
+            self._evict_locked()
+
+    def _forget_locked(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _remove_locked(self, key: str) -> None:
+        self._forget_locked(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._stats["evictions"] += 1
+            self._remove_locked(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3)
+                if lookups
+                else 0.0,
+            }
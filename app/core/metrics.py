@@ -0,0 +1,43 @@
+"""Compteurs de latence légers (stdlib only).
+
+Pas de Prometheus ici : les métriques sont exposées en JSON par les
+blueprints (`/media/metrics`, ...) et servent surtout à dimensionner les
+pools de workers. Chaque instance est thread-safe et ne garde que des
+agrégats (pas d'historique), donc coût mémoire constant.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+
+class LatencyStats:
+    """Agrégats count / moyenne / max / dernière valeur, en secondes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Snapshot en millisecondes (arrondi, prêt pour `jsonify`)."""
+        with self._lock:
+            avg = self.total / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "avg_ms": round(avg * 1000, 1),
+                "max_ms": round(self.max * 1000, 1),
+                "last_ms": round(self.last * 1000, 1),
+            }
@@ -31,3 +31,8 @@ limiter = Limiter(
     strategy="fixed-window",
     swallow_errors=True,
 )
+
+
+def client_key() -> str:
+    """Clé du client de la requête courante, celle des limites (IP)."""
+    return get_remote_address()
@@ -0,0 +1,91 @@
+"""Sémaphore partagé entre les workers gunicorn (verrous de fichiers).
+
+Chaque worker a son propre pool de jobs : avec 4 workers et
+`MEDIA_JOB_WORKERS=2`, huit encodages FFmpeg pourraient tourner en même
+temps sur un conteneur limité à 0.75 CPU. `ProcessSlots` borne le total
+pour tout le conteneur : `slots` fichiers sous un dossier commun, un
+encodage tient un verrou `flock` exclusif sur l'un d'eux.
+
+Le verrou appartient au descripteur ouvert : il est libéré à la
+fermeture, y compris si le worker meurt (OOM, timeout gunicorn). Sans
+`fcntl` (Windows), ou avec `slots = 0`, aucune limite.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.cancellation import Cancelled, CancelToken
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Intervalle entre deux tentatives quand tous les slots sont pris.
+SLOT_POLL_SECONDS = 0.2
+
+
+class ProcessSlots:
+    def __init__(self, directory: str, slots: int):
+        self.directory = directory
+        self.slots = max(0, slots)
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "waiting": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.slots > 0 and fcntl is not None
+
+    def _try_lock(self) -> Optional[int]:
+        os.makedirs(self.directory, exist_ok=True)
+        for index in range(self.slots):
+            fd = os.open(
+                os.path.join(self.directory, f"slot-{index}.lock"),
+                os.O_RDWR | os.O_CREAT,
+                0o644,
+            )
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    @contextmanager
+    def acquire(self, cancel: Optional[CancelToken] = None) -> Iterator[None]:
+        """Attend un slot libre (tous workers confondus) et le garde le
+        temps du bloc. Lève `Cancelled` si `cancel` est levé pendant
+        l'attente."""
+        if not self.enabled:
+            yield
+            return
+        fd = self._try_lock()
+        if fd is None:
+            with self._lock:
+                self._stats["waited"] += 1
+                self._stats["waiting"] += 1
+            try:
+                while fd is None:
+                    if cancel is not None and cancel.cancelled:
+                        raise Cancelled()
+                    time.sleep(SLOT_POLL_SECONDS)
+                    fd = self._try_lock()
+            finally:
+                with self._lock:
+                    self._stats["waiting"] -= 1
+        with self._lock:
+            self._stats["acquired"] += 1
+        try:
+            yield
+        finally:
+            os.close(fd)  # libère le verrou
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"slots": self.slots if self.enabled else 0, **self._stats}
@@ -14,18 +14,31 @@ Les checks effectués :
 Volontairement sans dépendance externe : `python-magic` / `filetype`
 introduisent libmagic (binaire C) pour un bénéfice marginal sur notre
 whitelist très étroite.
+
+Pour les vues marquées `@spool_to_disk`, `DiskSpoolRequest` écrit l'upload
+directement dans `TEMP_FOLDER` pendant le parsing multipart (`DiskUpload`) :
+magic bytes vérifiés dès le premier morceau, taille plafonnée au fil de
+l'eau, sha256 calculé en passant. `save_upload` n'a plus qu'à renommer le
+fichier à sa place définitive (même système de fichiers, pas de copie).
 """
 
 from __future__ import annotations
 
-from typing import Dict, Iterable, Optional, Set
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
 
+from flask import Request, current_app
 from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 
 MAX_BATCH_FILES: int = 20
 MAX_BATCH_BYTES: int = 200 * 1024 * 1024  # 200 MB cumulés
 MAX_UPLOAD_BYTES: int = 512 * 1024 * 1024  # 512 MB par fichier
 MAGIC_SNIFF_BYTES: int = 32
+COPY_CHUNK_BYTES: int = 1024 * 1024
 
 _SIGNATURES: Dict[str, tuple[bytes, ...]] = {
     "jpg":  (b"\xff\xd8\xff",),
@@ -170,6 +183,131 @@ def validate_batch(
     return validated
 
 
+class DiskUpload:
+    """Conteneur d'upload écrit directement sur disque par le parser multipart.
+
+    Les erreurs sont levées en `HTTPException` (400 / 413) : le parser de
+    Werkzeug avale les `ValueError` (et donc `UploadRejected`), mais laisse
+    passer celles-ci, qui interrompent la lecture du corps de la requête.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        filename: str,
+        allowed_extensions: Iterable[str],
+        *,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+    ):
+        self._ext = _ext(filename)
+        if self._ext not in set(allowed_extensions):
+            raise BadRequest(f"Extension non autorisée : .{self._ext or '(aucune)'}")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"upload_{uuid.uuid4().hex}.part")
+        self._fh = open(self.path, "w+b")
+        self._hasher = hashlib.sha256()
+        self._head = b""
+        self._max_bytes = max_bytes
+        self._claimed = False
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self._max_bytes:
+            self.close()
+            raise RequestEntityTooLarge(
+                f"Fichier trop volumineux (max {self._max_bytes / 1024 / 1024:.0f} MB)."
+            )
+        if len(self._head) < MAGIC_SNIFF_BYTES:
+            self._head += data[: MAGIC_SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= MAGIC_SNIFF_BYTES and not _signature_matches(
+                self._ext, self._head
+            ):
+                self.close()
+                raise BadRequest(
+                    f"Le contenu du fichier ne correspond pas à l'extension "
+                    f".{self._ext} (magic bytes invalides)."
+                )
+        self._hasher.update(data)
+        return self._fh.write(data)
+
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    def claim(self, dest_path: str) -> str:
+        """Déplace le fichier en `dest_path` et retourne son sha256."""
+        self._fh.close()
+        try:
+            os.replace(self.path, dest_path)
+        except OSError:
+            shutil.move(self.path, dest_path)  # autre système de fichiers
+        self._claimed = True
+        return self.sha256()
+
+    def close(self) -> None:
+        self._fh.close()
+        if not self._claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read / seek / tell / readline… : délégués au fichier sous-jacent.
+        return getattr(self._fh, name)
+
+
+def spool_to_disk(view):
+    """Marque une vue dont les uploads vont directement dans `TEMP_FOLDER`."""
+    view.spool_uploads_to_disk = True
+    return view
+
+
+class DiskSpoolRequest(Request):
+    """Requête Flask dont les uploads des vues `@spool_to_disk` sont des
+    `DiskUpload` (les autres gardent le comportement de Werkzeug)."""
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        if filename and getattr(view, "spool_uploads_to_disk", False):
+            upload = DiskUpload(
+                current_app.config["TEMP_FOLDER"],
+                filename,
+                current_app.config["ALLOWED_MEDIA_EXTENSIONS"],
+            )
+            self.__dict__.setdefault("_disk_uploads", []).append(upload)
+            return upload
+        return super()._get_file_stream(
+            total_content_length, content_type, filename, content_length
+        )
+
+    def close(self) -> None:
+        super().close()
+        # Uploads jamais réclamés (requête rejetée, client déconnecté en
+        # plein envoi) : le fichier partiel est supprimé.
+        uploads: List[DiskUpload] = self.__dict__.get("_disk_uploads", [])
+        for upload in uploads:
+            upload.close()
+
+
+def save_upload(file: FileStorage, dest_path: str) -> str:
+    """Écrit l'upload sur disque et retourne son sha256 (hex).
+
+    L'empreinte est calculée pendant la copie, sans relire le fichier :
+    elle sert de clé au cache de conversions. Un `DiskUpload` est
+    simplement renommé.
+    """
+    if isinstance(file.stream, DiskUpload):
+        return file.stream.claim(dest_path)
+
+    hasher = hashlib.sha256()
+    file.stream.seek(0)
+    with open(dest_path, "wb") as out:
+        for chunk in iter(lambda: file.stream.read(COPY_CHUNK_BYTES), b""):
+            hasher.update(chunk)
+            out.write(chunk)
+    return hasher.hexdigest()
+
+
 def configure_pillow_limits(max_pixels: Optional[int] = 50_000_000) -> None:
     """Plafonne la taille d'image décompressée par Pillow (anti-zip-bomb).
 
@@ -0,0 +1,96 @@
+"""Écriture d'archives ZIP en flux (stdlib only).
+
+`zipfile` sait écrire vers une sortie non seekable : il bascule alors sur
+des *data descriptors* (taille et CRC écrits après les données de chaque
+entrée). On lui donne un puits qui accumule les octets produits, vidé
+après chaque entrée : la réponse HTTP part au fil de l'eau et la mémoire
+reste bornée par une entrée, pas par l'archive entière.
+
+Une entrée peut aussi être un fichier sur disque (chemin) : il est alors
+recopié par morceaux et la mémoire reste bornée par `FILE_CHUNK_SIZE`,
+même pour une vidéo de plusieurs centaines de Mo.
+"""
+
+from __future__ import annotations
+
+import zipfile
+from typing import Iterable, Iterator, List, Tuple, Union
+
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """Sortie non seekable (pas de `tell`/`seek`) pour `zipfile.ZipFile`."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamWriter:
+    """Archive construite entrée par entrée ; chaque appel renvoie les
+    octets à transmettre au client."""
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        return self._sink.drain()
+
+    def add_file(self, name: str, path: str) -> Iterator[bytes]:
+        """Ajoute le fichier `path` sous `name`, morceau par morceau."""
+        info = zipfile.ZipInfo.from_file(path, name)
+        info.compress_type = self._zip.compression
+        with open(path, "rb") as src, self._zip.open(info, "w") as dest:
+            while True:
+                data = src.read(FILE_CHUNK_SIZE)
+                if not data:
+                    break
+                dest.write(data)
+                chunk = self._sink.drain()
+                if chunk:
+                    yield chunk
+        chunk = self._sink.drain()
+        if chunk:
+            yield chunk
+
+    def close(self) -> bytes:
+        """Écrit le répertoire central (fin d'archive)."""
+        self._zip.close()
+        return self._sink.drain()
+
+
+def stream_zip(
+    entries: Iterable[Tuple[str, Union[bytes, str]]],
+    compression: int = zipfile.ZIP_STORED,
+) -> Iterator[bytes]:
+    """Générateur de morceaux d'archive pour une réponse Flask en flux.
+
+    Chaque entrée est `(nom, octets)` ou `(nom, chemin)` d'un fichier à
+    recopier par morceaux. Par défaut les entrées sont stockées sans
+    compression : les images et vidéos converties sont déjà compressées,
+    DEFLATE ne ferait que coûter du CPU.
+    """
+    writer = ZipStreamWriter(compression)
+    for name, data in entries:
+        if isinstance(data, str):
+            yield from writer.add_file(name, data)
+            continue
+        chunk = writer.add(name, data)
+        if chunk:
+            yield chunk
+    yield writer.close()
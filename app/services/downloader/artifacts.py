@@ -0,0 +1,174 @@
+"""Cache des fichiers téléchargés, partagé entre requêtes.
+
+Deux utilisateurs qui téléchargent la même vidéo au même format ne
+déclenchent qu'un seul téléchargement yt-dlp :
+
+- clé = `(plateforme:id canonique, format, qualité)` ;
+- stockage dans un `DiskLRUCache` sous `uploads/temp/downloads`, budget
+  en octets (`DOWNLOADER_CACHE_MAX_BYTES`) et âge maximal
+  (`DOWNLOADER_CACHE_TTL_SECONDS`) ;
+- le nom de fichier proposé et le mimetype sont rangés dans une petite
+  entrée JSON du même cache ;
+- une requête qui arrive pendant qu'un téléchargement identique est en
+  cours s'y rattache (*single-flight*, par worker gunicorn) au lieu d'en
+  lancer un second.
+
+Chaque appelant reçoit sa propre copie (lien dur) dans son dossier de
+travail : une éviction pendant l'envoi ne coupe rien.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.filecache import DiskLRUCache, cache_key
+
+# Intervalle de rafraîchissement d'une requête rattachée (`on_wait`).
+ATTACH_POLL_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class Artifact:
+    path: str
+    download_name: str
+    mimetype: Optional[str] = None
+
+
+def artifact_key(video_key: str, format_type: str, quality: str) -> str:
+    # L'audio ignore la qualité vidéo : une seule entrée par vidéo.
+    if format_type == "audio":
+        quality = "-"
+    return cache_key(video_key, format=format_type, quality=quality)
+
+
+class _Flight:
+    def __init__(self, owner: Any) -> None:
+        self.owner = owner
+        self.done = threading.Event()
+
+
+class ArtifactCache:
+    def __init__(self, root: str, max_bytes: int, ttl_seconds: int):
+        self.files = DiskLRUCache(root, max_bytes, max_age_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"hits": 0, "misses": 0, "attached": 0}
+
+    def _meta_key(self, key: str) -> str:
+        return cache_key(key, part="meta")
+
+    def contains(self, key: str) -> bool:
+        """Vrai si le fichier de `key` est en cache. Des métadonnées restées
+        seules (fichier évincé, ici ou par un autre worker) sont supprimées."""
+        meta_key = self._meta_key(key)
+        if self.files.get(meta_key) is None:
+            return False
+        if self.files.get(key) is not None:
+            return True
+        self.files.discard(meta_key)
+        return False
+
+    def lookup(self, key: str, workdir: str) -> Optional[Artifact]:
+        """Copie privée de l'entrée `key` dans `workdir`, ou None."""
+        meta_path = self.files.get(self._meta_key(key))
+        if meta_path is None:
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        name = os.path.basename(meta.get("n") or "")
+        if not name:
+            return None
+        dest = os.path.join(workdir, name)
+        if not self.files.copy_to(key, dest):
+            return None
+        return Artifact(dest, name, meta.get("m"))
+
+    def store(self, key: str, artifact: Artifact) -> None:
+        self.files.put(key, artifact.path)
+        self.files.put_bytes(
+            self._meta_key(key),
+            json.dumps({"n": artifact.download_name, "m": artifact.mimetype}).encode(
+                "utf-8"
+            ),
+        )
+
+    def fetch(
+        self,
+        key: str,
+        workdir: str,
+        produce: Callable[[], Artifact],
+        *,
+        owner: Any = None,
+        on_wait: Optional[Callable[[Any], None]] = None,
+    ) -> Tuple[Artifact, str]:
+        """Retourne `(artefact, origine)`, origine ∈ `hit | attached | miss`.
+
+        `produce` télécharge dans `workdir`. Pendant qu'il tourne, les
+        appels concurrents sur la même clé attendent et reçoivent `on_wait(owner)`
+        toutes les `ATTACH_POLL_SECONDS` (`owner` = ce que le premier appelant
+        a passé, typiquement sa tâche, pour recopier sa progression). Si le
+        premier échoue, ou si son fichier n'a pas pu être mis en cache (trop
+        gros pour le budget), chacun retente pour son compte.
+        """
+        artifact = self.lookup(key, workdir)
+        if artifact is not None:
+            self._count("hits")
+            return artifact, "hit"
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(owner)
+                self._stats["misses"] += 1
+
+        if not leader:
+            while not flight.done.wait(ATTACH_POLL_SECONDS):
+                if on_wait is not None:
+                    on_wait(flight.owner)
+            artifact = self.lookup(key, workdir)
+            if artifact is not None:
+                self._count("attached")
+                return artifact, "attached"
+            self._count("misses")
+            return produce(), "miss"
+
+        try:
+            artifact = produce()
+            self.store(key, artifact)
+            return artifact, "miss"
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        files = self.files.stats()
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = len(self._flights)
+        served = stats["hits"] + stats["attached"]
+        lookups = served + stats["misses"]
+        return {
+            "enabled": files["enabled"],
+            # Chaque téléchargement occupe deux entrées (fichier + métadonnées).
+            "entries": files["entries"] // 2,
+            "bytes": files["bytes"],
+            "max_bytes": files["max_bytes"],
+            "evictions": files["evictions"],
+            "expirations": files["expirations"],
+            "in_flight": in_flight,
+            **stats,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+        }
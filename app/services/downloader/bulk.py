@@ -0,0 +1,165 @@
+"""Téléchargement groupé : playlist ou liste d'URLs → archive ZIP en flux.
+
+Chaque élément suit le chemin d'un téléchargement unitaire (cache
+d'artefacts compris) dans un pool borné, partagé par toutes les requêtes
+groupées du worker (`DOWNLOADER_BULK_WORKERS`). L'archive part au fil de
+l'eau : un élément y entre dès qu'il est prêt (ordre d'arrivée, préfixe
+numérique pour retrouver l'ordre de la liste), recopié par morceaux
+depuis le disque (`zipstream`), puis son dossier de travail est supprimé.
+
+Au plus `workers` éléments sont en cours pour une requête : un client qui
+lit lentement ne fait pas s'accumuler les vidéos sur le disque. Un
+budget en octets borne le total de l'archive : chaque téléchargement
+reçoit le reste du budget (`max_filesize` de yt-dlp, `budget_hook`) et
+s'arrête au-delà (`OverBudget`). Au premier élément qui ne tient plus, les
+téléchargements en cours sont interrompus et tous les éléments restants
+sont marqués `skipped`. Un client qui se déconnecte interrompt aussi les
+téléchargements en cours (`CancelToken`).
+
+L'archive se termine par `rapport.json` : statut de chaque élément (`ok`,
+`error` avec le message, `skipped`), nom dans l'archive et taille.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.cancellation import CancelToken
+
+REPORT_NAME = "rapport.json"
+SKIPPED_MESSAGE = "Taille maximale de l'archive atteinte."
+
+
+class OverBudget(Exception):
+    """L'élément dépasse ce qui reste du budget de l'archive."""
+
+
+def budget_hook(max_bytes: int) -> Callable[[Dict[str, Any]], None]:
+    """Hook de progression yt-dlp qui lève `OverBudget` dès que la taille
+    annoncée ou les octets reçus (toutes parties : vidéo + audio)
+    dépassent `max_bytes`."""
+    sizes: Dict[str, int] = {}
+
+    def _hook(status: Dict[str, Any]) -> None:
+        name = status.get("filename") or ""
+        seen = max(status.get("total_bytes") or 0, status.get("downloaded_bytes") or 0)
+        sizes[name] = max(sizes.get(name, 0), int(seen))
+        if sum(sizes.values()) > max_bytes:
+            raise OverBudget()
+
+    return _hook
+
+
+@dataclass
+class BulkItem:
+    index: int
+    url: str
+    status: str = "pending"  # ok | error | skipped
+    file: Optional[str] = None
+    size: Optional[int] = None
+    cache: Optional[str] = None  # hit | attached | miss
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+def archive_name(index: int, count: int, download_name: str) -> str:
+    """`03 - Titre.mp4` : unique dans l'archive, trié comme la liste."""
+    return f"{index:0{len(str(count))}d} - {download_name}"
+
+
+def iter_bulk_entries(
+    items: List[BulkItem],
+    download: Callable[[str, str, CancelToken, int], Tuple[Any, str]],
+    *,
+    executor: Executor,
+    window: int,
+    max_bytes: int,
+    workdir_root: str,
+    describe_error: Callable[[Exception], str],
+    report: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """Entrées `(nom, chemin)` pour `stream_zip`, puis le rapport JSON.
+
+    `download(url, dossier, jeton, reste)` retourne `(artefact, origine)` ;
+    il tourne dans `executor`, au plus `window` à la fois pour cette liste,
+    s'interrompt (`Cancelled`) une fois le jeton levé et lève `OverBudget`
+    si l'élément dépasse `reste` octets.
+    """
+    cancel = CancelToken()
+    queue: Iterable[BulkItem] = iter(items)
+    pending: Dict[Future, Tuple[BulkItem, str]] = {}
+    total = 0
+    exhausted = False
+
+    def fill() -> None:
+        while not exhausted and len(pending) < window:
+            item = next(queue, None)
+            if item is None:
+                return
+            workdir = tempfile.mkdtemp(prefix="toolbox_bulk_", dir=workdir_root)
+            future = executor.submit(
+                download, item.url, workdir, cancel, max_bytes - total
+            )
+            pending[future] = (item, workdir)
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, workdir = pending.pop(future)
+                try:
+                    if exhausted:
+                        continue  # interrompu ou arrivé trop tard : `skipped`
+                    try:
+                        artifact, origin = future.result()
+                        size = os.path.getsize(artifact.path)
+                    except OverBudget:
+                        size = None
+                    except Exception as exc:  # noqa: BLE001
+                        item.status, item.error = "error", describe_error(exc)
+                        continue
+                    if size is None or total + size > max_bytes:
+                        # Rien d'autre n'entrera : inutile de finir les
+                        # téléchargements déjà partis.
+                        exhausted = True
+                        cancel.cancel()
+                        continue
+                    total += size
+                    item.status, item.size, item.cache = "ok", size, origin
+                    item.file = archive_name(
+                        item.index, len(items), artifact.download_name
+                    )
+                    yield item.file, artifact.path
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            fill()
+    finally:
+        # Client déconnecté (`GeneratorExit`) : rien de nouveau n'est
+        # lancé, les téléchargements déjà partis s'arrêtent au bloc suivant
+        # et leur dossier est supprimé à la fin.
+        if pending:
+            cancel.cancel()
+        for future, (_item, workdir) in pending.items():
+            future.cancel()
+            future.add_done_callback(
+                lambda _f, d=workdir: shutil.rmtree(d, ignore_errors=True)
+            )
+
+    for item in items:
+        if item.status == "pending":
+            item.status, item.error = "skipped", SKIPPED_MESSAGE
+    payload = {
+        **(report or {}),
+        "bytes": total,
+        "items": [item.to_dict() for item in items],
+    }
+    yield REPORT_NAME, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
@@ -0,0 +1,232 @@
+"""Cache des métadonnées `/downloader/info`.
+
+Deux niveaux :
+
+1. LRU en mémoire, par worker gunicorn (toujours actif) ;
+2. Redis optionnel, partagé entre workers : activé quand
+   `RATELIMIT_STORAGE_URI` pointe sur un Redis (même instance que le rate
+   limiter). Toute erreur Redis est avalée : le cache redevient local le
+   temps que Redis revienne.
+
+Les extractions concurrentes d'une même vidéo sont coalescées
+(*single-flight*) : le premier appel extrait, les suivants attendent son
+résultat au lieu de relancer yt-dlp. Les erreurs ne sont jamais mises en
+cache.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie par plateforme : les métadonnées (titre, durée, miniature)
+# bougent peu, mais les miniatures TikTok sont des URLs signées courtes.
+INFO_TTL_SECONDS: Dict[str, int] = {
+    "youtube": 900,
+    "vimeo": 1800,
+    "dailymotion": 1800,
+    "tiktok": 300,
+}
+DEFAULT_INFO_TTL_SECONDS = 600
+# Pause après une erreur Redis avant de retenter le niveau partagé.
+REDIS_RETRY_SECONDS = 30.0
+
+
+def info_ttl(platform: Optional[str]) -> int:
+    return INFO_TTL_SECONDS.get(platform or "", DEFAULT_INFO_TTL_SECONDS)
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+def _redis_client(url: Optional[str]):
+    if not url or not url.startswith(("redis://", "rediss://", "unix://")):
+        return None
+    try:
+        import redis
+    except ImportError:
+        return None
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+class InfoCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        redis_url: Optional[str] = None,
+        prefix: str = "toolbox:info:",
+    ):
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._redis = _redis_client(redis_url)
+        self._redis_down_until = 0.0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0,
+        }
+        self.extraction = LatencyStats()
+
+    # -- niveau local ------------------------------------------------------
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # -- niveau Redis ------------------------------------------------------
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning("Cache info : Redis indisponible (%s)", exc)
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _get_redis(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        if not self._redis_available():
+            return None
+        try:
+            pipe = self._redis.pipeline()
+            pipe.get(self.prefix + key)
+            pipe.ttl(self.prefix + key)
+            raw, ttl = pipe.execute()
+        except Exception as exc:  # noqa: BLE001
+            self._redis_failed(exc)
+            return None
+        if raw is None or ttl is None or ttl <= 0:
+            return None
+        try:
+            return json.loads(raw), int(ttl)
+        except ValueError:
+            return None
+
+    def _set_redis(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        if not self._redis_available():
+            return
+        try:
+            self._redis.set(self.prefix + key, json.dumps(value), ex=ttl)
+        except Exception as exc:  # noqa: BLE001
+            self._redis_failed(exc)
+
+    # -- API ---------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._get_local(key)
+        if value is not None:
+            return value
+        shared = self._get_redis(key)
+        if shared is None:
+            return None
+        value, ttl = shared
+        with self._lock:
+            self._set_local(key, value, ttl)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            self._set_local(key, value, ttl)
+        self._set_redis(key, value, ttl)
+
+    def get_or_extract(
+        self, key: str, ttl: int, extract: Callable[[], Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Retourne `(valeur, servie_depuis_le_cache)`.
+
+        `extract` n'est appelé qu'une fois pour N requêtes concurrentes sur
+        la même clé ; son exception est propagée à tous les appelants.
+        """
+        with self._lock:
+            value = self._get_local(key)
+            if value is not None:
+                self._stats["hits"] += 1
+                return value, True
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            shared = self._get_redis(key)
+            if shared is not None:
+                value, remaining = shared
+                with self._lock:
+                    self._set_local(key, value, remaining)
+                    self._stats["redis_hits"] += 1
+                flight.value = value
+                return value, True
+
+            with self._lock:
+                self._stats["misses"] += 1
+            started = time.monotonic()
+            try:
+                value = extract()
+            finally:
+                self.extraction.add(time.monotonic() - started)
+            self.set(key, value, ttl)
+            flight.value = value
+            return value, False
+        except BaseException as exc:
+            with self._lock:
+                self._stats["errors"] += 1
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+            in_flight = len(self._flights)
+        served = stats["hits"] + stats["redis_hits"] + stats["coalesced"]
+        lookups = served + stats["misses"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "redis": self._redis is not None,
+            "in_flight": in_flight,
+            **stats,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+            "extraction": self.extraction.as_dict(),
+        }
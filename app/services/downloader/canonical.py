@@ -0,0 +1,120 @@
+"""Forme canonique des URLs vidéo acceptées par le downloader.
+
+`youtu.be/X`, `www.youtube.com/watch?v=X&t=30` et `m.youtube.com/shorts/X`
+désignent la même vidéo : on en extrait une clé stable
+`(plateforme, id)` sans aucun accès réseau, pour que caches,
+déduplication et logs (`url_hash`) ne voient qu'une seule entrée.
+
+Les liens courts qui exigent une redirection HTTP pour connaître l'id
+(`vm.tiktok.com/…`) n'ont pas de forme canonique : `canonicalize` renvoie
+None et l'appelant retombe sur l'URL brute.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import ParseResult, parse_qs, urlparse
+
+# Mapping host → identifiant de plateforme (utilisé côté UI pour le branding).
+PLATFORM_ALIASES: Dict[str, str] = {
+    "youtube.com": "youtube",
+    "youtu.be": "youtube",
+    "vimeo.com": "vimeo",
+    "dailymotion.com": "dailymotion",
+    "dai.ly": "dailymotion",
+    "tiktok.com": "tiktok",
+}
+
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_PATH = re.compile(r"^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})(?:/|$)")
+# Chemins de vidéo seulement : `/album/<id>`, `/showcase/<id>` ou
+# `/channels/<id>` désignent une collection, pas la vidéo de même numéro.
+_VIMEO_PATH = re.compile(
+    r"^/(?:video/|channels/[^/]+/|groups/[^/]+/videos/)?(\d+)(?:/[0-9a-f]+)?/?$"
+)
+_DAILYMOTION_PATH = re.compile(r"^/(?:embed/)?video/([a-z0-9]+)", re.IGNORECASE)
+_DAILY_SHORT_PATH = re.compile(r"^/([a-z0-9]+)/?$", re.IGNORECASE)
+_TIKTOK_PATH = re.compile(r"^/(?:@[^/]+/video|v|embed(?:/v2)?)/(\d+)")
+
+
+@dataclass(frozen=True)
+class CanonicalVideo:
+    platform: str
+    video_id: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.platform}:{self.video_id}"
+
+
+def _host(parsed: ParseResult) -> str:
+    return (parsed.hostname or "").lower().rstrip(".")
+
+
+def platform_of(url: str) -> Optional[str]:
+    """Plateforme d'après le host (sous-domaines inclus), sans parser le chemin."""
+    try:
+        host = _host(urlparse(url))
+    except ValueError:
+        return None
+    for alias, platform in PLATFORM_ALIASES.items():
+        if host == alias or host.endswith("." + alias):
+            return platform
+    return None
+
+
+def _youtube(parsed: ParseResult) -> Optional[str]:
+    if _host(parsed) == "youtu.be":
+        candidate = parsed.path.strip("/").split("/")[0]
+        return candidate if _YOUTUBE_ID.match(candidate) else None
+    if parsed.path.rstrip("/") in ("/watch", "/watch_videos"):
+        candidate = (parse_qs(parsed.query).get("v") or [""])[0]
+        return candidate if _YOUTUBE_ID.match(candidate) else None
+    match = _YOUTUBE_PATH.match(parsed.path)
+    return match.group(1) if match else None
+
+
+def _vimeo(parsed: ParseResult) -> Optional[str]:
+    match = _VIMEO_PATH.match(parsed.path)
+    return match.group(1) if match else None
+
+
+def _dailymotion(parsed: ParseResult) -> Optional[str]:
+    if _host(parsed) == "dai.ly":
+        match = _DAILY_SHORT_PATH.match(parsed.path)
+        return match.group(1).lower() if match else None
+    match = _DAILYMOTION_PATH.match(parsed.path)
+    if match:
+        return match.group(1).lower()
+    # Lecteur embarqué : geo.dailymotion.com/player.html?video=<id>
+    candidate = (parse_qs(parsed.query).get("video") or [""])[0]
+    return candidate.lower() if candidate.isalnum() else None
+
+
+def _tiktok(parsed: ParseResult) -> Optional[str]:
+    match = _TIKTOK_PATH.match(parsed.path.replace(".html", ""))
+    return match.group(1) if match else None
+
+
+_EXTRACTORS: Dict[str, Callable[[ParseResult], Optional[str]]] = {
+    "youtube": _youtube,
+    "vimeo": _vimeo,
+    "dailymotion": _dailymotion,
+    "tiktok": _tiktok,
+}
+
+
+def canonicalize(url: str) -> Optional[CanonicalVideo]:
+    """`(plateforme, id)` de `url`, ou None si l'id n'est pas lisible
+    dans l'URL elle-même (lien court, page de chaîne, URL invalide…)."""
+    platform = platform_of(url)
+    if platform is None:
+        return None
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+    video_id = _EXTRACTORS[platform](parsed)
+    return CanonicalVideo(platform, video_id) if video_id else None
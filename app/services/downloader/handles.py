@@ -0,0 +1,97 @@
+"""Réutilisation de l'extraction yt-dlp entre `/info` et le téléchargement.
+
+L'UI appelle toujours `/info` puis `/download` (ou `/jobs`) : sans ce
+module, chaque téléchargement paie deux fois `extract_info` (1 à 3 s sur
+YouTube). `/info` range le dict d'extraction, passé par
+`YoutubeDL.sanitize_info`, sous un identifiant opaque (`info_handle`)
+valable `HANDLE_TTL_SECONDS`. Le téléchargement le rejoue avec
+`process_ie_result` : sélection de format et téléchargement, sans nouvel
+aller-retour vers la plateforme.
+
+Le TTL est court parce que les URLs de formats renvoyées par les
+plateformes sont signées et expirent. Un handle expiré, inconnu ou
+associé à une autre vidéo est simplement ignoré (extraction complète).
+
+Stockage : deux `InfoCache` dédiés (LRU local + Redis partagé s'il est
+configuré), pour qu'un handle émis par un worker gunicorn soit utilisable
+par un autre : les dicts d'extraction (`h:<handle>`) et l'index inverse
+vidéo → handle (`k:<vidéo>`). Chacun a son propre LRU, si bien que
+`max_entries` compte des handles et non des entrées des deux sortes.
+"""
+
+from __future__ import annotations
+
+import secrets
+import threading
+from typing import Any, Dict, Optional
+
+from .cache import InfoCache
+
+HANDLE_TTL_SECONDS = 300
+# Un dict d'extraction YouTube pèse plusieurs centaines de Ko : on en garde peu.
+HANDLE_MAX_ENTRIES = 64
+
+# Champs volumineux inutiles au téléchargement (on ne récupère ni
+# sous-titres ni vignettes multiples).
+_DROPPED_FIELDS = (
+    "automatic_captions",
+    "subtitles",
+    "thumbnails",
+    "heatmap",
+    "comments",
+    "chapters",
+)
+
+
+def slim_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in info.items() if key not in _DROPPED_FIELDS}
+
+
+class InfoHandles:
+    def __init__(
+        self,
+        max_entries: int = HANDLE_MAX_ENTRIES,
+        ttl_seconds: int = HANDLE_TTL_SECONDS,
+        redis_url: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._store = InfoCache(
+            max_entries=max_entries, redis_url=redis_url, prefix="toolbox:ydl-info:"
+        )
+        self._by_video = InfoCache(
+            max_entries=max_entries, redis_url=redis_url, prefix="toolbox:ydl-info:"
+        )
+        self._lock = threading.Lock()
+        self._stats = {"stashed": 0, "reused": 0, "missed": 0}
+
+    def stash(self, video_key: str, info: Dict[str, Any]) -> str:
+        """Range `info` (déjà passé par `sanitize_info`) et retourne son handle."""
+        handle = secrets.token_urlsafe(16)
+        self._store.set(
+            "h:" + handle, {"key": video_key, "info": slim_info(info)}, self.ttl_seconds
+        )
+        self._by_video.set("k:" + video_key, {"handle": handle}, self.ttl_seconds)
+        with self._lock:
+            self._stats["stashed"] += 1
+        return handle
+
+    def handle_for(self, video_key: str) -> Optional[str]:
+        """Handle encore valide pour cette vidéo (réponse `/info` servie du cache)."""
+        entry = self._by_video.get("k:" + video_key)
+        return entry.get("handle") if entry else None
+
+    def resolve(
+        self, handle: Optional[str], video_key: str
+    ) -> Optional[Dict[str, Any]]:
+        """Dict d'extraction du handle, s'il est frais et concerne bien `video_key`."""
+        if not handle:
+            return None
+        entry = self._store.get("h:" + handle)
+        found = entry is not None and entry.get("key") == video_key
+        with self._lock:
+            self._stats["reused" if found else "missed"] += 1
+        return entry["info"] if found else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ttl_seconds": self.ttl_seconds, **self._stats}
@@ -0,0 +1,124 @@
+"""Suivi de progression des téléchargements yt-dlp exécutés en tâche de fond.
+
+yt-dlp appelle `progress_hooks` à chaque bloc reçu (octets, vitesse, ETA)
+et `postprocessor_hooks` autour de chaque post-traitement FFmpeg (fusion
+audio + vidéo, extraction MP3). `DownloadProgress` traduit ces deux flux
+en un pourcentage global et en détails lisibles par l'UI, stockés sur la
+`Task` du job.
+
+Répartition du pourcentage : 0–90 % pour les téléchargements (un format
+`bestvideo+bestaudio` en compte deux, chacun pèse la même part), 90 %
+pendant les post-traitements ; 100 % quand la tâche est terminée.
+
+`cancel_hook` interrompt le téléchargement (exception `Cancelled` levée
+depuis le hook, que yt-dlp laisse remonter) dès que le jeton
+d'annulation de la tâche, ou de la requête synchrone, est levé.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app.core.cancellation import CancelToken
+
+DOWNLOAD_SHARE = 90
+
+# Libellés des post-processeurs yt-dlp affichés dans l'UI.
+POSTPROCESSOR_LABELS: Dict[str, str] = {
+    "Merger": "Fusion audio / vidéo",
+    "ExtractAudio": "Extraction audio",
+    "FixupM3u8": "Correction du conteneur",
+    "FixupM4a": "Correction du conteneur",
+    "FixupStretched": "Correction du conteneur",
+    "MoveFiles": "Finalisation",
+}
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def cancel_hook(token: CancelToken) -> Callable[[Dict[str, Any]], None]:
+    """Hook yt-dlp (progression ou post-traitement) qui lève `Cancelled`
+    une fois `token` levé."""
+
+    def _hook(_status: Dict[str, Any]) -> None:
+        token.raise_if_cancelled("Téléchargement annulé.")
+
+    return _hook
+
+
+class DownloadProgress:
+    """Adaptateur hooks yt-dlp → `task.update_progress`."""
+
+    def __init__(self, task):
+        self.task = task
+        self._lock = threading.Lock()
+        self._finished: set[str] = set()
+        self._parts = 1
+
+    def _expected_parts(self, info: Dict[str, Any]) -> int:
+        requested = info.get("requested_formats") or ()
+        return max(1, len(requested))
+
+    def progress_hook(self, status: Dict[str, Any]) -> None:
+        state = status.get("status")
+        filename = status.get("filename") or ""
+        with self._lock:
+            self._parts = max(
+                self._parts, self._expected_parts(status.get("info_dict") or {})
+            )
+            if state == "finished":
+                self._finished.add(filename)
+                fraction = 0.0
+            elif state == "downloading":
+                downloaded = _number(status.get("downloaded_bytes")) or 0.0
+                total = _number(status.get("total_bytes")) or _number(
+                    status.get("total_bytes_estimate")
+                )
+                fraction = min(1.0, downloaded / total) if total else 0.0
+            else:
+                return
+            done = min(len(self._finished), self._parts)
+            percent = int((done + fraction) / self._parts * DOWNLOAD_SHARE)
+            part = min(done + 1, self._parts)
+
+        details = {
+            "phase": "downloading",
+            "downloaded_bytes": status.get("downloaded_bytes"),
+            "total_bytes": status.get("total_bytes")
+            or status.get("total_bytes_estimate"),
+            "speed": _number(status.get("speed")),
+            "eta": status.get("eta"),
+            "part": part,
+            "parts": self._parts,
+        }
+        if status.get("fragment_count"):
+            details["fragment_index"] = status.get("fragment_index")
+            details["fragment_count"] = status.get("fragment_count")
+        self.task.update_progress(
+            max(self.task.progress, percent), "Téléchargement", **details
+        )
+
+    def postprocessor_hook(self, status: Dict[str, Any]) -> None:
+        name = status.get("postprocessor") or ""
+        if status.get("status") not in ("started", "processing") or name == "MoveFiles":
+            return
+        label = POSTPROCESSOR_LABELS.get(name, "Post-traitement")
+        self.task.update_progress(
+            max(self.task.progress, DOWNLOAD_SHARE),
+            label,
+            phase="postprocessing",
+            postprocessor=name,
+            speed=None,
+            eta=None,
+        )
+
+    def hooks(self) -> Dict[str, Any]:
+        """Hooks à passer au prêt d'une instance (`YdlPool.lease`)."""
+        check = cancel_hook(self.task.cancel_token)
+        return {
+            "progress_hooks": [check, self.progress_hook],
+            "postprocessor_hooks": [check, self.postprocessor_hook],
+        }
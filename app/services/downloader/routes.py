@@ -8,28 +8,111 @@ accepte désormais YouTube, Vimeo, Dailymotion et TikTok (cf. la whitelist
 Chaque téléchargement passe par un dossier temporaire auto-nettoyé
 (`mkdtemp` + `after_this_request`) et le timeout FFmpeg est plafonné en
 amont par yt-dlp.
+
+`POST /jobs` exécute le même téléchargement dans un pool de fond : la
+progression réelle (octets, vitesse, ETA, phase) est lue sur les hooks
+yt-dlp et le fichier final est livré par jeton (`/download/<jeton>`).
+`POST /download` reste synchrone pour les clients existants.
+
+Un `info_handle` renvoyé par `/info` permet au téléchargement de rejouer
+l'extraction déjà faite (`handles.py`) au lieu de la recommencer.
+
+Les deux routes passent par `artifacts` : une vidéo déjà téléchargée au
+même format est resservie depuis le disque, et une demande identique en
+cours est partagée plutôt que relancée.
+
+`POST /download` avec `"stream": true` envoie le fichier au fil de l'eau
+(`streaming.py`) au lieu d'attendre qu'il soit complet sur le disque.
+
+`POST /bulk` télécharge une playlist ou une liste d'URLs et renvoie une
+archive ZIP en flux (`bulk.py`).
 """
 
 from __future__ import annotations
 
+import copy
 import hashlib
+import json
 import os
 import re
 import shutil
 import tempfile
+import threading
+import time
 import unicodedata
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
-from flask import (Blueprint, after_this_request, current_app, jsonify,
-                   render_template, request, send_file)
+from flask import (Blueprint, Response, after_this_request, current_app,
+                   jsonify, render_template, request, send_file,
+                   stream_with_context, url_for)
 from yt_dlp import YoutubeDL
 
-from app.core.rate_limit import limiter
+from app.core.cancellation import Cancelled, CancelToken, disconnect_token
+from app.core.delivery import DeliveryStore
+from app.core.rate_limit import client_key, limiter
+from app.core.zipstream import stream_zip
+from app.services.media_converter.scheduler import (MIN_COST_SECONDS,
+                                                    QueueFull, estimate_cost)
+from app.services.media_converter.task_manager import TaskManager
+from app.services.media_converter.task_store import make_task_store
 from config import Config
 
+from .artifacts import Artifact, ArtifactCache, artifact_key
+from .bulk import BulkItem, OverBudget, budget_hook, iter_bulk_entries
+from .cache import InfoCache, info_ttl
+from .canonical import PLATFORM_ALIASES, canonicalize, platform_of  # noqa: F401
+from .handles import InfoHandles
+from .jobs import DownloadProgress, cancel_hook
+from .streaming import StreamUnavailable, open_stream, plan_stream
+from .tuning import TransferTuner
+from .ydl_pool import YdlPool, allowed_extractors
+
 downloader_bp = Blueprint("downloader", __name__)
 
+# Métadonnées `/info` : LRU local + Redis du rate limiter s'il y en a un.
+info_cache = InfoCache(
+    max_entries=Config.DOWNLOADER_INFO_CACHE_SIZE,
+    redis_url=os.environ.get("RATELIMIT_STORAGE_URI"),
+)
+# Instances YoutubeDL prêtes à l'emploi (la fabrique lit `YoutubeDL` à
+# l'appel, ce qui laisse les tests le remplacer).
+ydl_pool = YdlPool(lambda opts: YoutubeDL(opts))
+# Parallélisme des fragments, découpe HTTP et tampon, par plateforme et
+# d'après le débit mesuré.
+transfer_tuner = TransferTuner(
+    fragments=Config.DOWNLOADER_FRAGMENTS,
+    http_chunk_size=Config.DOWNLOADER_HTTP_CHUNK_SIZE,
+    buffersize=Config.DOWNLOADER_BUFFER_SIZE,
+)
+# Extractions de `/info` rejouables par le téléchargement qui suit.
+info_handles = InfoHandles(redis_url=os.environ.get("RATELIMIT_STORAGE_URI"))
+# Fichiers déjà téléchargés, réutilisés par vidéo + format + qualité.
+artifacts = ArtifactCache(
+    os.path.join(Config.TEMP_FOLDER, "downloads"),
+    Config.DOWNLOADER_CACHE_MAX_BYTES,
+    Config.DOWNLOADER_CACHE_TTL_SECONDS,
+)
+# Téléchargements en tâche de fond (`/jobs`) : pool dédié, distinct de
+# celui des conversions média pour qu'un gros téléchargement ne bloque pas
+# un encodage (et inversement).
+download_manager = TaskManager(
+    max_workers=Config.DOWNLOADER_JOB_WORKERS,
+    store=make_task_store(os.environ.get("RATELIMIT_STORAGE_URI"), "downloader"),
+    max_retained=Config.TASK_MAX_RETAINED,
+    max_queued=Config.TASK_MAX_QUEUED,
+)
+# Fichiers prêts, servis par jeton. Même dossier que les livraisons média :
+# un seul balayage des fichiers expirés.
+deliveries = DeliveryStore(
+    os.path.join(Config.TEMP_FOLDER, "deliveries"), Config.DELIVERY_TTL_SECONDS
+)
+
+# Server-Sent Events : durée max d'un flux (EventSource se reconnecte).
+SSE_MAX_SECONDS = 25
+
 
 # Plateformes vidéo publiques mainstream explicitement autorisées.
 # Tout autre domaine est rejeté en amont (yt-dlp supporte >1800 sites,
@@ -41,14 +124,6 @@ ALLOWED_VIDEO_HOSTS: frozenset[str] = frozenset({
     "tiktok.com",
 })
 
-# Mapping host → identifiant de plateforme (utilisé côté UI pour le branding).
-PLATFORM_ALIASES: Dict[str, str] = {
-    "youtube.com": "youtube", "youtu.be": "youtube",
-    "vimeo.com": "vimeo",
-    "dailymotion.com": "dailymotion", "dai.ly": "dailymotion",
-    "tiktok.com": "tiktok",
-}
-
 
 def _is_allowed_url(url: str) -> bool:
     """Vérifie que l'URL est http/https et sur un host whitelisté."""
@@ -95,6 +170,9 @@ def _common_ydl_opts() -> Dict[str, Any]:
         "quiet": True,
         "no_warnings": True,
         "noplaylist": True,
+        # Uniquement les extracteurs des plateformes de `ALLOWED_VIDEO_HOSTS`
+        # (pas d'extracteur générique) : cf. `ydl_pool.allowed_extractors`.
+        "allowed_extractors": list(allowed_extractors()),
         "retries": 3,
         "fragment_retries": 3,
         "http_headers": {
@@ -120,6 +198,8 @@ def _classify_yt_error(message: str) -> tuple[int, str]:
         return 400, "Format demandé non disponible pour cette vidéo."
     if "sign in" in msg_lower:
         return 400, "Vidéo nécessitant une connexion (âge ou premium)."
+    if "no suitable extractor" in msg_lower or "unsupported url" in msg_lower:
+        return 400, "Ce format de lien n'est pas pris en charge : utilisez l'URL de la vidéo."
     return 500, f"Erreur : {message}"
 
 
@@ -136,6 +216,53 @@ def index():
     return render_template("downloader.html")
 
 
+class InfoUnavailable(Exception):
+    """yt-dlp n'a rien renvoyé pour cette URL."""
+
+
+def _info_opts() -> Dict[str, Any]:
+    return {**_common_ydl_opts(), "extract_flat": False}
+
+
+def _extract_info_payload(url: str) -> Dict[str, Any]:
+    """Extraction yt-dlp complète → payload JSON de `/info`."""
+    with ydl_pool.lease(_info_opts()) as ydl:
+        info = ydl.extract_info(url, download=False)
+        if info is None:
+            raise InfoUnavailable()
+        info_handles.stash(_video_key(url), ydl.sanitize_info(info))
+
+    description = info.get("description") or ""
+    return {
+        "title": info.get("title", "Titre non disponible"),
+        "duration": info.get("duration", 0),
+        "thumbnail": info.get("thumbnail"),
+        "channel": (
+            info.get("uploader")
+            or info.get("channel")
+            or "Source inconnue"
+        ),
+        "views": info.get("view_count", 0),
+        "description": (description[:200] + "...") if description else "",
+        "id": info.get("id"),
+        "formats_available": len(info.get("formats") or []),
+        "extractor": info.get("extractor_key") or info.get("extractor") or "",
+    }
+
+
+def _video_key(url: str) -> str:
+    """Clé stable d'une vidéo : `plateforme:id` quand l'URL le permet,
+    sinon l'URL brute (lien court à résoudre, par exemple)."""
+    canonical = canonicalize(url)
+    return canonical.key if canonical else url
+
+
+def _url_hash(url: str) -> str:
+    """Empreinte courte pour les logs : identique pour toutes les
+    variantes d'URL d'une même vidéo, sans journaliser l'URL."""
+    return hashlib.sha256(_video_key(url).encode("utf-8")).hexdigest()[:12]
+
+
 @downloader_bp.route("/info", methods=["GET"])
 @limiter.limit("20 per minute")
 def get_video_info():
@@ -146,62 +273,318 @@ def get_video_info():
         return jsonify(_REJECTION_PAYLOAD), 400
 
     try:
-        with YoutubeDL({**_common_ydl_opts(), "extract_flat": False}) as ydl:
-            info = ydl.extract_info(url, download=False)
-            if info is None:
-                return (
-                    jsonify({"error": "Impossible d'obtenir les informations de la vidéo."}),
-                    400,
-                )
-
-            description = info.get("description") or ""
-            return jsonify(
-                {
-                    "title": info.get("title", "Titre non disponible"),
-                    "duration": info.get("duration", 0),
-                    "thumbnail": info.get("thumbnail"),
-                    "channel": (
-                        info.get("uploader")
-                        or info.get("channel")
-                        or "Source inconnue"
-                    ),
-                    "views": info.get("view_count", 0),
-                    "description": (description[:200] + "...") if description else "",
-                    "id": info.get("id"),
-                    "formats_available": len(info.get("formats") or []),
-                    "extractor": info.get("extractor_key") or info.get("extractor") or "",
-                }
-            )
-
+        payload, cached = info_cache.get_or_extract(
+            _video_key(url),
+            info_ttl(platform_of(url)),
+            lambda: _extract_info_payload(url),
+        )
+    except InfoUnavailable:
+        return (
+            jsonify({"error": "Impossible d'obtenir les informations de la vidéo."}),
+            400,
+        )
     except Exception as exc:  # noqa: BLE001
         current_app.logger.warning("Downloader info error: %s", exc)
         status, message = _classify_yt_error(str(exc))
         return jsonify({"error": message}), status
 
+    # Le handle n'est pas dans le payload mis en cache : il vit moins longtemps.
+    handle = info_handles.handle_for(_video_key(url))
+    response = jsonify({**payload, "info_handle": handle} if handle else payload)
+    response.headers["X-Cache"] = "HIT" if cached else "MISS"
+    return response
 
-@downloader_bp.route("/download", methods=["POST"])
-@limiter.limit("3 per minute;30 per hour")
-def download_video():
+
+def warm_up() -> Dict[str, Any]:
+    """Prépare les instances yt-dlp du worker (hook `post_fork` de gunicorn) :
+    jeu d'options de `/info`, vidéo meilleure qualité et audio, plus l'import
+    des extracteurs des plateformes autorisées."""
+    started = time.monotonic()
+    loaded = ydl_pool.preload(_info_opts())
     ffmpeg_path = Config.get_ffmpeg_path()
-    if not ffmpeg_path:
-        return jsonify({"error": "FFmpeg requis et introuvable."}), 500
+    if ffmpeg_path:
+        for format_type in ("video", "audio"):
+            ydl_pool.fill(_download_opts(ffmpeg_path, format_type, "highest"), count=1)
+    return {"extractors": loaded, "seconds": round(time.monotonic() - started, 3)}
+
+
+@downloader_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Compteurs des caches (métadonnées, fichiers téléchargés) et du pool
+    de téléchargements en tâche de fond."""
+    return jsonify({
+        "info_cache": info_cache.stats(),
+        "artifacts": artifacts.stats(),
+        "info_handles": info_handles.stats(),
+        "ydl_pool": ydl_pool.stats(),
+        "tuning": transfer_tuner.stats(),
+        "jobs": download_manager.stats(),
+    })
+
+
+class DownloadFailed(Exception):
+    """Téléchargement yt-dlp sans fichier exploitable (`status` HTTP associé)."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+def _download_opts(ffmpeg_path: str, format_type: str, quality: str) -> Dict[str, Any]:
+    """Options d'un jeu d'instances du pool ; le dossier de sortie est fixé
+    à chaque prêt (`_run_download`)."""
+    base_opts = {
+        **_common_ydl_opts(),
+        "ffmpeg_location": ffmpeg_path,
+    }
+    if format_type == "audio":
+        return {
+            **base_opts,
+            "format": "bestaudio/best",
+            "postprocessors": [
+                {
+                    "key": "FFmpegExtractAudio",
+                    "preferredcodec": "mp3",
+                    "preferredquality": "192",
+                }
+            ],
+        }
+    return {
+        **base_opts,
+        "format": _get_format_string(quality),
+        "merge_output_format": "mp4",
+    }
 
+
+def _run_download(
+    url: str,
+    temp_dir: str,
+    ydl_opts: Dict[str, Any],
+    info: Optional[Dict[str, Any]] = None,
+    hooks: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> tuple[str, Dict[str, Any]]:
+    """Télécharge `url` dans `temp_dir` ; retourne `(chemin, info)`.
+
+    Avec `info` (extraction de `/info` via un handle), yt-dlp part de ce
+    dict au lieu de ré-extraire. Si ça échoue (URLs de formats expirées,
+    typiquement), on retente une fois avec une extraction complète.
+    `hooks` : hooks de progression yt-dlp (`DownloadProgress.hooks()`).
+    Les réglages de transfert viennent de `transfer_tuner`, qui mesure au
+    passage le débit obtenu ; `params` s'y ajoute pour ce seul prêt
+    (`max_filesize`...). yt-dlp abandonne sans erreur un fichier plus gros
+    que `max_filesize` : `DownloadFailed` 413.
+    """
+    hooks = hooks or {}
+    params = params or {}
+    platform = platform_of(url)
+    tuning = transfer_tuner.choose(platform)
+    with ydl_pool.lease(
+        ydl_opts,
+        outtmpl=os.path.join(temp_dir, "%(title)s.%(ext)s"),
+        params={**tuning.as_params(), **params},
+        progress_hooks=[*hooks.get("progress_hooks", ()), transfer_tuner.probe(platform, tuning)],
+        postprocessor_hooks=hooks.get("postprocessor_hooks", ()),
+    ) as ydl:
+        result = None
+        if info is not None:
+            try:
+                result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            except Cancelled:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                current_app.logger.warning(
+                    "Downloader: info réutilisée inexploitable (%s), ré-extraction", exc
+                )
+        if result is None:
+            result = ydl.extract_info(url, download=True)
+    info = result
+    if not info:
+        raise DownloadFailed("Impossible de télécharger la vidéo.", 400)
+
+    filepath = None
+    requested = info.get("requested_downloads") or []
+    if requested:
+        filepath = requested[0].get("filepath")
+
+    if not filepath or not os.path.isfile(filepath):
+        files = [
+            os.path.join(temp_dir, f)
+            for f in os.listdir(temp_dir)
+            if os.path.isfile(os.path.join(temp_dir, f))
+        ]
+        if not files:
+            expected = _expected_size(info)
+            limit = params.get("max_filesize")
+            if limit is not None and expected is not None and expected > limit:
+                raise DownloadFailed("Fichier plus volumineux que la taille autorisée.", 413)
+            raise DownloadFailed("Aucun fichier généré.", 500)
+        filepath = files[0]
+    return filepath, info
+
+
+def _expected_size(info: Dict[str, Any]) -> Optional[int]:
+    """Taille annoncée par l'extracteur (somme des formats fusionnés), si connue."""
+    sizes = [
+        fmt.get("filesize") or fmt.get("filesize_approx")
+        for fmt in info.get("requested_formats") or [info]
+    ]
+    return sum(sizes) if sizes and all(sizes) else None
+
+
+def _download_artifact(
+    url: str,
+    temp_dir: str,
+    ydl_opts: Dict[str, Any],
+    format_type: str,
+    info: Optional[Dict[str, Any]] = None,
+    hooks: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Artifact:
+    """Télécharge `url` et retourne le fichier avec son nom proposé et son mimetype."""
+    filepath, info = _run_download(url, temp_dir, ydl_opts, info, hooks, params)
+    return Artifact(filepath, *_download_name(info, format_type))
+
+
+def _download_name(info: Dict[str, Any], format_type: str) -> tuple[str, str]:
+    """Nom de fichier proposé au client et mimetype."""
+    safe_title = _sanitize_filename(info.get("title", "video"))
+    if format_type == "audio":
+        return f"{safe_title}.mp3", "audio/mpeg"
+    return f"{safe_title}.mp4", "video/mp4"
+
+
+@dataclass(frozen=True)
+class DownloadRequest:
+    url: str
+    format_type: str = "video"
+    quality: str = "highest"
+    # Handle renvoyé par `/info` (optionnel) : évite une seconde extraction.
+    info_handle: Optional[str] = None
+    # Envoi au fil de l'eau plutôt qu'après téléchargement complet (`/download`).
+    stream: bool = False
+
+
+def _parse_download_request() -> DownloadRequest:
+    """Valide le corps JSON commun à `/download` et `/jobs` (`DownloadFailed` 400)."""
     data = request.get_json(silent=True) or {}
     url = (data.get("url") or "").strip()
     if not url:
-        return jsonify({"error": "URL manquante."}), 400
+        raise DownloadFailed("URL manquante.", 400)
     if not _is_allowed_url(url):
-        return jsonify(_REJECTION_PAYLOAD), 400
+        raise DownloadFailed(_REJECTION_PAYLOAD["error"], 400)
+    handle = data.get("info_handle")
+    return DownloadRequest(
+        url,
+        data.get("format", "video"),
+        data.get("quality", "highest"),
+        handle if isinstance(handle, str) and handle else None,
+        data.get("stream") is True,
+    )
+
+
+def _resolve_formats(
+    url: str, ydl_opts: Dict[str, Any], info: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Extraction + sélection de format, sans rien télécharger (mode flux).
+    Rejoue `info` (handle de `/info`) s'il est fourni, comme `_run_download`."""
+    with ydl_pool.lease(ydl_opts) as ydl:
+        if info is not None:
+            try:
+                return ydl.process_ie_result(copy.deepcopy(info), download=False)
+            except Exception as exc:  # noqa: BLE001
+                current_app.logger.warning(
+                    "Downloader: info réutilisée inexploitable (%s), ré-extraction", exc
+                )
+        return ydl.extract_info(url, download=False)
+
+
+def _stream_download(download_request: DownloadRequest, ffmpeg_path: str) -> Optional[Response]:
+    """Réponse en flux pour `download_request`, ou None si ce format ne se
+    diffuse pas (l'appelant passe alors par le téléchargement classique).
+
+    Les erreurs d'extraction remontent comme pour `_run_download`.
+    """
+    url, format_type = download_request.url, download_request.format_type
+    info = _resolve_formats(
+        url,
+        _download_opts(ffmpeg_path, format_type, download_request.quality),
+        info_handles.resolve(download_request.info_handle, _video_key(url)),
+    )
+    if not info:
+        raise DownloadFailed("Impossible de télécharger la vidéo.", 400)
+    plan = plan_stream(info, format_type)
+    if plan is None:
+        current_app.logger.info("Downloader: format non diffusable en flux, téléchargement classique")
+        return None
+
+    app = current_app._get_current_object()
+    url_hash = _url_hash(url)
+
+    def _on_error(returncode, stderr):
+        app.logger.error(
+            "Downloader flux interrompu (url_hash=%s, FFmpeg code %s): %s",
+            url_hash, returncode, stderr,
+        )
+
+    try:
+        stream = open_stream(plan, ffmpeg_path, format_type, on_error=_on_error)
+    except StreamUnavailable as exc:
+        current_app.logger.warning(
+            "Downloader: flux impossible (%s), téléchargement classique", exc
+        )
+        return None
+
+    download_name, mimetype = _download_name(info, format_type)
+    current_app.logger.info("Downloader flux: %s (%s)", download_name, plan.mode)
+    # Pas de `stream_with_context` : le flux n'a pas besoin du contexte de
+    # requête, et Werkzeug appelle `stream.close()` (arrêt de FFmpeg) si le
+    # client se déconnecte.
+    response = Response(stream, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    if stream.length is not None:
+        response.headers["Content-Length"] = str(stream.length)
+    response.headers["X-Cache"] = "BYPASS"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
-    format_type = data.get("format", "video")
-    quality = data.get("quality", "highest")
 
-    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+@downloader_bp.route("/download", methods=["POST"])
+@limiter.limit("3 per minute;30 per hour")
+def download_video():
+    ffmpeg_path = Config.get_ffmpeg_path()
+    if not ffmpeg_path:
+        return jsonify({"error": "FFmpeg requis et introuvable."}), 500
+
+    try:
+        download_request = _parse_download_request()
+    except DownloadFailed as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    url = download_request.url
+    format_type, quality = download_request.format_type, download_request.quality
+
+    url_hash = _url_hash(url)
     current_app.logger.info(
         "Downloader: url_hash=%s format=%s quality=%s", url_hash, format_type, quality
     )
+    key = artifact_key(_video_key(url), format_type, quality)
 
-    temp_dir = tempfile.mkdtemp(prefix="toolbox_dl_")
+    # Un fichier déjà en cache part de toute façon immédiatement (avec
+    # `Content-Length` et `Range`) : le flux ne sert que pour un miss.
+    if download_request.stream and not artifacts.contains(key):
+        try:
+            response = _stream_download(download_request, ffmpeg_path)
+        except DownloadFailed as exc:
+            return jsonify({"error": str(exc)}), exc.status
+        except Exception as exc:  # noqa: BLE001
+            current_app.logger.error("Downloader stream error: %s", exc)
+            status, message = _classify_yt_error(str(exc))
+            return jsonify({"error": message}), status
+        if response is not None:
+            return response
+
+    # Sous TEMP_FOLDER : les copies depuis le cache d'artefacts sont des liens durs.
+    temp_dir = tempfile.mkdtemp(prefix="toolbox_dl_", dir=current_app.config["TEMP_FOLDER"])
 
     @after_this_request
     def _cleanup(response):
@@ -211,68 +594,389 @@ def download_video():
             current_app.logger.warning("Cleanup error: %s", exc)
         return response
 
+    # Client parti pendant le téléchargement : yt-dlp est interrompu au
+    # bloc suivant (les requêtes rattachées retentent pour leur compte).
+    check = cancel_hook(disconnect_token(request.environ))
     try:
-        base_opts = {
-            **_common_ydl_opts(),
-            "outtmpl": os.path.join(temp_dir, "%(title)s.%(ext)s"),
-            "ffmpeg_location": ffmpeg_path,
-        }
+        artifact, origin = artifacts.fetch(
+            key,
+            temp_dir,
+            lambda: _download_artifact(
+                url, temp_dir, _download_opts(ffmpeg_path, format_type, quality),
+                format_type,
+                info_handles.resolve(download_request.info_handle, _video_key(url)),
+                {"progress_hooks": [check], "postprocessor_hooks": [check]},
+            ),
+        )
+    except DownloadFailed as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    except Cancelled:
+        current_app.logger.info("Downloader: url_hash=%s abandonné, client déconnecté", url_hash)
+        return jsonify({"error": "Téléchargement annulé."}), 499
+    except Exception as exc:  # noqa: BLE001
+        current_app.logger.error("Downloader download error: %s", exc)
+        status, message = _classify_yt_error(str(exc))
+        return jsonify({"error": message}), status
 
-        if format_type == "audio":
-            ydl_opts = {
-                **base_opts,
-                "format": "bestaudio/best",
-                "postprocessors": [
-                    {
-                        "key": "FFmpegExtractAudio",
-                        "preferredcodec": "mp3",
-                        "preferredquality": "192",
-                    }
-                ],
-            }
-        else:
-            ydl_opts = {
-                **base_opts,
-                "format": _get_format_string(quality),
-                "merge_output_format": "mp4",
-                "concurrent_fragment_downloads": 4,
-            }
-
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            if not info:
-                return jsonify({"error": "Impossible de télécharger la vidéo."}), 400
-
-            filepath = None
-            requested = info.get("requested_downloads") or []
-            if requested:
-                filepath = requested[0].get("filepath")
-
-            if not filepath or not os.path.isfile(filepath):
-                files = [
-                    os.path.join(temp_dir, f)
-                    for f in os.listdir(temp_dir)
-                    if os.path.isfile(os.path.join(temp_dir, f))
-                ]
-                if not files:
-                    return jsonify({"error": "Aucun fichier généré."}), 500
-                filepath = files[0]
-
-            size_mb = os.path.getsize(filepath) / (1024 * 1024)
-            current_app.logger.info(
-                "Downloader ok: %s (%.2f MB)", os.path.basename(filepath), size_mb
+    size_mb = os.path.getsize(artifact.path) / (1024 * 1024)
+    current_app.logger.info(
+        "Downloader ok: %s (%.2f MB, %s)", artifact.download_name, size_mb, origin
+    )
+    response = send_file(
+        artifact.path,
+        as_attachment=True,
+        download_name=artifact.download_name,
+        mimetype=artifact.mimetype,
+    )
+    response.headers["X-Cache"] = "MISS" if origin == "miss" else "HIT"
+    return response
+
+
+# ─────────────────────────────────────────────────────────────
+# Jobs : POST /jobs → 202, GET /jobs/<id>, GET /jobs/<id>/events,
+# puis GET /download/<jeton> une fois le fichier prêt.
+# ─────────────────────────────────────────────────────────────
+
+
+def _mirror_progress(task):
+    """`on_wait` d'un job rattaché : recopie la progression du job qui
+    télécharge réellement."""
+
+    def _on_wait(leader):
+        task.cancel_token.raise_if_cancelled("Téléchargement annulé.")
+        if leader is not None and leader is not task:
+            task.update_progress(
+                leader.progress, leader.message, **{**leader.details, "attached": True}
             )
 
-            safe_title = _sanitize_filename(info.get("title", "video"))
-            ext = "mp3" if format_type == "audio" else "mp4"
-            return send_file(
-                filepath,
-                as_attachment=True,
-                download_name=f"{safe_title}.{ext}",
-                mimetype="audio/mpeg" if format_type == "audio" else "video/mp4",
+    return _on_wait
+
+
+def _download_job(task, app, url, format_type, quality, ffmpeg_path, info_handle=None):
+    progress = DownloadProgress(task)
+    # Sous TEMP_FOLDER : la publication du fichier final est un simple
+    # renommage (même système de fichiers que `deliveries`).
+    temp_dir = tempfile.mkdtemp(prefix="toolbox_dl_", dir=app.config["TEMP_FOLDER"])
+    with app.app_context():
+        try:
+            artifact, origin = artifacts.fetch(
+                artifact_key(_video_key(url), format_type, quality),
+                temp_dir,
+                lambda: _download_artifact(
+                    url, temp_dir, _download_opts(ffmpeg_path, format_type, quality),
+                    format_type,
+                    info_handles.resolve(info_handle, _video_key(url)),
+                    progress.hooks(),
+                ),
+                owner=task,
+                on_wait=_mirror_progress(task),
+            )
+            task.meta["cache"] = origin
+            delivery = deliveries.publish(artifact.path, artifact.download_name, artifact.mimetype)
+            task.meta["token"] = delivery.token
+            task.meta["download_name"] = artifact.download_name
+            task.details["size"] = os.path.getsize(delivery.path)
+            task.details["phase"] = "completed"
+            app.logger.info(
+                "Downloader job %s ok (%.2f MB, %s)",
+                task.id, task.details["size"] / (1024 * 1024), origin,
             )
+            return delivery.path
+        except (DownloadFailed, Cancelled):
+            raise
+        except Exception as exc:
+            app.logger.error("Downloader job %s en échec: %s", task.id, exc)
+            _status, message = _classify_yt_error(str(exc))
+            raise DownloadFailed(message) from exc
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
-    except Exception as exc:  # noqa: BLE001
-        current_app.logger.error("Downloader download error: %s", exc)
-        status, message = _classify_yt_error(str(exc))
-        return jsonify({"error": message}), status
+
+def _job_payload(task):
+    payload = task.to_dict()
+    payload["status_url"] = url_for("downloader.job_status", task_id=task.id)
+    payload["events_url"] = url_for("downloader.job_events", task_id=task.id)
+    if task.status == "completed" and task.meta.get("token"):
+        payload["download_url"] = url_for("downloader.download_file", token=task.meta["token"])
+        payload["download_name"] = task.meta.get("download_name")
+    return payload
+
+
+def _job_cost(url: str, format_type: str, quality: str) -> float:
+    """Coût estimé d'un job : quasi nul si le fichier est en cache, sinon
+    d'après la durée connue par `/info` (cache de métadonnées)."""
+    if artifacts.contains(artifact_key(_video_key(url), format_type, quality)):
+        return MIN_COST_SECONDS
+    info = info_cache.get(_video_key(url)) or {}
+    return estimate_cost("download", duration=info.get("duration"))
+
+
+@downloader_bp.route("/jobs", methods=["POST"])
+@limiter.limit("3 per minute;30 per hour")
+def submit_job():
+    ffmpeg_path = Config.get_ffmpeg_path()
+    if not ffmpeg_path:
+        return jsonify({"error": "FFmpeg requis et introuvable."}), 500
+
+    try:
+        download_request = _parse_download_request()
+    except DownloadFailed as exc:
+        return jsonify({"error": str(exc)}), exc.status
+    url = download_request.url
+    format_type, quality = download_request.format_type, download_request.quality
+
+    try:
+        task_id = download_manager.create_task(
+            _download_job,
+            current_app._get_current_object(),
+            url,
+            format_type,
+            quality,
+            ffmpeg_path,
+            download_request.info_handle,
+            task_meta={"url_hash": _url_hash(url), "format": format_type},
+            client=client_key(),
+            cost=_job_cost(url, format_type, quality),
+        )
+    except QueueFull as exc:
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": str(exc.retry_after)}
+    current_app.logger.info(
+        "Downloader job %s soumis: url_hash=%s format=%s quality=%s",
+        task_id, _url_hash(url), format_type, quality,
+    )
+
+    payload = _job_payload(download_manager.get_task(task_id))
+    return jsonify(payload), 202, {"Location": payload["status_url"]}
+
+
+@downloader_bp.route("/jobs/<task_id>", methods=["GET"])
+def job_status(task_id):
+    task = download_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+    return jsonify(_job_payload(task))
+
+
+@downloader_bp.route("/jobs/<task_id>", methods=["DELETE"])
+def cancel_job(task_id):
+    """Annule un job : retiré de la file s'il attend, yt-dlp interrompu s'il
+    tourne (le dossier de travail est supprimé dans la foulée)."""
+    task = download_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+    if not download_manager.cancel_task(task_id):
+        return jsonify({"error": "Job déjà terminé.", "status": task.status}), 409
+    return jsonify(_job_payload(download_manager.get_task(task_id) or task)), 202
+
+
+@downloader_bp.route("/jobs/<task_id>/events", methods=["GET"])
+def job_events(task_id):
+    """Progression en Server-Sent Events (`progress` puis `done`), même
+    protocole que `/media/jobs/<id>/events`."""
+    task = download_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+
+    def _stream():
+        yield "retry: 1000\n\n"
+        last = None
+        # Chaque changement d'état publié par le worker qui exécute la tâche.
+        for current in download_manager.follow(task_id, SSE_MAX_SECONDS):
+            payload = _job_payload(current)
+            if current.status not in ("pending", "running"):
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                return
+            if payload != last:
+                yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+                last = payload
+
+    return Response(
+        stream_with_context(_stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@downloader_bp.route("/download/<token>", methods=["GET"])
+def download_file(token):
+    """Fichier téléchargé servi par jeton (Range, ETag, X-Accel-Redirect)."""
+    delivery = deliveries.resolve(token)
+    if delivery is None:
+        return jsonify({"error": "Lien de téléchargement invalide ou expiré."}), 404
+    return deliveries.send(delivery)
+
+
+# ─────────────────────────────────────────────────────────────
+# Bulk : POST /bulk (playlist ou liste d'URLs) → archive ZIP en flux
+# ─────────────────────────────────────────────────────────────
+
+_bulk_executor: Optional[ThreadPoolExecutor] = None
+_bulk_executor_lock = threading.Lock()
+
+
+def _get_bulk_executor() -> ThreadPoolExecutor:
+    global _bulk_executor
+    with _bulk_executor_lock:
+        if _bulk_executor is None:
+            _bulk_executor = ThreadPoolExecutor(
+                max_workers=max(1, Config.DOWNLOADER_BULK_WORKERS),
+                thread_name_prefix="toolbox-bulk",
+            )
+        return _bulk_executor
+
+
+@dataclass(frozen=True)
+class BulkRequest:
+    urls: tuple[str, ...] = ()
+    playlist: Optional[str] = None
+    format_type: str = "video"
+    quality: str = "highest"
+
+
+def _parse_bulk_request() -> BulkRequest:
+    """Corps JSON de `/bulk` : `urls` (liste) ou `playlist` (URL), pas les
+    deux (`DownloadFailed` 400)."""
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
+    playlist = data.get("playlist")
+    playlist = playlist.strip() if isinstance(playlist, str) else ""
+    if bool(urls) == bool(playlist):
+        raise DownloadFailed("Indiquez soit 'urls' (liste), soit 'playlist'.", 400)
+    if playlist:
+        if not _is_allowed_url(playlist):
+            raise DownloadFailed(_REJECTION_PAYLOAD["error"], 400)
+        return BulkRequest((), playlist, data.get("format", "video"), data.get("quality", "highest"))
+
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise DownloadFailed("'urls' doit être une liste d'URLs.", 400)
+    urls = [url.strip() for url in urls if url.strip()]
+    if len(urls) > Config.DOWNLOADER_BULK_MAX_ITEMS:
+        raise DownloadFailed(
+            f"{Config.DOWNLOADER_BULK_MAX_ITEMS} vidéos maximum par téléchargement groupé.", 400
+        )
+    rejected = [url for url in urls if not _is_allowed_url(url)]
+    if rejected or not urls:
+        raise DownloadFailed(_REJECTION_PAYLOAD["error"], 400)
+    return BulkRequest(
+        tuple(dict.fromkeys(urls)), None, data.get("format", "video"), data.get("quality", "highest")
+    )
+
+
+def _playlist_urls(url: str, limit: int) -> tuple[List[str], bool]:
+    """URLs des vidéos d'une playlist (extraction « à plat », sans visiter
+    chaque vidéo) : `(urls, tronquée)`. Une URL de vidéo seule donne une liste
+    d'un élément."""
+    opts = {
+        **_common_ydl_opts(),
+        "noplaylist": False,
+        "extract_flat": "in_playlist",
+        "playlistend": limit + 1,
+    }
+    with ydl_pool.lease(opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if not info:
+        raise InfoUnavailable()
+    if info.get("entries") is None:
+        return [info.get("webpage_url") or url], False
+    urls = [
+        entry.get("url") or entry.get("webpage_url")
+        for entry in info["entries"]
+        if entry
+    ]
+    urls = list(dict.fromkeys(u for u in urls if u and _is_allowed_url(u)))
+    return urls[:limit], len(urls) > limit
+
+
+def _bulk_download(app, ffmpeg_path: str, format_type: str, quality: str):
+    """`download(url, dossier, jeton, reste)` d'un élément, exécuté dans le
+    pool bulk ; interrompu quand le client de l'archive se déconnecte ou
+    quand l'élément dépasse `reste` octets (`OverBudget`)."""
+    ydl_opts = _download_opts(ffmpeg_path, format_type, quality)
+
+    def _download(url: str, workdir: str, cancel: CancelToken, max_bytes: int):
+        check = cancel_hook(cancel)
+        hooks = {
+            "progress_hooks": [check, budget_hook(max_bytes)],
+            "postprocessor_hooks": [check],
+        }
+        with app.app_context():
+            try:
+                return artifacts.fetch(
+                    artifact_key(_video_key(url), format_type, quality),
+                    workdir,
+                    lambda: _download_artifact(
+                        url, workdir, ydl_opts, format_type,
+                        hooks=hooks, params={"max_filesize": max_bytes},
+                    ),
+                    on_wait=lambda _leader: cancel.raise_if_cancelled("Téléchargement annulé."),
+                )
+            except DownloadFailed as exc:
+                if exc.status == 413:
+                    raise OverBudget() from exc
+                raise
+
+    return _download
+
+
+@downloader_bp.route("/bulk", methods=["POST"])
+@limiter.limit("2 per minute;10 per hour")
+def bulk_download():
+    """Playlist ou liste d'URLs → ZIP en flux, terminé par `rapport.json`."""
+    ffmpeg_path = Config.get_ffmpeg_path()
+    if not ffmpeg_path:
+        return jsonify({"error": "FFmpeg requis et introuvable."}), 500
+
+    try:
+        bulk_request = _parse_bulk_request()
+    except DownloadFailed as exc:
+        return jsonify({"error": str(exc)}), exc.status
+
+    urls, truncated = list(bulk_request.urls), False
+    if bulk_request.playlist:
+        try:
+            urls, truncated = _playlist_urls(
+                bulk_request.playlist, Config.DOWNLOADER_BULK_MAX_ITEMS
+            )
+        except InfoUnavailable:
+            return jsonify({"error": "Impossible de lire cette playlist."}), 400
+        except Exception as exc:  # noqa: BLE001
+            current_app.logger.warning("Downloader bulk playlist error: %s", exc)
+            status, message = _classify_yt_error(str(exc))
+            return jsonify({"error": message}), status
+        if not urls:
+            return jsonify({"error": "Aucune vidéo téléchargeable dans cette playlist."}), 400
+
+    format_type, quality = bulk_request.format_type, bulk_request.quality
+    current_app.logger.info(
+        "Downloader bulk: %d élément(s) format=%s quality=%s%s",
+        len(urls), format_type, quality, " (playlist tronquée)" if truncated else "",
+    )
+    app = current_app._get_current_object()
+
+    def _describe_error(exc: Exception) -> str:
+        if isinstance(exc, DownloadFailed):
+            return str(exc)
+        app.logger.warning("Downloader bulk élément en échec: %s", exc)
+        return _classify_yt_error(str(exc))[1]
+
+    executor = _get_bulk_executor()
+    entries = iter_bulk_entries(
+        [BulkItem(index, url) for index, url in enumerate(urls, start=1)],
+        _bulk_download(app, ffmpeg_path, format_type, quality),
+        executor=executor,
+        window=executor._max_workers,
+        max_bytes=Config.DOWNLOADER_BULK_MAX_BYTES,
+        workdir_root=current_app.config["TEMP_FOLDER"],
+        describe_error=_describe_error,
+        report={
+            "playlist": bulk_request.playlist,
+            "format": format_type,
+            "quality": quality,
+            "truncated": truncated,
+        },
+    )
+    response = Response(stream_with_context(stream_zip(entries)), mimetype="application/zip")
+    response.headers["Content-Disposition"] = 'attachment; filename="telechargements.zip"'
+    response.headers["X-Bulk-Items"] = str(len(urls))
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,235 @@
+"""Téléchargement en flux direct, sans passer par le disque.
+
+Le mode classique télécharge tout dans un dossier temporaire avant le
+premier octet de `send_file` : le client attend toute la durée du
+téléchargement (et du merge), et le fichier est écrit puis relu. Ici on
+ne garde de yt-dlp que l'extraction et la sélection de format
+(`download=False`), puis :
+
+- `proxy` : un MP4 progressif (un seul fichier HTTP) est relayé tel quel,
+  morceau par morceau, depuis la plateforme ;
+- `ffmpeg` : merge vidéo + audio ou extraction MP3, FFmpeg lit les URLs
+  des formats et écrit sur stdout — MP4 fragmenté (`-movflags
+  frag_keyframe+empty_moov`, pas besoin de revenir écrire l'index en
+  tête) ou MP3.
+
+Les protocoles que ni l'un ni l'autre ne savent lire (segments DASH,
+f4m…) renvoient `None` à `plan_stream` : l'appelant retombe sur le
+téléchargement classique. Même chose si la source refuse la connexion
+avant le premier octet (`open_stream` lève `StreamUnavailable`).
+
+Un flux n'alimente pas le cache d'artefacts et n'a pas de
+`Content-Length` côté FFmpeg (réponse *chunked*).
+"""
+
+from __future__ import annotations
+
+import subprocess
+import tempfile
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.cancellation import kill_process_group, process_group_kwargs
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# Délai max sans données de la plateforme (socket urllib, `-rw_timeout` FFmpeg).
+STREAM_STALL_SECONDS = 30
+
+# Protocoles yt-dlp lisibles par FFmpeg depuis une URL ; seul `http(s)`
+# est relayable sans FFmpeg.
+PIPE_PROTOCOLS = frozenset({"http", "https", "m3u8", "m3u8_native"})
+PROXY_PROTOCOLS = frozenset({"http", "https"})
+
+FRAGMENTED_MP4_FLAGS = "frag_keyframe+empty_moov+default_base_moof"
+
+
+class StreamUnavailable(Exception):
+    """Le flux n'a pas pu démarrer (la source a refusé, FFmpeg est sorti
+    sans rien produire) : retomber sur le téléchargement classique."""
+
+
+@dataclass(frozen=True)
+class StreamSource:
+    url: str
+    headers: Dict[str, str]
+
+
+@dataclass(frozen=True)
+class StreamPlan:
+    mode: str  # "proxy" | "ffmpeg"
+    sources: tuple[StreamSource, ...]
+    # Taille annoncée par yt-dlp, à titre indicatif (la source fait foi).
+    filesize: Optional[int] = None
+
+
+def _source(fmt: Dict[str, Any]) -> Optional[StreamSource]:
+    if fmt.get("protocol", "https") not in PIPE_PROTOCOLS or not fmt.get("url"):
+        return None
+    return StreamSource(fmt["url"], dict(fmt.get("http_headers") or {}))
+
+
+def plan_stream(info: Dict[str, Any], format_type: str) -> Optional[StreamPlan]:
+    """Plan de diffusion pour le format sélectionné par yt-dlp dans `info`
+    (résultat d'un `extract_info(download=False)`), ou None si non diffusable."""
+    parts = info.get("requested_formats") or [info]
+    sources = [_source(part) for part in parts]
+    if not sources or None in sources:
+        return None
+    single = parts[0]
+    if (
+        format_type != "audio"
+        and len(parts) == 1
+        and single.get("ext") == "mp4"
+        and single.get("protocol", "https") in PROXY_PROTOCOLS
+    ):
+        size = single.get("filesize") or single.get("filesize_approx")
+        return StreamPlan("proxy", tuple(sources), int(size) if size else None)
+    return StreamPlan("ffmpeg", tuple(sources))
+
+
+def ffmpeg_command(ffmpeg_path: str, plan: StreamPlan, format_type: str) -> List[str]:
+    """Commande FFmpeg qui lit les sources du plan et écrit sur stdout."""
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin"]
+    for source in plan.sources:
+        if source.headers:
+            command.extend(
+                [
+                    "-headers",
+                    "".join(
+                        f"{name}: {value}\r\n" for name, value in source.headers.items()
+                    ),
+                ]
+            )
+        command.extend(
+            [
+                "-rw_timeout",
+                str(STREAM_STALL_SECONDS * 1_000_000),
+                "-i",
+                source.url,
+            ]
+        )
+    if format_type == "audio":
+        # Mêmes réglages que le post-processeur `FFmpegExtractAudio` (192 kb/s).
+        command.extend(
+            ["-map", "0:a:0", "-vn", "-c:a", "libmp3lame", "-b:a", "192k", "-f", "mp3"]
+        )
+    else:
+        for index in range(len(plan.sources)):
+            command.extend(["-map", str(index)])
+        command.extend(["-c", "copy", "-movflags", FRAGMENTED_MP4_FLAGS, "-f", "mp4"])
+    command.append("pipe:1")
+    return command
+
+
+class _Stream:
+    """Itérateur d'octets dont le premier morceau est déjà lu (les erreurs
+    de démarrage remontent avant l'envoi du statut HTTP)."""
+
+    def __init__(
+        self, first: bytes, rest: Iterator[bytes], length: Optional[int] = None
+    ):
+        self.first = first
+        self.rest = rest
+        self.length = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.first
+        yield from self.rest
+
+    def close(self) -> None:
+        self.rest.close()
+
+
+def _iter_proxy(response) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = response.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        response.close()
+
+
+def _open_proxy(plan: StreamPlan) -> _Stream:
+    source = plan.sources[0]
+    try:
+        response = urllib.request.urlopen(
+            urllib.request.Request(source.url, headers=source.headers),
+            timeout=STREAM_STALL_SECONDS,
+        )
+    except OSError as exc:  # URLError / HTTPError en héritent
+        raise StreamUnavailable(str(exc)) from exc
+    length = response.headers.get("Content-Length")
+    chunks = _iter_proxy(response)
+    first = next(chunks, b"")
+    if not first:
+        chunks.close()
+        raise StreamUnavailable("réponse vide")
+    return _Stream(first, chunks, int(length) if length and length.isdigit() else None)
+
+
+def _stderr_tail(stderr_file, limit: int = 2000) -> str:
+    stderr_file.seek(0)
+    return stderr_file.read()[-limit:].decode("utf-8", "replace")
+
+
+def _iter_ffmpeg(proc, stderr_file, on_error) -> Iterator[bytes]:
+    sent = completed = False
+    try:
+        while True:
+            chunk = proc.stdout.read1(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+            sent = True
+        completed = True
+    finally:
+        if not completed:  # client parti : inutile de continuer l'encodage
+            kill_process_group(proc)
+        proc.stdout.close()
+        returncode = proc.wait()
+        stderr = _stderr_tail(stderr_file) if completed and returncode != 0 else ""
+        stderr_file.close()
+    if not sent:
+        raise StreamUnavailable(
+            f"FFmpeg n'a rien produit (code {returncode}) : {stderr}"
+        )
+    if returncode != 0 and on_error is not None:
+        on_error(returncode, stderr)
+
+
+def _open_ffmpeg(command: List[str], on_error) -> _Stream:
+    # stderr dans un fichier : un pipe non lu bloquerait FFmpeg.
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            **process_group_kwargs(),
+        )
+    except OSError as exc:
+        stderr_file.close()
+        raise StreamUnavailable(str(exc)) from exc
+    chunks = _iter_ffmpeg(proc, stderr_file, on_error)
+    return _Stream(next(chunks), chunks)
+
+
+def open_stream(
+    plan: StreamPlan,
+    ffmpeg_path: str,
+    format_type: str,
+    on_error=None,
+) -> _Stream:
+    """Démarre le flux et lit son premier morceau.
+
+    `on_error(code, stderr)` est appelé si FFmpeg sort en erreur une fois
+    la réponse partie (le statut HTTP ne peut plus changer : le client
+    reçoit un fichier tronqué, on ne peut que le journaliser).
+    """
+    if plan.mode == "proxy":
+        return _open_proxy(plan)
+    return _open_ffmpeg(ffmpeg_command(ffmpeg_path, plan, format_type), on_error)
@@ -0,0 +1,185 @@
+"""Réglages de transfert yt-dlp par plateforme, ajustés au débit observé.
+
+Trois paramètres comptent pour le débit d'un téléchargement :
+
+- `concurrent_fragment_downloads` : fragments HLS / DASH téléchargés en
+  parallèle. Les CDN brident souvent *par connexion* ; plus de fragments
+  en vol = plus de débit, jusqu'à saturer le lien (ou se faire brider) ;
+- `http_chunk_size` : découpe d'un fichier HTTP en requêtes `Range`.
+  YouTube en impose déjà une par format (`downloader_options`, 10 Mo) :
+  on ne la remplace que sur demande explicite ;
+- `buffersize` : taille de lecture initiale (yt-dlp l'ajuste ensuite) ;
+  1 Ko par défaut, soit des milliers d'appels avant d'atteindre un bloc
+  raisonnable sur une connexion rapide.
+
+`PLATFORM_TUNING` fixe un point de départ par plateforme. Ensuite
+`TransferTuner` mesure, via un hook de progression, le débit de chaque
+partie fragmentée terminée (octets / durée) et garde une moyenne mobile
+par plateforme et par niveau de parallélisme (`FRAGMENT_LEVELS`). Le
+niveau le plus rapide est retenu ; un téléchargement sur
+`EXPLORE_EVERY` essaie un niveau voisin pour suivre l'évolution du
+réseau. Les variables `DOWNLOADER_FRAGMENTS`, `DOWNLOADER_HTTP_CHUNK_SIZE`
+et `DOWNLOADER_BUFFER_SIZE` (> 0) figent la valeur correspondante.
+
+Mesures par worker gunicorn, en mémoire (`GET /downloader/metrics`).
+`scripts/bench_fragments.py` compare les réglages sur un flux local.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Optional
+
+FRAGMENT_LEVELS: tuple[int, ...] = (1, 2, 4, 8, 16)
+EXPLORE_EVERY = 8
+# Moyenne mobile exponentielle : poids de la dernière mesure.
+EWMA_ALPHA = 0.3
+# Une partie plus petite mesure surtout la latence de démarrage.
+MIN_SAMPLE_BYTES = 2 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class TransferTuning:
+    fragments: int = 4
+    http_chunk_size: Optional[int] = None  # None : choix de l'extracteur
+    buffersize: int = 64 * 1024
+
+    def as_params(self) -> Dict[str, Any]:
+        """Paramètres yt-dlp, appliqués à l'instance le temps d'un prêt."""
+        return {
+            "concurrent_fragment_downloads": self.fragments,
+            "http_chunk_size": self.http_chunk_size,
+            "buffersize": self.buffersize,
+        }
+
+
+# YouTube sert du DASH découpé par requêtes `Range` ; Vimeo et Dailymotion
+# de l'HLS à petits segments, qui profite de plus de parallélisme ;
+# TikTok un MP4 progressif (un seul fichier, rien à paralléliser).
+PLATFORM_TUNING: Dict[str, TransferTuning] = {
+    "youtube": TransferTuning(fragments=4),
+    "vimeo": TransferTuning(fragments=8),
+    "dailymotion": TransferTuning(fragments=8),
+    "tiktok": TransferTuning(fragments=1),
+}
+DEFAULT_TUNING = TransferTuning()
+
+
+class TransferTuner:
+    def __init__(
+        self,
+        fragments: int = 0,
+        http_chunk_size: int = 0,
+        buffersize: int = 0,
+        explore_every: int = EXPLORE_EVERY,
+    ):
+        # Valeurs imposées par la configuration (0 = automatique).
+        self._overrides: Dict[str, int] = {
+            name: value
+            for name, value in (
+                ("fragments", fragments),
+                ("http_chunk_size", http_chunk_size),
+                ("buffersize", buffersize),
+            )
+            if value > 0
+        }
+        self.explore_every = max(1, explore_every)
+        self._lock = threading.Lock()
+        # plateforme → niveau de parallélisme → débit moyen (octets/s)
+        self._speeds: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._samples: Dict[str, int] = defaultdict(int)
+        self._choices: Dict[str, int] = defaultdict(int)
+
+    def base(self, platform: Optional[str]) -> TransferTuning:
+        return replace(
+            PLATFORM_TUNING.get(platform or "", DEFAULT_TUNING), **self._overrides
+        )
+
+    def choose(self, platform: Optional[str]) -> TransferTuning:
+        """Réglages du prochain téléchargement pour `platform`."""
+        tuning = self.base(platform)
+        if "fragments" in self._overrides:
+            return tuning
+        key = platform or ""
+        with self._lock:
+            self._choices[key] += 1
+            level = self._pick(
+                tuning.fragments, self._speeds.get(key), self._choices[key]
+            )
+        return replace(tuning, fragments=level)
+
+    def _pick(
+        self, default: int, speeds: Optional[Dict[int, float]], count: int
+    ) -> int:
+        if not speeds:
+            return default
+        best = max(speeds, key=speeds.get)
+        if count % self.explore_every:
+            return best
+        index = FRAGMENT_LEVELS.index(best)
+        neighbours = [
+            FRAGMENT_LEVELS[i]
+            for i in (index + 1, index - 1)
+            if 0 <= i < len(FRAGMENT_LEVELS)
+        ]
+        untried = [level for level in neighbours if level not in speeds]
+        if untried:
+            return untried[0]
+        return neighbours[(count // self.explore_every) % len(neighbours)]
+
+    def record(
+        self, platform: Optional[str], fragments: int, bytes_per_second: float
+    ) -> None:
+        if fragments not in FRAGMENT_LEVELS or bytes_per_second <= 0:
+            return
+        key = platform or ""
+        with self._lock:
+            speeds = self._speeds[key]
+            previous = speeds.get(fragments)
+            speeds[fragments] = (
+                bytes_per_second
+                if previous is None
+                else EWMA_ALPHA * bytes_per_second + (1 - EWMA_ALPHA) * previous
+            )
+            self._samples[key] += 1
+
+    def probe(
+        self, platform: Optional[str], tuning: TransferTuning
+    ) -> Callable[[Dict[str, Any]], None]:
+        """Hook de progression yt-dlp qui mesure le débit des parties
+        fragmentées (HLS / DASH) de ce téléchargement."""
+        fragmented = set()
+
+        def _hook(status: Dict[str, Any]) -> None:
+            name = status.get("filename")
+            if status.get("status") == "downloading":
+                if status.get("fragment_count"):
+                    fragmented.add(name)
+                return
+            if status.get("status") != "finished" or name not in fragmented:
+                return
+            size = status.get("total_bytes") or status.get("downloaded_bytes") or 0
+            elapsed = status.get("elapsed") or 0
+            if size >= MIN_SAMPLE_BYTES and elapsed > 0:
+                self.record(platform, tuning.fragments, size / elapsed)
+
+        return _hook
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            platforms = {
+                key
+                or "autre": {
+                    "fragments": max(speeds, key=speeds.get),
+                    "samples": self._samples[key],
+                    "mbps": {
+                        str(level): round(speed * 8 / 1_000_000, 1)
+                        for level, speed in sorted(speeds.items())
+                    },
+                }
+                for key, speeds in self._speeds.items()
+                if speeds
+            }
+        return {"overrides": dict(self._overrides), "platforms": platforms}
@@ -0,0 +1,239 @@
+"""Pool d'instances `YoutubeDL` pré-configurées, par worker gunicorn.
+
+Construire un `YoutubeDL` n'est pas gratuit : table des extracteurs,
+pile HTTP (`RequestDirector`, cookies), sélecteur de format compilé. Et
+la première extraction d'un worker paie en plus l'import réel des
+modules d'extracteurs (chargés paresseusement par yt-dlp). Le pool garde
+donc des instances prêtes, une file par jeu d'options (info, vidéo par
+qualité, audio), et `preload()` importe les extracteurs des plateformes
+autorisées dès le `post_fork` gunicorn (`gunicorn.conf.py`).
+
+Une instance n'est prêtée qu'à un thread à la fois. Ce qui change d'un
+appel à l'autre passe par `lease()` : gabarit de sortie (dossier de
+travail), paramètres lus au moment du téléchargement (réglages de
+transfert de `tuning.py`) et hooks de progression, branchés sur un relais
+installé une fois pour toutes à la construction. Une instance est recyclée après
+`max_uses` prêts pour borner l'état qu'elle accumule (cookies, cache
+d'extracteurs).
+
+`stats()` sépare les prêts « froids » (instance construite pour
+l'occasion) des prêts « chauds » pour mesurer le gain.
+
+`allowed_extractors()` restreint yt-dlp aux extracteurs de ces mêmes
+plateformes (option `allowed_extractors`) : sans elle, chaque instance
+enregistre les ~1 860 extracteurs, générique compris, et la résolution
+d'une URL teste leurs expressions régulières une à une.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from app.core.metrics import LatencyStats
+
+# Extracteurs (clés yt-dlp) couvrant `ALLOWED_VIDEO_HOSTS`. `YoutubeTab`
+# reçoit les URLs `watch?v=…&list=…` avant de déléguer à `Youtube`,
+# `TikTokVM` résout les liens courts `vm.tiktok.com`.
+PLATFORM_EXTRACTORS: Dict[str, tuple[str, ...]] = {
+    "youtube": ("Youtube", "YoutubeTab", "YoutubeYtBe"),
+    "vimeo": ("Vimeo",),
+    "dailymotion": ("Dailymotion",),
+    "tiktok": ("TikTok", "TikTokVM"),
+}
+
+# Playlists des mêmes plateformes (`/downloader/bulk`). Les playlists
+# YouTube passent déjà par `YoutubeTab`. Autorisées mais pas préchargées.
+PLAYLIST_EXTRACTORS: Dict[str, tuple[str, ...]] = {
+    "vimeo": ("VimeoAlbum",),
+    "dailymotion": ("DailymotionPlaylist",),
+}
+
+DEFAULT_MAX_IDLE = 2
+_UNSET = object()
+DEFAULT_MAX_USES = 100
+
+
+@lru_cache(maxsize=1)
+def allowed_extractors() -> tuple[str, ...]:
+    """Motifs `allowed_extractors` (noms `IE_NAME`, comparés en entier et
+    sans casse par yt-dlp) des extracteurs de `PLATFORM_EXTRACTORS` et
+    `PLAYLIST_EXTRACTORS`."""
+    from yt_dlp.extractor import get_info_extractor
+
+    names = []
+    for keys in (*PLATFORM_EXTRACTORS.values(), *PLAYLIST_EXTRACTORS.values()):
+        for key in keys:
+            try:
+                names.append(re.escape(get_info_extractor(key).IE_NAME))
+            except KeyError:  # extracteur renommé ou retiré dans cette version
+                continue
+    return tuple(names)
+
+
+def preload_extractors(ydl) -> List[str]:
+    """Instancie (et donc importe) les extracteurs des plateformes autorisées."""
+    loaded = []
+    for keys in PLATFORM_EXTRACTORS.values():
+        for key in keys:
+            try:
+                ydl.get_info_extractor(key)
+            except Exception:  # noqa: BLE001 - extracteur absent de cette version
+                continue
+            loaded.append(key)
+    return loaded
+
+
+class _Pooled:
+    """Instance + relais de hooks + compteur d'utilisations."""
+
+    def __init__(self, ydl) -> None:
+        self.ydl = ydl
+        self.uses = 0
+        self.progress_hooks: List[Callable] = []
+        self.postprocessor_hooks: List[Callable] = []
+        ydl.add_progress_hook(self._relay_progress)
+        ydl.add_postprocessor_hook(self._relay_postprocessor)
+
+    def _relay_progress(self, status: Dict[str, Any]) -> None:
+        for hook in list(self.progress_hooks):
+            hook(status)
+
+    def _relay_postprocessor(self, status: Dict[str, Any]) -> None:
+        for hook in list(self.postprocessor_hooks):
+            hook(status)
+
+
+def _options_key(opts: Dict[str, Any]) -> str:
+    return json.dumps(opts, sort_keys=True, default=str)
+
+
+class YdlPool:
+    def __init__(
+        self,
+        factory: Callable[[Dict[str, Any]], Any],
+        max_idle: int = DEFAULT_MAX_IDLE,
+        max_uses: int = DEFAULT_MAX_USES,
+    ):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self._lock = threading.Lock()
+        self._idle: Dict[str, Deque[_Pooled]] = defaultdict(deque)
+        self._stats = {"created": 0, "reused": 0, "recycled": 0}
+        self.cold = LatencyStats()
+        self.warm = LatencyStats()
+
+    def _create(self, opts: Dict[str, Any]) -> _Pooled:
+        pooled = _Pooled(self.factory(dict(opts)))
+        with self._lock:
+            self._stats["created"] += 1
+        return pooled
+
+    def _release(self, key: str, pooled: _Pooled, reusable: bool) -> None:
+        pooled.uses += 1
+        with self._lock:
+            idle = self._idle[key]
+            if reusable and pooled.uses < self.max_uses and len(idle) < self.max_idle:
+                idle.append(pooled)
+                return
+            self._stats["recycled"] += 1
+        try:
+            pooled.ydl.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    @contextmanager
+    def lease(
+        self,
+        opts: Dict[str, Any],
+        *,
+        outtmpl: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        progress_hooks: Iterable[Callable] = (),
+        postprocessor_hooks: Iterable[Callable] = (),
+    ) -> Iterator[Any]:
+        """Prête une instance configurée avec `opts` (hors gabarit, hooks et
+        `params`, fournis à part parce qu'ils changent à chaque appel).
+
+        `params` ne doit contenir que des options lues par yt-dlp au moment
+        du téléchargement (pas à la construction, comme `format`)."""
+        started = time.monotonic()
+        key = _options_key(opts)
+        with self._lock:
+            idle = self._idle[key]
+            pooled = idle.pop() if idle else None
+            if pooled is not None:
+                self._stats["reused"] += 1
+        cold = pooled is None
+        if cold:
+            pooled = self._create(opts)
+
+        ydl = pooled.ydl
+        templates = ydl.params.get("outtmpl")
+        previous = templates.get("default") if isinstance(templates, dict) else None
+        if outtmpl is not None and isinstance(templates, dict):
+            templates["default"] = outtmpl
+        overridden = {name: ydl.params.get(name, _UNSET) for name in (params or {})}
+        ydl.params.update(params or {})
+        pooled.progress_hooks[:] = list(progress_hooks)
+        pooled.postprocessor_hooks[:] = list(postprocessor_hooks)
+        reusable = True
+        try:
+            yield ydl
+        except BaseException as exc:
+            # Une erreur yt-dlp « normale » (vidéo privée…) laisse l'instance
+            # saine ; une interruption (arrêt du worker) ne la remet pas en file.
+            reusable = isinstance(exc, Exception)
+            raise
+        finally:
+            pooled.progress_hooks.clear()
+            pooled.postprocessor_hooks.clear()
+            if outtmpl is not None and isinstance(templates, dict):
+                templates["default"] = previous
+            for name, value in overridden.items():
+                if value is _UNSET:
+                    ydl.params.pop(name, None)
+                else:
+                    ydl.params[name] = value
+            (self.cold if cold else self.warm).add(time.monotonic() - started)
+            self._release(key, pooled, reusable)
+
+    def fill(self, opts: Dict[str, Any], count: Optional[int] = None) -> int:
+        """Construit des instances jusqu'à `count` (défaut `max_idle`) au repos."""
+        key = _options_key(opts)
+        target = min(self.max_idle, self.max_idle if count is None else count)
+        created = 0
+        while True:
+            with self._lock:
+                if len(self._idle[key]) >= target:
+                    return created
+            pooled = self._create(opts)
+            created += 1
+            with self._lock:
+                self._idle[key].append(pooled)
+
+    def preload(self, opts: Dict[str, Any]) -> List[str]:
+        """Remplit la file de `opts` et importe les extracteurs autorisés."""
+        self.fill(opts)
+        with self.lease(opts) as ydl:
+            return preload_extractors(ydl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = {
+                "max_idle": self.max_idle,
+                "max_uses": self.max_uses,
+                "option_sets": len(self._idle),
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                **self._stats,
+            }
+        snapshot["cold"] = self.cold.as_dict()
+        snapshot["warm"] = self.warm.as_dict()
+        return snapshot
@@ -28,7 +28,7 @@ from app import __version__
 from app.core.exceptions import register_error_handlers
 from app.core.rate_limit import limiter
 from app.core.security_headers import register_security_headers
-from app.core.uploads import configure_pillow_limits
+from app.core.uploads import DiskSpoolRequest, configure_pillow_limits
 from config import Config
 
 from .downloader.routes import downloader_bp
@@ -222,6 +222,8 @@ def create_app(config_class: Optional[object] = None) -> Flask:
         template_folder="../templates",
         static_folder="../static",
     )
+    # Uploads des vues `@spool_to_disk` écrits directement dans TEMP_FOLDER.
+    app.request_class = DiskSpoolRequest
     app.config.from_object(config_class or Config)
     Config.init_app(app)
 
@@ -355,8 +357,14 @@ def create_app(config_class: Optional[object] = None) -> Flask:
     API_ROUTE_PREFIXES = (
         "/downloader/info",
         "/downloader/download",
+        "/downloader/jobs",
+        "/downloader/bulk",
+        "/downloader/metrics",
         "/media/convert",
         "/media/batch",
+        "/media/jobs",
+        "/media/metrics",
+        "/media/download",
         "/pdf/status",
         "/essentials/api",
     )
@@ -400,6 +408,7 @@ def create_app(config_class: Optional[object] = None) -> Flask:
             "app_version": __version__,
             "stirling_enabled": bool(app.config.get("STIRLING_PDF_URL")),
             "librespeed_enabled": bool(app.config.get("LIBRESPEED_URL")),
+            "job_events_sse": bool(app.config.get("JOB_EVENTS_SSE")),
             "essentials_tools_all": ESSENTIALS_TOOLS,
             "essentials_tools_nav": essentials_nav_tools(limit=6),
         }
@@ -0,0 +1,288 @@
+"""Pilotage de FFmpeg : sonde ffprobe et canal de progression.
+
+FFmpeg est lancé avec `-progress pipe:1 -nostats` : il écrit sur stdout
+des blocs `clé=valeur` terminés par une ligne `progress=continue` (ou
+`progress=end`). On lit ce pipe en non bloquant et on parse au fil de
+l'eau `out_time_us` / `speed` / `fps`. Rapporté à la durée sondée par
+ffprobe, ça donne un pourcentage réel (plus d'overlay factice côté UI).
+
+Le même canal sert à abandonner tôt un encodage trop lent : si la vitesse
+observée projette une fin au-delà du timeout, on tue FFmpeg sans attendre
+les 180 s. Idem si le `CancelToken` passé est levé (job annulé, client
+parti) : FFmpeg tourne dans son propre groupe de processus, tué en bloc.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import selectors
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional, Sequence
+
+from app.core.cancellation import CancelToken, kill_process_group, process_group_kwargs
+
+FFMPEG_TIMEOUT_SECONDS: int = 180
+# Délai avant de juger la vitesse d'encodage (démarrage, probe des streams).
+SLOW_ENCODE_GRACE_SECONDS: float = 10.0
+PROGRESS_ARGS: tuple[str, ...] = ("-progress", "pipe:1", "-nostats")
+
+
+class FFmpegError(RuntimeError):
+    """Échec FFmpeg (code retour non nul). `stderr` contient la fin du log."""
+
+    def __init__(self, message: str, stderr: str = ""):
+        super().__init__(message)
+        self.stderr = stderr
+
+
+class FFmpegTimeout(FFmpegError):
+    """Timeout dépassé, ou projeté comme tel d'après la vitesse observée."""
+
+
+@dataclass(frozen=True)
+class FFmpegProgress:
+    out_time: float = 0.0  # secondes encodées
+    speed: Optional[float] = None  # 1.0 = temps réel
+    fps: Optional[float] = None
+    done: bool = False
+
+    def percent(self, duration: Optional[float]) -> Optional[int]:
+        if not duration or duration <= 0:
+            return None
+        if self.done:
+            return 100
+        return max(0, min(99, int(self.out_time / duration * 100)))
+
+
+def _parse_float(value: str) -> Optional[float]:
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:  # "N/A"
+        return None
+
+
+class ProgressParser:
+    """Parseur incrémental du flux `-progress`.
+
+    Les lectures non bloquantes coupent les lignes n'importe où : on garde
+    le reliquat entre deux appels à `feed()`.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self.state = FFmpegProgress()
+
+    def feed(self, chunk: bytes) -> List[FFmpegProgress]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        snapshots: List[FFmpegProgress] = []
+        for raw in lines:
+            key, sep, value = raw.decode("ascii", "replace").strip().partition("=")
+            if not sep:
+                continue
+            if key in ("out_time_us", "out_time_ms"):
+                # `out_time_ms` est historiquement en microsecondes aussi.
+                micros = _parse_float(value)
+                if micros is not None:
+                    self.state = replace(self.state, out_time=micros / 1_000_000)
+            elif key == "speed":
+                self.state = replace(self.state, speed=_parse_float(value))
+            elif key == "fps":
+                self.state = replace(self.state, fps=_parse_float(value))
+            elif key == "progress":
+                self.state = replace(self.state, done=value == "end")
+                snapshots.append(self.state)
+        return snapshots
+
+
+def get_ffprobe_path(ffmpeg_path: Optional[str]) -> Optional[str]:
+    """ffprobe est livré à côté de ffmpeg (paquet Debian, builds Windows)."""
+    if ffmpeg_path:
+        directory = os.path.dirname(ffmpeg_path)
+        for name in ("ffprobe", "ffprobe.exe"):
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return shutil.which("ffprobe")
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    index: int
+    codec_type: str  # "video", "audio", "subtitle", "data"…
+    codec_name: str
+    attached_pic: bool = False  # pochette embarquée (mkv/mp3), pas une vidéo
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    duration: Optional[float]
+    streams: tuple[StreamInfo, ...] = ()
+
+    def first(self, codec_type: str) -> Optional[StreamInfo]:
+        for stream in self.streams:
+            if stream.codec_type == codec_type and not stream.attached_pic:
+                return stream
+        return None
+
+
+def parse_probe_output(raw: str) -> MediaInfo:
+    """Interprète la sortie `ffprobe -of json` de `probe_media`."""
+    data = json.loads(raw or "{}")
+    duration = _parse_float(str(data.get("format", {}).get("duration", "N/A")))
+    streams = tuple(
+        StreamInfo(
+            index=int(stream.get("index", 0)),
+            codec_type=stream.get("codec_type", ""),
+            codec_name=stream.get("codec_name", ""),
+            attached_pic=bool(stream.get("disposition", {}).get("attached_pic")),
+        )
+        for stream in data.get("streams", [])
+    )
+    return MediaInfo(duration if duration and duration > 0 else None, streams)
+
+
+def probe_media(ffprobe_path: Optional[str], input_path: str) -> Optional[MediaInfo]:
+    """Durée + codecs des streams en un seul appel ffprobe (None si échec)."""
+    if not ffprobe_path:
+        return None
+    try:
+        result = subprocess.run(
+            [
+                ffprobe_path,
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration:stream=index,codec_type,codec_name"
+                ":stream_disposition=attached_pic",
+                "-of",
+                "json",
+                input_path,
+            ],
+            capture_output=True,
+            text=True,
+            timeout=15,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return parse_probe_output(result.stdout)
+    except (ValueError, TypeError):
+        return None
+
+
+def _tail(stderr_file, limit: int = 4000) -> str:
+    stderr_file.seek(0, os.SEEK_END)
+    size = stderr_file.tell()
+    stderr_file.seek(max(0, size - limit))
+    return stderr_file.read().decode("utf-8", "replace")
+
+
+def _timeout_error(timeout: float) -> FFmpegTimeout:
+    return FFmpegTimeout(
+        f"La conversion a pris trop de temps (limite: {int(timeout)} secondes)"
+    )
+
+
+def run_ffmpeg(
+    command: Sequence[str],
+    *,
+    duration: Optional[float] = None,
+    on_progress: Optional[Callable[[FFmpegProgress], None]] = None,
+    timeout: float = FFMPEG_TIMEOUT_SECONDS,
+    cancel: Optional[CancelToken] = None,
+) -> None:
+    """Exécute `command` (qui doit contenir `PROGRESS_ARGS`) et suit sa progression.
+
+    Lève `FFmpegTimeout` si le timeout est dépassé ou projeté comme tel,
+    `FFmpegError` si FFmpeg sort en erreur, `Cancelled` si `cancel` est
+    levé (vérifié au moins toutes les 0,5 s).
+    """
+    started = time.monotonic()
+    # stderr part dans un fichier : un pipe non lu bloquerait FFmpeg une
+    # fois son buffer plein (les logs d'encodage sont verbeux).
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(
+            list(command),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            **process_group_kwargs(),
+        )
+        parser = ProgressParser()
+        fd = proc.stdout.fileno()
+        selector = None
+        if os.name != "nt":
+            # Windows ne sait pas faire de select() sur un pipe : lecture
+            # bloquante là-bas, FFmpeg émet de toute façon toutes les ~0.5 s.
+            os.set_blocking(fd, False)
+            selector = selectors.DefaultSelector()
+            selector.register(fd, selectors.EVENT_READ)
+
+        try:
+            while True:
+                elapsed = time.monotonic() - started
+                if elapsed > timeout:
+                    raise _timeout_error(timeout)
+                if cancel is not None:
+                    cancel.raise_if_cancelled("Conversion annulée.")
+                if selector is not None and not selector.select(timeout=0.5):
+                    continue
+                try:
+                    chunk = os.read(fd, 65536)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    break  # EOF : FFmpeg a fermé stdout
+
+                for snapshot in parser.feed(chunk):
+                    if on_progress is not None:
+                        on_progress(snapshot)
+                    _abort_if_too_slow(snapshot, duration, elapsed, timeout)
+
+            try:
+                returncode = proc.wait(
+                    timeout=max(1.0, timeout - (time.monotonic() - started))
+                )
+            except subprocess.TimeoutExpired:
+                # stdout fermé, mais FFmpeg ne rend pas la main : même
+                # issue qu'un dépassement pendant l'encodage.
+                raise _timeout_error(timeout) from None
+        except BaseException:
+            kill_process_group(proc)
+            proc.wait()
+            raise
+        finally:
+            if selector is not None:
+                selector.close()
+            proc.stdout.close()
+
+        if returncode != 0:
+            stderr = _tail(stderr_file)
+            raise FFmpegError(f"FFmpeg a échoué (code {returncode})", stderr)
+
+
+def _abort_if_too_slow(
+    snapshot: FFmpegProgress,
+    duration: Optional[float],
+    elapsed: float,
+    timeout: float,
+) -> None:
+    if snapshot.done or not duration or not snapshot.speed:
+        return
+    if elapsed < SLOW_ENCODE_GRACE_SECONDS:
+        return
+    remaining = max(0.0, duration - snapshot.out_time) / snapshot.speed
+    if elapsed + remaining > timeout:
+        raise FFmpegTimeout(
+            f"Encodage trop lent (x{snapshot.speed:.2f}) : fin estimée au-delà "
+            f"de la limite de {int(timeout)} secondes, conversion abandonnée."
+        )
@@ -0,0 +1,85 @@
+"""Encodage d'images avec Pillow, sans dépendance à Flask.
+
+Ce module est importé par les processus du pool CPU (`app/core/cpu_pool.py`,
+démarrés en `spawn`) : il ne doit tirer que Pillow, pas l'application.
+`encode_image_file` y tourne sur des chemins de fichiers (entrée déjà
+sur disque, sortie écrite sur disque) : seuls les chemins et les
+options traversent la frontière entre processus, jamais les octets.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from typing import Optional
+
+from PIL import Image
+
+
+def warm() -> None:
+    """Initialiseur des processus du pool : charge tous les plugins de
+    format Pillow avant la première image."""
+    Image.init()
+
+
+def process_image(img, output_format, quality=85):
+    """Traite une image"""
+    output = io.BytesIO()
+
+    try:
+        if output_format == "JPEG":
+            if img.mode in ("RGBA", "P"):
+                img = img.convert("RGB")
+            img.save(output, format=output_format, quality=quality, optimize=True)
+        else:
+            img.save(output, format=output_format, optimize=True)
+
+        output.seek(0)
+        return output
+    except Exception as e:
+        raise ValueError(f"Erreur lors du traitement de l'image: {str(e)}")
+
+
+def fit_within(img, max_width=None, max_height=None):
+    """Réduit `img` (sur place) pour tenir dans `max_width` × `max_height`.
+
+    À appeler juste après `Image.open`, avant tout accès aux pixels :
+    `thumbnail` commence par `draft()` (un JPEG est alors décodé
+    directement à 1/2, 1/4 ou 1/8 par libjpeg), puis `reducing_gap` fait
+    un `reduce()` entier peu coûteux avant le rééchantillonnage final.
+    Une image déjà plus petite n'est jamais agrandie.
+    """
+    if not max_width and not max_height:
+        return img
+    width, height = img.size
+    scale = min((max_width or width) / width, (max_height or height) / height)
+    if scale >= 1:
+        return img
+    # Boîte complète même si une seule dimension est bornée : `draft()`
+    # exige que les deux côtés tiennent pour choisir une échelle réduite.
+    box = (max(1, round(width * scale)), max(1, round(height * scale)))
+    img.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return img
+
+
+def encode_image_file(
+    input_path: str,
+    output_path: str,
+    output_format: str,
+    quality: int = 85,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> str:
+    """Décode `input_path`, le réduit si demandé et écrit `output_path`.
+
+    L'écriture passe par un fichier temporaire renommé à la fin : une
+    sortie présente est toujours complète.
+    """
+    with Image.open(input_path) as img:
+        fit_within(img, max_width, max_height)
+        output = process_image(img, output_format.upper(), quality)
+    partial = f"{output_path}.part"
+    with open(partial, "wb") as fh:
+        fh.write(output.getbuffer())
+    os.replace(partial, output_path)
+    return output_path
@@ -0,0 +1,70 @@
+"""Profils d'encodage vidéo : compromis vitesse / taille.
+
+Un profil regroupe les réglages de vitesse des encodeurs (preset libx264,
+deadline / cpu-used libvpx-vp9). Les threads, eux, sont dérivés du quota
+CPU du conteneur (`Config.available_cpus()`) : laisser FFmpeg se caler sur
+le nombre de cœurs de l'hôte sur-souscrit un conteneur limité à 0.75 CPU.
+
+La qualité visuelle reste pilotée par le CRF (paramètre `quality`) : un
+profil plus lent donne un fichier plus petit à qualité comparable.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    name: str
+    x264_preset: str
+    vp9_deadline: str
+    vp9_cpu_used: int
+
+
+PROFILES = {
+    "fast": EncoderProfile("fast", "veryfast", "realtime", 8),
+    "balanced": EncoderProfile("balanced", "faster", "good", 4),
+    "small": EncoderProfile("small", "slow", "good", 2),
+}
+DEFAULT_PROFILE = "balanced"
+
+
+def resolve_profile(name: Optional[str] = None) -> EncoderProfile:
+    """Profil demandé, sinon celui de `MEDIA_ENCODER_PROFILE`.
+
+    Lève `KeyError` pour un nom inconnu explicitement demandé ; une valeur
+    de configuration invalide retombe sur `DEFAULT_PROFILE`.
+    """
+    if name:
+        return PROFILES[name.lower()]
+    return PROFILES.get(Config.MEDIA_ENCODER_PROFILE.lower(), PROFILES[DEFAULT_PROFILE])
+
+
+def encoder_threads() -> int:
+    return Config.available_cpus()
+
+
+def encoder_speed_args(codec: str, profile: EncoderProfile, threads: int) -> List[str]:
+    """Options de vitesse / parallélisme pour `codec` (hors CRF et audio)."""
+    if codec == "libx264":
+        return ["-preset", profile.x264_preset, "-threads", str(threads)]
+    if codec == "libvpx-vp9":
+        # Colonnes de tuiles en log2 : 1 thread → 0, 2 → 1, 4 → 2…
+        tile_columns = min(threads.bit_length() - 1, 4)
+        return [
+            "-deadline",
+            profile.vp9_deadline,
+            "-cpu-used",
+            str(profile.vp9_cpu_used),
+            "-row-mt",
+            "1",
+            "-tile-columns",
+            str(tile_columns),
+            "-threads",
+            str(threads),
+        ]
+    return []
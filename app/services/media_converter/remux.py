@@ -0,0 +1,104 @@
+"""Remux sans ré-encodage quand les codecs source conviennent déjà.
+
+Un MKV H.264/AAC converti en MP4 n'a pas besoin de passer par libx264 :
+`-c copy` réécrit simplement le conteneur (quelques secondes d'I/O au
+lieu de minutes de CPU). La décision se prend stream par stream d'après
+la sonde ffprobe : un stream compatible est copié, seul l'autre est
+ré-encodé.
+
+Le remux n'est tenté que si le conteneur change et que le client n'a
+demandé ni qualité ni profil (`process_video(remux=...)`) : sinon la
+sortie serait identique à la source.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+
+from .ffmpeg import MediaInfo, StreamInfo
+
+# Codecs acceptés tels quels par conteneur de sortie. Volontairement
+# restreint à ce que les navigateurs et lecteurs courants lisent.
+# Un conteneur absent de la table est toujours ré-encodé.
+COPYABLE_CODECS: Dict[str, Dict[str, FrozenSet[str]]] = {
+    "mp4": {
+        "video": frozenset({"h264", "hevc", "av1"}),
+        "audio": frozenset({"aac", "mp3"}),
+    },
+    "mov": {
+        "video": frozenset({"h264", "hevc", "prores"}),
+        "audio": frozenset({"aac", "mp3", "alac", "pcm_s16le"}),
+    },
+    "webm": {
+        "video": frozenset({"vp8", "vp9", "av1"}),
+        "audio": frozenset({"opus", "vorbis"}),
+    },
+    "mkv": {
+        "video": frozenset({"h264", "hevc", "av1", "vp8", "vp9", "mpeg4"}),
+        "audio": frozenset({"aac", "mp3", "opus", "vorbis", "flac", "ac3", "eac3"}),
+    },
+}
+
+
+@dataclass(frozen=True)
+class StreamPlan:
+    """Streams retenus et, pour chacun, copie ou ré-encodage."""
+
+    container: str
+    video: Optional[StreamInfo]
+    audio: Optional[StreamInfo]
+    copy_video: bool = False
+    copy_audio: bool = False
+
+    @property
+    def mode(self) -> str:
+        """`remux` (tout copié), `partial` ou `transcode` (pour les logs)."""
+        copies = [
+            copy
+            for stream, copy in (
+                (self.video, self.copy_video),
+                (self.audio, self.copy_audio),
+            )
+            if stream is not None
+        ]
+        if copies and all(copies):
+            return "remux"
+        return "partial" if any(copies) else "transcode"
+
+    def map_args(self) -> List[str]:
+        # Map explicite : pas de sous-titres ni de pochette embarqués
+        # qu'un `-c copy` tenterait de mettre dans un conteneur qui les refuse.
+        args: List[str] = []
+        for stream in (self.video, self.audio):
+            if stream is not None:
+                args += ["-map", f"0:{stream.index}"]
+        return args
+
+    def copy_args(self, codec_type: str) -> List[str]:
+        args = [f"-c:{codec_type[0]}", "copy"]
+        if codec_type == "video" and self.container in ("mp4", "mov"):
+            stream = self.video
+            if stream is not None and stream.codec_name == "hevc":
+                # Sans le tag hvc1, QuickTime / Safari refusent le HEVC en MP4.
+                args += ["-tag:v", "hvc1"]
+        return args
+
+
+def plan_streams(info: Optional[MediaInfo], container: str) -> Optional[StreamPlan]:
+    """Plan de copie pour `container`, ou None si rien n'est copiable
+    (sonde indisponible, conteneur inconnu, aucun stream compatible)."""
+    codecs = COPYABLE_CODECS.get(container)
+    if info is None or codecs is None:
+        return None
+    video, audio = info.first("video"), info.first("audio")
+    if video is None and audio is None:
+        return None
+    plan = StreamPlan(
+        container=container,
+        video=video,
+        audio=audio,
+        copy_video=video is not None and video.codec_name in codecs["video"],
+        copy_audio=audio is not None and audio.codec_name in codecs["audio"],
+    )
+    return plan if plan.mode != "transcode" else None
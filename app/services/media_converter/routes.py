@@ -1,19 +1,59 @@
+import hashlib
 import io
+import json
 import os
-import subprocess
+import threading
 import uuid
-import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Optional
 
-from flask import (Blueprint, current_app, jsonify, render_template, request,
-                   send_file)
+from flask import (Blueprint, Response, current_app, jsonify, render_template,
+                   request, send_file, stream_with_context, url_for)
 from PIL import Image
 from werkzeug.utils import secure_filename
 
-from app.core.rate_limit import limiter
-from app.core.uploads import UploadRejected, validate_batch, validate_upload
+from app.core.cancellation import Cancelled, disconnect_token
+from app.core.delivery import DeliveryStore, send_produced_file
+from app.core.filecache import DiskLRUCache, cache_key
+from app.core.rate_limit import client_key, limiter
+from app.core.slots import ProcessSlots
+from app.core.uploads import (UploadRejected, save_upload, spool_to_disk,
+                              validate_batch, validate_upload)
+from app.core.zipstream import stream_zip
+from config import Config
+
+from .ffmpeg import (FFMPEG_TIMEOUT_SECONDS, PROGRESS_ARGS, FFmpegError,
+                     FFmpegTimeout, get_ffprobe_path, probe_media, run_ffmpeg)
+from .imaging import encode_image_file, fit_within, process_image
+from .profiles import (PROFILES, encoder_speed_args, encoder_threads,
+                       resolve_profile)
+from .remux import plan_streams
+from .scheduler import QueueFull, estimate_cost
+from .task_manager import task_manager
 
 media_bp = Blueprint("media", __name__)
 
+# Server-Sent Events : durée max d'un flux (EventSource se reconnecte).
+SSE_MAX_SECONDS = 25
+
+# Borne de `max_width` / `max_height` (au-delà, ce n'est plus une réduction).
+MAX_DIMENSION = 16384
+
+# Résultats de conversion réutilisables : clé = sha256 de l'entrée + options.
+conversion_cache = DiskLRUCache(
+    os.path.join(Config.TEMP_FOLDER, "cache"), Config.MEDIA_CACHE_MAX_BYTES
+)
+# Sorties de `/convert` conservées le temps d'un téléchargement (ou d'une reprise).
+deliveries = DeliveryStore(
+    os.path.join(Config.TEMP_FOLDER, "deliveries"), Config.DELIVERY_TTL_SECONDS
+)
+# FFmpeg simultanés, tous workers gunicorn confondus.
+ffmpeg_slots = ProcessSlots(
+    os.path.join(Config.TEMP_FOLDER, "slots"),
+    Config.MEDIA_FFMPEG_SLOTS or Config.available_cpus(),
+)
+
 
 @media_bp.route("/")
 def index():
@@ -28,24 +68,6 @@ def is_video(filename: str) -> bool:
     )
 
 
-def process_image(img, output_format, quality=85):
-    """Traite une image"""
-    output = io.BytesIO()
-
-    try:
-        if output_format == "JPEG":
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            img.save(output, format=output_format, quality=quality, optimize=True)
-        else:
-            img.save(output, format=output_format, optimize=True)
-
-        output.seek(0)
-        return output
-    except Exception as e:
-        raise ValueError(f"Erreur lors du traitement de l'image: {str(e)}")
-
-
 def _quality_to_crf(quality: int, codec: str = "libx264") -> int:
     """Map quality (0-100, plus haut = meilleure qualité) vers un CRF FFmpeg.
 
@@ -58,8 +80,28 @@ def _quality_to_crf(quality: int, codec: str = "libx264") -> int:
     return 32 - int((quality / 100) * 17)
 
 
-def process_video(input_path, output_path, quality=85):
-    """Conversion vidéo avec FFmpeg. `quality` ∈ [0, 100]."""
+def process_video(
+    input_path,
+    output_path,
+    quality=85,
+    on_progress=None,
+    profile=None,
+    cancel=None,
+    remux=True,
+):
+    """Conversion vidéo avec FFmpeg. `quality` ∈ [0, 100].
+
+    `profile` : nom d'un profil de `profiles.PROFILES` (vitesse / taille),
+    par défaut `MEDIA_ENCODER_PROFILE`.
+
+    `remux` : autorise la copie des streams déjà compatibles, uniquement
+    si le conteneur change. False quand le client a demandé une qualité
+    ou un profil : la sortie est alors toujours ré-encodée.
+
+    `on_progress(percent, progress)` est appelé à chaque bloc `-progress`
+    émis par FFmpeg (`percent` vaut None si la durée n'a pas pu être sondée).
+    `cancel` : `CancelToken` qui interrompt FFmpeg (`Cancelled`).
+    """
     try:
         from config import Config as _Config
 
@@ -67,42 +109,71 @@ def process_video(input_path, output_path, quality=85):
         if not ffmpeg_path or not os.path.exists(ffmpeg_path):
             raise ValueError("FFmpeg n'est pas disponible")
 
-        command = [ffmpeg_path, "-i", input_path, "-y"]
+        command = [ffmpeg_path, "-i", input_path, "-y", *PROGRESS_ARGS]
+        encoder_profile = resolve_profile(profile)
+        threads = encoder_threads()
 
-        output_format = os.path.splitext(output_path)[1][1:]
+        output_format = os.path.splitext(output_path)[1][1:].lower()
+        video_args: list[str] = []
+        audio_args: list[str] = []
         if output_format == "mp4":
             crf = _quality_to_crf(quality, "libx264")
-            command.extend(
-                [
-                    "-c:v", "libx264",
-                    "-preset", "medium",
-                    "-crf", str(crf),
-                    "-c:a", "aac",
-                    "-b:a", "128k",
-                ]
-            )
+            video_args = [
+                "-c:v", "libx264",
+                *encoder_speed_args("libx264", encoder_profile, threads),
+                "-crf", str(crf),
+            ]
+            audio_args = ["-c:a", "aac", "-b:a", "128k"]
         elif output_format == "webm":
             crf = _quality_to_crf(quality, "libvpx-vp9")
-            command.extend(
-                [
-                    "-c:v", "libvpx-vp9",
-                    "-crf", str(crf),
-                    "-b:v", "0",
-                    "-c:a", "libopus",
-                    "-deadline", "good",
-                    "-cpu-used", "1",
-                ]
-            )
+            video_args = [
+                "-c:v", "libvpx-vp9",
+                "-crf", str(crf),
+                "-b:v", "0",
+                *encoder_speed_args("libvpx-vp9", encoder_profile, threads),
+            ]
+            audio_args = ["-c:a", "libopus"]
+
+        # Streams déjà compatibles avec le conteneur cible : copiés tels quels.
+        # Même conteneur en entrée et en sortie : le client veut recompresser.
+        media_info = probe_media(get_ffprobe_path(ffmpeg_path), input_path)
+        duration = media_info.duration if media_info else None
+        input_format = os.path.splitext(input_path)[1][1:].lower()
+        plan = None
+        if remux and input_format != output_format:
+            plan = plan_streams(media_info, output_format)
+        if plan is not None:
+            command.extend(plan.map_args())
+            if plan.copy_video:
+                video_args = plan.copy_args("video")
+            if plan.copy_audio:
+                audio_args = plan.copy_args("audio")
+        command.extend(video_args + audio_args)
+        if output_format in ("mp4", "mov"):
+            # moov en tête de fichier : lecture progressive dès le téléchargement.
+            command.extend(["-movflags", "+faststart"])
 
         command.append(output_path)
 
         current_app.logger.info("Commande FFmpeg: %s", " ".join(command))
-        current_app.logger.info("Début conversion - timeout: 180 secondes")
-
-        _ = subprocess.run(
-            command, capture_output=True, text=True, check=True, timeout=180
+        current_app.logger.info(
+            "Début conversion - durée source: %s s, mode: %s, profil: %s, "
+            "threads: %s, timeout: %s secondes",
+            f"{duration:.1f}" if duration else "?",
+            plan.mode if plan else "transcode",
+            encoder_profile.name,
+            threads,
+            FFMPEG_TIMEOUT_SECONDS,
         )
 
+        def _report(progress):
+            if on_progress is not None:
+                on_progress(progress.percent(duration), progress)
+
+        # Encodages bornés pour tout le conteneur, pas seulement ce worker.
+        with ffmpeg_slots.acquire(cancel):
+            run_ffmpeg(command, duration=duration, on_progress=_report, cancel=cancel)
+
         if not os.path.exists(output_path):
             raise ValueError("La conversion n'a pas généré de fichier de sortie")
 
@@ -113,10 +184,10 @@ def process_video(input_path, output_path, quality=85):
 
         return output_path
 
-    except subprocess.TimeoutExpired:
-        current_app.logger.error("Timeout de conversion FFmpeg (10 minutes)")
-        raise ValueError("La conversion a pris trop de temps (limite: 10 minutes)")
-    except subprocess.CalledProcessError as e:
+    except FFmpegTimeout as e:
+        current_app.logger.error("Timeout de conversion FFmpeg: %s", e)
+        raise ValueError(str(e))
+    except FFmpegError as e:
         current_app.logger.error(f"Erreur FFmpeg: {e.stderr}")
         raise ValueError(f"Erreur lors de la conversion: {e.stderr}")
     except Exception as e:
@@ -145,54 +216,193 @@ class ResourceManager:
                 )
 
 
+@dataclass(frozen=True)
+class ConversionOptions:
+    """Paramètres d'une conversion (et donc de sa clé de cache)."""
+
+    output_format: str
+    quality: int = 85
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+    # Profil d'encodage vidéo résolu (None pour une sortie image).
+    profile: Optional[str] = None
+    # Vidéo : qualité ou profil fournis par le client, pas de remux.
+    transcode: bool = False
+
+    def cache_params(self) -> dict:
+        params = {"format": self.output_format.lower(), "quality": self.quality}
+        # Absents de la clé quand non utilisés : les entrées déjà en cache
+        # pour une conversion simple restent valides.
+        if self.max_width or self.max_height:
+            params["max_size"] = [self.max_width, self.max_height]
+        if self.profile:
+            params["profile"] = self.profile
+        if self.transcode:
+            params["transcode"] = True
+        return params
+
+
+def _parse_dimension(name: str) -> Optional[int]:
+    raw = request.form.get(name, "").strip()
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise UploadRejected(f"{name} invalide (entier positif attendu).")
+    if not 0 < value <= MAX_DIMENSION:
+        raise UploadRejected(f"{name} doit être compris entre 1 et {MAX_DIMENSION}.")
+    return value
+
+
+def _parse_resize_options() -> tuple[Optional[int], Optional[int]]:
+    """`max_width` / `max_height` optionnels (images uniquement)."""
+    return _parse_dimension("max_width"), _parse_dimension("max_height")
+
+
+def _parse_conversion_form():
+    """Valide l'upload + les options communes à `/convert` et `/jobs`.
+
+    Retourne `(file, ConversionOptions)` ou lève `UploadRejected`.
+    """
+    file = request.files.get("file")
+    if file is None:
+        raise UploadRejected("Fichier manquant")
+
+    validate_upload(file, current_app.config["ALLOWED_MEDIA_EXTENSIONS"])
+
+    output_format = request.form.get("format", "").lower()
+    if output_format not in current_app.config["ALLOWED_MEDIA_EXTENSIONS"]:
+        raise UploadRejected(f"Format de sortie non autorisé : .{output_format}")
+    try:
+        quality = max(0, min(100, int(request.form.get("quality", 85))))
+    except ValueError:
+        raise UploadRejected("Qualité invalide (entier 0-100 attendu).")
+    max_width, max_height = _parse_resize_options()
+
+    profile = None
+    transcode = False
+    if output_format in current_app.config["ALLOWED_VIDEO_EXTENSIONS"]:
+        try:
+            profile = resolve_profile(request.form.get("profile")).name
+        except KeyError:
+            raise UploadRejected(
+                f"Profil inconnu (valeurs : {', '.join(PROFILES)})."
+            )
+        transcode = "quality" in request.form or bool(request.form.get("profile"))
+    return file, ConversionOptions(
+        output_format, quality, max_width, max_height, profile, transcode
+    )
+
+
+def _conversion_key(digest: str, options: ConversionOptions) -> str:
+    return cache_key(digest, **options.cache_params())
+
+
+def _open_image(source, options: ConversionOptions):
+    img = Image.open(source)
+    return fit_within(img, options.max_width, options.max_height)
+
+
+def _temp_paths(input_filename: str, output_format: str) -> tuple[str, str]:
+    temp_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], "temp")
+    os.makedirs(temp_dir, exist_ok=True)
+    input_path = os.path.join(temp_dir, f"input_{uuid.uuid4()}_{input_filename}")
+    output_path = os.path.join(temp_dir, f"output_{uuid.uuid4()}.{output_format}")
+    return input_path, output_path
+
+
+def _convert_file(input_path, output_path, options, video, on_progress=None, cancel=None):
+    """Conversion fichier → fichier (exécutée dans le pool de jobs)."""
+    if video:
+        return process_video(
+            input_path,
+            output_path,
+            options.quality,
+            on_progress=on_progress,
+            profile=options.profile,
+            cancel=cancel,
+            remux=not options.transcode,
+        )
+
+    # Encodage Pillow hors du processus gunicorn (`MEDIA_CPU_WORKERS`) :
+    # seuls les chemins et les options passent la frontière.
+    return task_manager.cpu.run(
+        encode_image_file,
+        input_path,
+        output_path,
+        options.output_format,
+        options.quality,
+        options.max_width,
+        options.max_height,
+        cancel=cancel,
+        outputs=(output_path,),
+    )
+
+
 @media_bp.route("/convert", methods=["POST"])
 @limiter.limit("10 per minute")
+@spool_to_disk
 def convert_media():
-    if "file" not in request.files:
-        return jsonify({"error": "Fichier manquant"}), 400
-
-    file = request.files["file"]
-
     try:
-        validate_upload(file, current_app.config["ALLOWED_MEDIA_EXTENSIONS"])
+        file, options = _parse_conversion_form()
     except UploadRejected as exc:
         return jsonify({"error": str(exc)}), 400
 
+    output_format, quality = options.output_format, options.quality
     try:
-        temp_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-
         input_filename = secure_filename(file.filename)
-        output_format = request.form.get("format", "").lower()
-        if output_format not in current_app.config["ALLOWED_MEDIA_EXTENSIONS"]:
-            return jsonify({"error": f"Format de sortie non autorisé : .{output_format}"}), 400
-        quality = max(0, min(100, int(request.form.get("quality", 85))))
-
-        input_path = os.path.join(temp_dir, f"input_{uuid.uuid4()}_{input_filename}")
-        output_path = os.path.join(temp_dir, f"output_{uuid.uuid4()}.{output_format}")
+        input_path, output_path = _temp_paths(input_filename, output_format)
 
-        file.save(input_path)
+        digest = save_upload(file, input_path)
         current_app.logger.info(f"Fichier reçu: {input_path}")
 
+        key = _conversion_key(digest, options)
+        video = is_video(file.filename)
+        download_name = f"converted_{os.path.splitext(input_filename)[0]}.{output_format}"
+        mimetype = None if video else f"image/{output_format.lower()}"
+
         try:
-            if is_video(file.filename):
+            delivery = None
+            cached = conversion_cache.get(key)
+            if cached:
+                current_app.logger.info("Conversion servie depuis le cache (%s)", key[:12])
+                delivery = deliveries.publish(
+                    cached, download_name, mimetype, keep_source=True
+                )
+            elif video:
                 current_app.logger.info(
                     f"Début conversion vidéo: {input_path} -> {output_path}"
                 )
-                result_path = process_video(input_path, output_path, quality)
-                response = send_file(
-                    result_path,
-                    as_attachment=True,
-                    download_name=f"converted_{os.path.splitext(input_filename)[0]}.{output_format}",
+                # Client parti (onglet fermé) : FFmpeg est tué, le
+                # `finally` ci-dessous libère le disque.
+                result_path = process_video(
+                    input_path,
+                    output_path,
+                    quality,
+                    profile=options.profile,
+                    cancel=disconnect_token(request.environ),
+                    remux=not options.transcode,
+                )
+                conversion_cache.put(key, result_path)
+                delivery = deliveries.publish(result_path, download_name, mimetype)
+
+            if delivery is not None:
+                # Le fichier survit à la réponse : reprise (Range) possible
+                # sur l'URL à jeton, valable DELIVERY_TTL_SECONDS.
+                response = deliveries.send(delivery)
+                response.headers["X-Download-URL"] = url_for(
+                    "media.download", token=delivery.token
                 )
             else:
-                img = Image.open(input_path)
-                output = process_image(img, output_format.upper(), quality)
+                with _open_image(input_path, options) as img:
+                    output = process_image(img, output_format.upper(), quality)
+                conversion_cache.put_bytes(key, output.getvalue())
                 response = send_file(
                     output,
-                    mimetype=f"image/{output_format.lower()}",
+                    mimetype=mimetype,
                     as_attachment=True,
-                    download_name=f"converted_{os.path.splitext(input_filename)[0]}.{output_format}",
+                    download_name=download_name,
                 )
 
             return response
@@ -207,11 +417,278 @@ def convert_media():
                             f"Erreur de nettoyage {path}: {str(e)}"
                         )
 
+    except Cancelled:
+        current_app.logger.info("Conversion abandonnée : client déconnecté")
+        return jsonify({"error": "Conversion annulée."}), 499
     except Exception as e:
         current_app.logger.error(f"Erreur de conversion: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+# ─────────────────────────────────────────────────────────────
+# Jobs asynchrones : POST /jobs → 202, GET /jobs/<id>, GET /jobs/<id>/result
+# ─────────────────────────────────────────────────────────────
+
+
+def _conversion_job(task, app, input_path, output_path, options, video, key):
+    def _on_progress(percent, progress):
+        task.update_progress(
+            task.progress if percent is None else percent,
+            "Encodage",
+            speed=progress.speed,
+            fps=progress.fps,
+            out_time=round(progress.out_time, 1),
+        )
+
+    with app.app_context():
+        try:
+            if conversion_cache.copy_to(key, output_path):
+                task.meta["cache_hit"] = True
+                return output_path
+            result = _convert_file(
+                input_path, output_path, options, video, _on_progress, task.cancel_token
+            )
+            conversion_cache.put(key, result)
+            return result
+        except Cancelled:
+            app.logger.info("Job %s annulé", task.id)
+            raise
+        except Exception as exc:
+            app.logger.error("Job %s en échec: %s", task.id, exc)
+            raise
+        finally:
+            # L'entrée ne sert plus une fois la conversion finie : on libère
+            # le disque sans attendre l'expiration de la tâche.
+            if os.path.exists(input_path):
+                os.remove(input_path)
+
+
+def _job_payload(task):
+    payload = task.to_dict()
+    payload["status_url"] = url_for("media.job_status", task_id=task.id)
+    if task.status == "completed":
+        payload["result_url"] = url_for("media.job_result", task_id=task.id)
+    return payload
+
+
+@media_bp.route("/jobs", methods=["POST"])
+@limiter.limit("10 per minute")
+@spool_to_disk
+def submit_job():
+    try:
+        file, options = _parse_conversion_form()
+    except UploadRejected as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    output_format = options.output_format
+    input_filename = secure_filename(file.filename)
+    input_path, output_path = _temp_paths(input_filename, output_format)
+    digest = save_upload(file, input_path)
+
+    video = is_video(file.filename)
+    kind = "video" if video else "image"
+    try:
+        task_id = task_manager.create_task(
+            _conversion_job,
+            current_app._get_current_object(),
+            input_path,
+            output_path,
+            options,
+            video,
+            _conversion_key(digest, options),
+            task_meta={
+                "download_name": f"converted_{os.path.splitext(input_filename)[0]}.{output_format}",
+                "kind": kind,
+            },
+            artifacts=(input_path, output_path),
+            client=client_key(),
+            cost=estimate_cost(kind, size=os.path.getsize(input_path)),
+        )
+    except QueueFull as exc:
+        os.remove(input_path)
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": str(exc.retry_after)}
+    current_app.logger.info(
+        "Job %s soumis (%s → %s)", task_id, input_filename, output_format
+    )
+
+    payload = _job_payload(task_manager.get_task(task_id))
+    return jsonify(payload), 202, {"Location": payload["status_url"]}
+
+
+@media_bp.route("/jobs/<task_id>", methods=["GET"])
+def job_status(task_id):
+    task = task_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+    return jsonify(_job_payload(task))
+
+
+@media_bp.route("/jobs/<task_id>", methods=["DELETE"])
+def cancel_job(task_id):
+    """Annule un job : retiré de la file s'il attend, FFmpeg tué s'il tourne."""
+    task = task_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+    if not task_manager.cancel_task(task_id):
+        return jsonify({"error": "Job déjà terminé.", "status": task.status}), 409
+    return jsonify(_job_payload(task_manager.get_task(task_id) or task)), 202
+
+
+@media_bp.route("/jobs/<task_id>/events", methods=["GET"])
+def job_events(task_id):
+    """Progression en Server-Sent Events (`progress` puis `done`).
+
+    Le flux est coupé au bout de `SSE_MAX_SECONDS` pour ne pas monopoliser
+    un thread gunicorn pendant tout l'encodage ; `EventSource` se reconnecte
+    tout seul (délai `retry`).
+    """
+    task = task_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+
+    def _stream():
+        yield "retry: 1000\n\n"
+        last = None
+        # Chaque changement d'état publié par le worker qui exécute la tâche.
+        for current in task_manager.follow(task_id, SSE_MAX_SECONDS):
+            payload = _job_payload(current)
+            if current.status not in ("pending", "running"):
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                return
+            if payload != last:
+                yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+                last = payload
+
+    return Response(
+        stream_with_context(_stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@media_bp.route("/jobs/<task_id>/result", methods=["GET"])
+def job_result(task_id):
+    task = task_manager.get_task(task_id)
+    if task is None:
+        return jsonify({"error": "Job introuvable ou expiré."}), 404
+    if task.status != "completed":
+        return jsonify({"error": "Conversion pas encore terminée.", "status": task.status}), 409
+    return send_produced_file(task.result, task.meta.get("download_name"))
+
+
+@media_bp.route("/download/<token>", methods=["GET"])
+def download(token):
+    """Fichier converti servi par jeton (Range, ETag, X-Accel-Redirect)."""
+    delivery = deliveries.resolve(token)
+    if delivery is None:
+        return jsonify({"error": "Lien de téléchargement invalide ou expiré."}), 404
+    return deliveries.send(delivery)
+
+
+@media_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Compteurs du pool de conversion et du cache de résultats."""
+    return jsonify(
+        {
+            "jobs": task_manager.stats(),
+            "cache": conversion_cache.stats(),
+            "ffmpeg_slots": ffmpeg_slots.stats(),
+        }
+    )
+
+
+# Pool partagé par toutes les requêtes batch du worker : deux batchs
+# simultanés ne doublent pas le nombre de threads d'encodage.
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            workers = Config.MEDIA_BATCH_WORKERS or Config.available_cpus()
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="toolbox-batch"
+            )
+        return _batch_executor
+
+
+def _encode_batch_item(stream, options) -> bytes:
+    """Décode + ré-encode une image du batch (exécuté dans le pool).
+
+    Pillow relâche le GIL pendant le décodage / l'encodage de la plupart
+    des formats : plusieurs images avancent réellement en parallèle.
+    """
+    data = stream.read()
+    key = _conversion_key(hashlib.sha256(data).hexdigest(), options)
+    cached = conversion_cache.get(key)
+    if cached:
+        with open(cached, "rb") as fh:
+            return fh.read()
+
+    with _open_image(io.BytesIO(data), options) as img:
+        processed = process_image(img, options.output_format, options.quality).getvalue()
+    conversion_cache.put_bytes(key, processed)
+    return processed
+
+
+def _detach_stream(file) -> io.IOBase:
+    """Retire le flux de l'upload du `FileStorage`.
+
+    Flask ferme `request.files` à la sortie de la vue, avant que la réponse
+    en flux ne soit consommée : le flux détaché reste ouvert et c'est au
+    générateur de le fermer.
+    """
+    stream = file.stream
+    file.stream = io.BytesIO()
+    return stream
+
+
+def _iter_batch_entries(uploads, options):
+    """(nom, octets) des images converties, dans l'ordre de fin d'encodage.
+
+    Au plus `2 × workers` encodages sont soumis à la fois : si le client
+    lit l'archive lentement, les résultats ne s'empilent pas en mémoire.
+    """
+    executor = _get_batch_executor()
+    window = 2 * executor._max_workers
+    items = iter(uploads)
+    pending = {}
+
+    def fill():
+        for original_name, stream in items:
+            future = executor.submit(_encode_batch_item, stream, options)
+            pending[future] = (original_name, stream)
+            if len(pending) >= window:
+                return
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                original_name, stream = pending.pop(future)
+                stream.close()
+                try:
+                    processed = future.result()
+                except Image.DecompressionBombError:
+                    current_app.logger.warning("Image bomb refusée: %s", original_name)
+                    continue
+                except Exception as exc:
+                    current_app.logger.error("Erreur sur %s: %s", original_name, exc)
+                    continue
+                yield f"converted_{secure_filename(original_name)}", processed
+            fill()
+    finally:
+        # Client déconnecté : on n'encode pas le reste du lot.
+        for future, (_name, stream) in pending.items():
+            future.cancel()
+            future.add_done_callback(lambda _f, s=stream: s.close())
+        for _name, stream in items:
+            stream.close()
+
+
 @media_bp.route("/batch", methods=["POST"])
 @limiter.limit("3 per minute")
 def batch_process():
@@ -229,28 +706,19 @@ def batch_process():
 
     output_format = request.form.get("output_format", "JPEG").upper()
     quality = max(0, min(100, int(request.form.get("quality", 85))))
+    try:
+        max_width, max_height = _parse_resize_options()
+    except UploadRejected as exc:
+        return jsonify({"error": str(exc)}), 400
+    options = ConversionOptions(output_format, quality, max_width, max_height)
 
-    memory_file = io.BytesIO()
-    with zipfile.ZipFile(memory_file, "w") as zf:
-        for file, _ext in validated:
-            try:
-                img = Image.open(file.stream)
-                processed = process_image(img, output_format, quality)
-                filename = f"converted_{secure_filename(file.filename)}"
-                zf.writestr(filename, processed.getvalue())
-            except Image.DecompressionBombError:
-                current_app.logger.warning(
-                    "Image bomb refusée: %s", file.filename
-                )
-                continue
-            except Exception as exc:
-                current_app.logger.error("Erreur sur %s: %s", file.filename, exc)
-                continue
-
-    memory_file.seek(0)
-    return send_file(
-        memory_file,
-        mimetype="application/zip",
-        as_attachment=True,
-        download_name="processed_images.zip",
+    uploads = [(file.filename, _detach_stream(file)) for file, _ext in validated]
+    entries = _iter_batch_entries(uploads, options)
+    response = Response(
+        stream_with_context(stream_zip(entries)), mimetype="application/zip"
+    )
+    response.headers["Content-Disposition"] = (
+        'attachment; filename="processed_images.zip"'
     )
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
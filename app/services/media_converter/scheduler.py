@@ -0,0 +1,176 @@
+"""Ordre d'exécution des tâches de `TaskManager` : priorités et équité.
+
+Le pool reste un `ThreadPoolExecutor` borné, mais un worker libre ne
+prend plus la tâche la plus ancienne : il demande la suivante à
+`FairScheduler`.
+
+- Classes de priorité : une tâche courte (image, extrait) passe avant
+  les longs encodages. La classe découle du coût estimé
+  (`FAST_COST_SECONDS`).
+- Équité par client (même clé IP que le rate limiter) au sein d'une
+  classe : file à temps virtuel (*start-time fair queuing*). Chaque
+  tâche reçoit l'étiquette `début + coût`, où `début` est le plus grand
+  du temps virtuel de la classe et de l'étiquette de la tâche précédente
+  du même client ; la plus petite part d'abord. Un client qui dépose dix
+  encodages n'en fait pas attendre dix à celui qui en dépose un.
+- Coût estimé en secondes d'exécution, d'après la durée du média si on
+  la connaît, sinon la taille du fichier (`estimate_cost`).
+- File bornée : au-delà de `max_queued` tâches en attente, ou de
+  `max_queued_per_client` pour un même client, `QueueFull` porte un
+  délai `Retry-After` déduit du coût déjà en attente. Les routes
+  répondent 503.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+PRIORITY_FAST = 0
+PRIORITY_SLOW = 1
+# Au-delà de ce coût estimé (s), une tâche passe dans la classe lente.
+FAST_COST_SECONDS = 15.0
+# Coût d'une tâche sans taille ni durée connues : classe lente.
+UNKNOWN_COST_SECONDS = 60.0
+# Surcoût fixe d'une tâche (démarrage FFmpeg / yt-dlp, écriture disque).
+MIN_COST_SECONDS = 1.0
+RETRY_AFTER_MAX_SECONDS = 600
+
+# Débits d'estimation par type de tâche : (octets traités par seconde,
+# secondes de traitement par seconde de média). Des ordres de grandeur
+# sur 0.75 CPU : le coût ne sert qu'à comparer les tâches entre elles et
+# à estimer `Retry-After`.
+COST_RATES: Dict[str, tuple[float, float]] = {
+    "image": (20 * 1024 * 1024, 0.0),
+    "video": (2 * 1024 * 1024, 1.0),
+    "download": (5 * 1024 * 1024, 0.1),
+}
+
+
+class QueueFull(Exception):
+    """File d'attente pleine ; réessayer après `retry_after` secondes."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_cost(
+    kind: str, size: Optional[int] = None, duration: Optional[float] = None
+) -> float:
+    """Secondes d'exécution estimées pour une tâche `kind` (`COST_RATES`)."""
+    bytes_per_second, seconds_per_second = COST_RATES.get(kind, COST_RATES["video"])
+    if duration and duration > 0 and seconds_per_second:
+        return MIN_COST_SECONDS + duration * seconds_per_second
+    if size and size > 0:
+        return MIN_COST_SECONDS + size / bytes_per_second
+    return UNKNOWN_COST_SECONDS
+
+
+def priority_for(cost: float) -> int:
+    return PRIORITY_FAST if cost <= FAST_COST_SECONDS else PRIORITY_SLOW
+
+
+class FairScheduler:
+    def __init__(self, workers: int, max_queued: int, max_queued_per_client: int = 0):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.max_queued_per_client = max_queued_per_client or max(
+            1, self.max_queued // 4
+        )
+        self._lock = threading.Lock()
+        # Entrées `[priorité, étiquette, n°, id, client, coût, charge utile]`.
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._seq = itertools.count()
+        self._virtual: Dict[int, float] = defaultdict(float)
+        self._last_finish: Dict[str, float] = {}
+        self._per_client: Dict[str, int] = defaultdict(int)
+        self._queued_cost = 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def push(
+        self,
+        task_id: str,
+        payload: Any,
+        *,
+        client: str = "",
+        cost: float = MIN_COST_SECONDS,
+        priority: Optional[int] = None,
+    ) -> None:
+        """Met la tâche en attente, ou lève `QueueFull`."""
+        priority = priority_for(cost) if priority is None else priority
+        with self._lock:
+            if len(self._entries) >= self.max_queued:
+                raise QueueFull(
+                    "File d'attente pleine, réessayez plus tard.", self._retry_after()
+                )
+            if self._per_client[client] >= self.max_queued_per_client:
+                raise QueueFull(
+                    "Trop de tâches en attente pour ce client, réessayez plus tard.",
+                    self._retry_after(),
+                )
+            start = max(self._virtual[priority], self._last_finish.get(client, 0.0))
+            finish = start + cost
+            self._last_finish[client] = finish
+            entry = [priority, finish, next(self._seq), task_id, client, cost, payload]
+            heapq.heappush(self._heap, entry)
+            self._entries[task_id] = entry
+            self._per_client[client] += 1
+            self._queued_cost += cost
+
+    def pop(self) -> Any:
+        """Charge utile de la prochaine tâche (None si la file est vide)."""
+        with self._lock:
+            while self._heap:
+                entry = heapq.heappop(self._heap)
+                priority, finish, _seq, task_id, client, cost, payload = entry
+                if self._entries.pop(task_id, None) is not entry:
+                    continue  # retirée entre-temps
+                self._virtual[priority] = max(self._virtual[priority], finish - cost)
+                self._release(client, cost)
+                return payload
+            return None
+
+    def remove(self, task_id: str) -> Any:
+        """Retire une tâche encore en attente ; sa charge utile, ou None."""
+        with self._lock:
+            entry = self._entries.pop(task_id, None)
+            if entry is None:
+                return None
+            self._release(entry[4], entry[5])
+            return entry[6]
+
+    def _release(self, client: str, cost: float) -> None:
+        self._per_client[client] -= 1
+        if not self._per_client[client]:
+            del self._per_client[client]
+            # Client sans tâche en attente : il repart du temps virtuel courant.
+            self._last_finish.pop(client, None)
+        self._queued_cost = max(0.0, self._queued_cost - cost)
+        if not self._entries:
+            self._queued_cost = 0.0
+
+    def _retry_after(self) -> int:
+        seconds = math.ceil(self._queued_cost / self.workers)
+        return max(1, min(RETRY_AFTER_MAX_SECONDS, seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_priority = {"fast": 0, "slow": 0}
+            for entry in self._entries.values():
+                by_priority["fast" if entry[0] == PRIORITY_FAST else "slow"] += 1
+            return {
+                "max_queued": self.max_queued,
+                "max_queued_per_client": self.max_queued_per_client,
+                "clients": len(self._per_client),
+                "queued_cost_seconds": round(self._queued_cost, 1),
+                **by_priority,
+            }
@@ -1,8 +1,84 @@
-import queue
+"""Exécution asynchrone des conversions média.
+
+Les conversions longues (FFmpeg) ne doivent pas bloquer un thread
+gunicorn : la route dépose un job dans un pool borné et répond 202, le
+client interroge ensuite `/media/jobs/<id>`. Le pool est par worker
+gunicorn (`MEDIA_JOB_WORKERS`, 2 par défaut, donc 8 jobs pour 4 workers) :
+c'est le nombre de jobs en cours, pas d'encodages. FFmpeg attend en plus
+un slot commun à tous les workers (`app/core/slots.py`,
+`MEDIA_FFMPEG_SLOTS`, par défaut les CPU du conteneur), les jobs en trop
+attendent dans la file.
+
+Chaque type de travail a son exécuteur : les tâches elles-mêmes tournent
+dans un pool de threads (yt-dlp et FFmpeg attendent surtout le réseau ou
+un sous-processus), l'encodage d'images Pillow, lui, part dans
+`TaskManager.cpu`, un pool de processus (`app/core/cpu_pool.py`) qui ne
+dispute pas le GIL aux threads des requêtes.
+
+Un worker libre prend la tâche suivante selon `FairScheduler`
+(`scheduler.py`) : tâches courtes d'abord, équité entre clients, file
+bornée (`QueueFull`, 503 côté routes).
+
+Les compteurs exposés par `TaskManager.stats()` (profondeur de file,
+latence d'attente / d'exécution) servent à dimensionner ce pool.
+
+L'état de chaque tâche est recopié dans un `TaskStore` (`task_store.py`,
+Redis en prod) : n'importe quel worker gunicorn peut répondre à
+`GET /jobs/<id>` ou suivre la progression, pas seulement celui qui
+exécute la tâche.
+
+`cancel_task` retire de la file une tâche qui attend ; pour une tâche en
+cours, il lève son `cancel_token`, que FFmpeg et les hooks yt-dlp
+consultent (`app/core/cancellation.py`). Les fichiers de la tâche sont
+supprimés dès qu'elle s'arrête. Depuis un autre worker, la demande passe
+par le store : le jeton de chaque tâche le relit au plus toutes les
+`REMOTE_CANCEL_PROBE_SECONDS`, y compris pour une tâche qui ne publie
+aucune progression (encodage d'image dans `cpu.run`).
+
+Une tâche terminée reste consultable `TASK_TTL_SECONDS`, puis un thread
+unique par gestionnaire (`ExpiryReaper`) l'oublie et supprime ses
+fichiers. Au-delà de `max_retained` tâches terminées, les plus anciennes
+sont expirées tout de suite : mémoire et disque restent bornés même en
+rafale.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
 import threading
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from typing import Callable, Dict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.cancellation import Cancelled, CancelToken
+from app.core.cpu_pool import CpuPool
+from app.core.metrics import LatencyStats
+from config import Config
+
+from .imaging import warm as warm_imaging
+from .scheduler import FairScheduler, QueueFull
+from .task_store import MemoryTaskStore, TaskStore, make_task_store
+
+logger = logging.getLogger(__name__)
+
+# Durée de rétention d'une tâche terminée (statut + fichier résultat).
+TASK_TTL_SECONDS: int = 3600
+# Tâches terminées gardées au plus, par gestionnaire (les plus anciennes
+# sont expirées avant leur TTL).
+MAX_RETAINED_TASKS: int = 1000
+# Tâches en attente au plus, par gestionnaire, avant de répondre 503.
+MAX_QUEUED_TASKS: int = 100
+# Écart minimal entre deux écritures dans le store quand seuls les détails
+# (vitesse, ETA...) changent ; un nouveau pourcentage, message ou statut
+# part tout de suite.
+PUBLISH_INTERVAL_SECONDS: float = 0.5
+ACTIVE_STATUSES = ("pending", "running")
+# Écart minimal entre deux lectures du store pour y chercher une demande
+# d'annulation venue d'un autre worker.
+REMOTE_CANCEL_PROBE_SECONDS: float = 1.0
 
 
 class Task:
@@ -11,55 +87,420 @@ class Task:
         self.progress = 0
         self.total_steps = total_steps
         self.status = "pending"
+        self.message = ""
+        # Détails de progression (vitesse d'encodage, fps...) pour l'UI.
+        self.details: Dict[str, Any] = {}
         self.result = None
         self.error = None
-        self.cancel_requested = False
+        self.cancel_token = CancelToken()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Métadonnées libres (nom de téléchargement, mimetype...) et fichiers
+        # à supprimer quand la tâche expire.
+        self.meta: Dict[str, Any] = {}
+        self.artifacts: List[str] = []
         self._callbacks: Dict[str, Callable] = {}
+        # Recopie vers le store, branchée par `TaskManager`, et dernière
+        # écriture faite (statut / progression / message, instant).
+        self._sync: Optional[Callable[["Task"], None]] = None
+        self._published: Optional[tuple] = None
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.cancel_token.cancelled
+
+    @cancel_requested.setter
+    def cancel_requested(self, value: bool) -> None:
+        if value:
+            self.cancel_token.cancel()
 
-    def update_progress(self, current: int, message: str = ""):
+    def update_progress(self, current: int, message: str = "", **details: Any):
         self.progress = min(100, int((current / self.total_steps) * 100))
+        self.message = message
+        self.details.update(details)
         self._notify_progress(message)
+        if self._sync is not None:
+            self._sync(self)
 
     def _notify_progress(self, message: str):
         if "progress" in self._callbacks:
             self._callbacks["progress"](self.progress, message)
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "details": dict(self.details),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """État compact recopié dans le `TaskStore` (JSON-sérialisable)."""
+        result = self.result
+        state = {
+            **self.to_dict(),
+            "meta": dict(self.meta),
+            "result": result
+            if isinstance(result, (str, int, float, type(None)))
+            else str(result),
+        }
+        # Écrit seulement une fois levé : une publication du propriétaire
+        # n'efface pas une demande d'annulation venue d'un autre worker.
+        if self.cancel_requested:
+            state["cancel_requested"] = True
+        return state
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]]) -> Optional["Task"]:
+        """Copie en lecture seule d'une tâche exécutée par un autre worker ;
+        None pour un état incomplet (sans `id`)."""
+        if not state or "id" not in state:
+            return None
+        task = cls(state["id"])
+        for name in (
+            "status",
+            "progress",
+            "message",
+            "error",
+            "result",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "cancel_requested",
+        ):
+            if name in state:
+                setattr(task, name, state[name])
+        task.details = dict(state.get("details") or {})
+        task.meta = dict(state.get("meta") or {})
+        return task
+
+
+class ExpiryReaper:
+    """Expire des tâches à échéance, depuis un seul thread.
+
+    Un tas `(échéance, id)` remplace un `threading.Timer` par tâche (un
+    thread endormi une heure pour chacune). Le thread démarre à la
+    première planification ; il dort jusqu'à la prochaine échéance, ou
+    jusqu'à ce qu'une planification plus proche le réveille.
+    """
+
+    def __init__(self, expire: Callable[[str], None], name: str = "toolbox-reaper"):
+        self._expire = expire
+        self._name = name
+        self._heap: List[Tuple[float, str]] = []
+        self._changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._changed:
+            return len(self._heap)
+
+    def schedule(self, task_id: str, delay: float) -> None:
+        with self._changed:
+            heapq.heappush(self._heap, (time.monotonic() + delay, task_id))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self._name, daemon=True
+                )
+                self._thread.start()
+            self._changed.notify()
+
+    def pop_oldest(self) -> Optional[str]:
+        """Retire l'échéance la plus proche (la tâche terminée la plus ancienne)."""
+        with self._changed:
+            return heapq.heappop(self._heap)[1] if self._heap else None
+
+    def _run(self) -> None:
+        while True:
+            with self._changed:
+                while True:
+                    delay = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self._changed.wait(delay)
+                _deadline, task_id = heapq.heappop(self._heap)
+            try:
+                self._expire(task_id)
+            except Exception:  # noqa: BLE001
+                logger.exception("Expiration de la tâche %s impossible", task_id)
+
 
 class TaskManager:
-    def __init__(self, max_workers=4):
+    def __init__(
+        self,
+        max_workers: int = 4,
+        store: Optional[TaskStore] = None,
+        *,
+        ttl_seconds: float = TASK_TTL_SECONDS,
+        max_retained: int = MAX_RETAINED_TASKS,
+        max_queued: int = MAX_QUEUED_TASKS,
+        max_queued_per_client: int = 0,
+        cpu_workers: int = 0,
+        cpu_initializer: Optional[Callable[[], None]] = None,
+    ):
+        # Tâches exécutées par ce worker ; les autres se lisent dans `store`.
         self.tasks: Dict[str, Task] = {}
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.queue = queue.Queue()
+        self.store = store if store is not None else MemoryTaskStore()
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="toolbox-task"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+            "expired": 0,
+            "evicted": 0,
+        }
+        self._scheduler = FairScheduler(max_workers, max_queued, max_queued_per_client)
+        # Travail CPU des tâches (`cpu.run`) ; 0 processus = dans le thread.
+        self.cpu = CpuPool(cpu_workers, cpu_initializer)
+        self.ttl_seconds = ttl_seconds
+        self.max_retained = max(1, max_retained)
+        self._reaper = ExpiryReaper(self._reap)
+        self._wait_stats = LatencyStats()
+        self._run_stats = LatencyStats()
 
-    async def create_task(self, func: Callable, *args, **kwargs) -> str:
+    def create_task(
+        self,
+        func: Callable,
+        *args,
+        task_meta: Optional[Dict[str, Any]] = None,
+        artifacts: Iterable[str] = (),
+        client: str = "",
+        cost: float = 1.0,
+        priority: Optional[int] = None,
+        **kwargs,
+    ) -> str:
+        """Planifie `func(task, *args, **kwargs)` et retourne l'id de la tâche.
+
+        `client` (clé IP), `cost` (secondes estimées) et `priority` règlent
+        sa place dans la file ; lève `QueueFull` si elle est pleine.
+        """
         task_id = str(uuid.uuid4())
         task = Task(task_id)
+        task.cancel_token = CancelToken(
+            probe=self._remote_cancel_probe(task_id),
+            probe_interval=REMOTE_CANCEL_PROBE_SECONDS,
+        )
+        task.meta.update(task_meta or {})
+        task.artifacts.extend(artifacts)
+        task._sync = self._publish
         self.tasks[task_id] = task
+        self._publish(task, force=True)
 
-        future = self.executor.submit(func, task, *args, **kwargs)
+        with self._lock:
+            self._queued += 1
+        future: Future = Future()
         future.add_done_callback(lambda f: self._task_complete(task_id, f))
+        job = (task, time.monotonic(), func, args, kwargs, future)
+        try:
+            self._scheduler.push(
+                task_id, job, client=client, cost=cost, priority=priority
+            )
+        except QueueFull:
+            self.tasks.pop(task_id, None)
+            self.store.delete(task_id)
+            with self._lock:
+                self._queued -= 1
+                self._counters["rejected"] += 1
+            raise
 
+        with self._lock:
+            self._counters["submitted"] += 1
+        # Un passage dans le pool par tâche ; le worker qui le prend exécute
+        # la tâche que l'ordonnanceur désigne à ce moment-là.
+        self.executor.submit(self._run_next)
         return task_id
 
-    def _task_complete(self, task_id: str, future):
+    def _run_next(self) -> None:
+        job = self._scheduler.pop()
+        if job is None:
+            return
+        task, enqueued_at, func, args, kwargs, future = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._run(task, enqueued_at, func, args, kwargs))
+        except Exception as exc:  # noqa: BLE001
+            future.set_exception(exc)
+
+    def _run(self, task: Task, enqueued_at: float, func: Callable, args, kwargs):
+        started = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        self._wait_stats.add(started - enqueued_at)
+
+        task.status = "running"
+        task.started_at = time.time()
+        self._publish(task, force=True)
+        try:
+            task.cancel_token.raise_if_cancelled()
+            return func(task, *args, **kwargs)
+        finally:
+            self._run_stats.add(time.monotonic() - started)
+            with self._lock:
+                self._running -= 1
+
+    def _task_complete(self, task_id: str, future: Future):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return
         try:
-            self.tasks[task_id].result = future.result()
-            self.tasks[task_id].status = "completed"
+            task.result = future.result()
+            task.progress = 100
+            task.status = "completed"
+            counter = "completed"
+        except (Cancelled, CancelledError):
+            counter = self._cancelled(task)
         except Exception as e:
-            self.tasks[task_id].error = str(e)
-            self.tasks[task_id].status = "failed"
+            if task.cancel_requested:
+                # Arrêt provoqué par l'annulation (FFmpeg tué, yt-dlp coupé).
+                counter = self._cancelled(task)
+            else:
+                task.error = str(e)
+                task.status = "failed"
+                counter = "failed"
         finally:
-            if task_id in self.tasks:
-                # Nettoyer la tâche après un délai
-                threading.Timer(3600, lambda: self.tasks.pop(task_id, None)).start()
+            task.finished_at = time.time()
+            self._publish(task, force=True)
+            # Nettoyer la tâche (et ses fichiers) après un délai
+            self._reaper.schedule(task_id, self.ttl_seconds)
+
+        with self._lock:
+            self._counters[counter] += 1
+        while len(self._reaper) > self.max_retained:
+            oldest = self._reaper.pop_oldest()
+            if oldest is None:
+                break
+            self._expire(oldest)
+            with self._lock:
+                self._counters["evicted"] += 1
+
+    def _cancelled(self, task: Task) -> str:
+        task.status = "cancelled"
+        task.error = "Tâche annulée."
+        # Sortie partielle, entrée : inutile d'attendre l'expiration.
+        self._remove_artifacts(task)
+        return "cancelled"
+
+    def _publish(self, task: Task, force: bool = False) -> None:
+        marker = (task.status, task.progress, task.message)
+        now = time.monotonic()
+        published = task._published
+        if (
+            not force
+            and published is not None
+            and published[0] == marker
+            and now - published[1] < PUBLISH_INTERVAL_SECONDS
+        ):
+            return
+        task._published = (marker, now)
+        self.store.save(task.id, task.state(), int(self.ttl_seconds))
+
+    def _remote_cancel_probe(self, task_id: str) -> Callable[[], bool]:
+        """Sonde du `cancel_token` : annulation demandée par un autre worker ?"""
+
+        def _probe() -> bool:
+            state = self.store.load(task_id)
+            return bool(state and state.get("cancel_requested"))
+
+        return _probe
+
+    def _reap(self, task_id: str) -> None:
+        self._expire(task_id)
+        with self._lock:
+            self._counters["expired"] += 1
+
+    def _expire(self, task_id: str) -> None:
+        self.store.delete(task_id)
+        task = self.tasks.pop(task_id, None)
+        if task is not None:
+            self._remove_artifacts(task)
+
+    @staticmethod
+    def _remove_artifacts(task: Task) -> None:
+        for path in task.artifacts:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """La tâche locale si ce worker l'exécute, sinon une copie lue dans le store."""
+        task = self.tasks.get(task_id)
+        if task is not None:
+            return task
+        return Task.from_state(self.store.load(task_id))
+
+    def follow(self, task_id: str, timeout: float) -> Iterator[Task]:
+        """La tâche à chaque changement d'état, jusqu'à `timeout` (flux SSE)."""
+        for state in self.store.follow(task_id, timeout):
+            task = self.tasks.get(task_id) or Task.from_state(state)
+            if task is not None:
+                yield task
 
-    def get_task(self, task_id: str) -> Task:
-        return self.tasks.get(task_id)
+    def cancel_task(self, task_id: str) -> bool:
+        """Demande l'arrêt d'une tâche ; False si elle est inconnue ou finie."""
+        task = self.tasks.get(task_id)
+        if task is None:
+            # Tâche d'un autre worker : il lira le drapeau dans le store.
+            state = self.store.load(task_id)
+            if not state or state.get("status") not in ACTIVE_STATUSES:
+                return False
+            # Conditionnel : la tâche peut expirer entre la lecture et l'écriture.
+            return self.store.update(
+                task_id, {"cancel_requested": True}, int(self.ttl_seconds)
+            )
+        if task.status not in ACTIVE_STATUSES:
+            return False
+        task.cancel_token.cancel()
+        job = self._scheduler.remove(task_id)
+        if job is not None:
+            # Jamais démarrée : son futur annulé la termine tout de suite.
+            with self._lock:
+                self._queued -= 1
+            job[-1].cancel()
+        else:
+            self._publish(task, force=True)
+        return True
 
-    def cancel_task(self, task_id: str):
-        if task_id in self.tasks:
-            self.tasks[task_id].cancel_requested = True
+    def stats(self) -> Dict[str, Any]:
+        """Instantané des compteurs du pool (pour `/media/metrics`)."""
+        with self._lock:
+            snapshot: Dict[str, Any] = {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "retained": len(self.tasks),
+                **self._counters,
+            }
+        snapshot["scheduler"] = self._scheduler.stats()
+        snapshot["cpu"] = self.cpu.stats()
+        snapshot["wait"] = self._wait_stats.as_dict()
+        snapshot["run"] = self._run_stats.as_dict()
+        return snapshot
 
 
 # Instance globale du gestionnaire de tâches
-task_manager = TaskManager()
+task_manager = TaskManager(
+    max_workers=Config.MEDIA_JOB_WORKERS,
+    store=make_task_store(os.environ.get("RATELIMIT_STORAGE_URI"), "media"),
+    max_retained=Config.TASK_MAX_RETAINED,
+    max_queued=Config.TASK_MAX_QUEUED,
+    cpu_workers=Config.MEDIA_CPU_WORKERS,
+    cpu_initializer=warm_imaging,
+)
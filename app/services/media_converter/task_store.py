@@ -0,0 +1,258 @@
+"""État partagé des tâches de `TaskManager`, lisible depuis n'importe quel worker.
+
+Chaque worker gunicorn a son propre `TaskManager` : une tâche s'exécute
+dans le worker qui l'a reçue, mais le `GET /jobs/<id>` suivant peut
+tomber sur un autre. Le gestionnaire recopie donc l'état compact de
+chaque tâche (statut, progression, message, détails, erreur, horodatages,
+métadonnées, chemin du résultat) dans un `TaskStore` :
+
+- `MemoryTaskStore` : dict local, pour le dev et les tests (un seul
+  worker) ;
+- `RedisTaskStore` : un hash par tâche, écrit dans une transaction
+  `MULTI`/`EXEC` qui incrémente aussi un numéro de version, rafraîchit le
+  TTL et publie sur le canal de la tâche. Un flux SSE servi par un autre
+  worker s'abonne à ce canal plutôt que de relire Redis en boucle.
+
+Toute erreur Redis est journalisée puis ignorée pendant
+`REDIS_RETRY_SECONDS` : les tâches restent suivies par leur propre
+worker, comme avant.
+
+Le résultat est un chemin sous `TEMP_FOLDER`, que tous les workers du
+conteneur voient.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+REDIS_RETRY_SECONDS = 30.0
+
+
+class TaskStore(ABC):
+    """Interface commune. `state` : dict JSON-sérialisable (`Task.state()`)."""
+
+    @abstractmethod
+    def save(self, task_id: str, state: Dict[str, Any], ttl: int) -> None:
+        """Écrit (ou complète) l'état de la tâche, atomiquement, et notifie."""
+
+    @abstractmethod
+    def update(self, task_id: str, fields: Dict[str, Any], ttl: int) -> bool:
+        """Comme `save`, mais seulement si la tâche existe encore : False
+        (rien d'écrit) si elle est inconnue ou expirée. Un état partiel
+        (sans `id`) n'est jamais créé."""
+
+    @abstractmethod
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """État courant avec son numéro de `version`, ou None (inconnu, expiré)."""
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None:
+        """Oublie la tâche."""
+
+    @abstractmethod
+    def follow(self, task_id: str, timeout: float) -> Iterator[Dict[str, Any]]:
+        """État courant, puis chaque nouvelle version jusqu'à `timeout`."""
+
+
+class MemoryTaskStore(TaskStore):
+    def __init__(self) -> None:
+        self._changed = threading.Condition()
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+
+    def save(self, task_id: str, state: Dict[str, Any], ttl: int) -> None:
+        with self._changed:
+            current = self._states.setdefault(task_id, {"version": 0})
+            current.update(state)
+            current["version"] += 1
+            self._expires[task_id] = time.monotonic() + ttl
+            self._changed.notify_all()
+
+    def update(self, task_id: str, fields: Dict[str, Any], ttl: int) -> bool:
+        with self._changed:
+            if self._expires.get(task_id, 0) <= time.monotonic():
+                return False
+            self._states[task_id].update(fields)
+            self._states[task_id]["version"] += 1
+            self._expires[task_id] = time.monotonic() + ttl
+            self._changed.notify_all()
+            return True
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._changed:
+            if self._expires.get(task_id, 0) <= time.monotonic():
+                self._states.pop(task_id, None)
+                self._expires.pop(task_id, None)
+                return None
+            return dict(self._states[task_id])
+
+    def delete(self, task_id: str) -> None:
+        with self._changed:
+            self._states.pop(task_id, None)
+            self._expires.pop(task_id, None)
+            self._changed.notify_all()
+
+    def follow(self, task_id: str, timeout: float) -> Iterator[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        state = self.load(task_id)
+        while state is not None:
+            yield state
+            version = state["version"]
+            with self._changed:
+                self._changed.wait_for(
+                    lambda: self._states.get(task_id, {}).get("version") != version,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            if time.monotonic() >= deadline:
+                return
+            state = self.load(task_id)
+
+
+def _redis_client(url: Optional[str]):
+    if not url or not url.startswith(("redis://", "rediss://", "unix://")):
+        return None
+    try:
+        import redis
+    except ImportError:
+        return None
+    return redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=0.5)
+
+
+# `update` : même écriture que `save`, dans un script Lua qui vérifie
+# d'abord que le hash existe (atomique côté Redis).
+_UPDATE_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('PUBLISH', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RedisTaskStore(TaskStore):
+    def __init__(self, client, prefix: str = "toolbox:task:"):
+        self._redis = client
+        self.prefix = prefix
+        self._down_until = 0.0
+        self._update_script = client.register_script(_UPDATE_IF_EXISTS)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, exc: Exception) -> None:
+        logger.warning("Tâches : Redis indisponible (%s)", exc)
+        self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def save(self, task_id: str, state: Dict[str, Any], ttl: int) -> None:
+        if not self._available():
+            return
+        key = self.prefix + task_id
+        try:
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.hset(
+                key,
+                mapping={
+                    name: json.dumps(value, default=str)
+                    for name, value in state.items()
+                },
+            )
+            pipe.hincrby(key, "version", 1)
+            pipe.expire(key, ttl)
+            pipe.publish(key, task_id)
+            pipe.execute()
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+
+    def update(self, task_id: str, fields: Dict[str, Any], ttl: int) -> bool:
+        if not self._available():
+            return False
+        args: list = [ttl, task_id]
+        for name, value in fields.items():
+            args += [name, json.dumps(value, default=str)]
+        try:
+            return bool(self._update_script(keys=[self.prefix + task_id], args=args))
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+            return False
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if not self._available():
+            return None
+        try:
+            raw = self._redis.hgetall(self.prefix + task_id)
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+            return None
+        if not raw:
+            return None
+        try:
+            return {key.decode(): json.loads(value) for key, value in raw.items()}
+        except ValueError:
+            return None
+
+    def delete(self, task_id: str) -> None:
+        if not self._available():
+            return
+        try:
+            self._redis.delete(self.prefix + task_id)
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+
+    def follow(self, task_id: str, timeout: float) -> Iterator[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            # Abonnement avant la première lecture : aucune version perdue
+            # entre les deux.
+            pubsub.subscribe(self.prefix + task_id)
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+            return
+        try:
+            version = None
+            state = self.load(task_id)
+            while state is not None:
+                # Plusieurs publications peuvent précéder une même lecture :
+                # on ne renvoie que les versions nouvelles.
+                if state.get("version") != version:
+                    yield state
+                    version = state.get("version")
+                if not self._next_message(pubsub, deadline):
+                    return
+                state = self.load(task_id)
+        except Exception as exc:  # noqa: BLE001
+            self._failed(exc)
+        finally:
+            try:
+                pubsub.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+    @staticmethod
+    def _next_message(pubsub, deadline: float) -> bool:
+        """Attend une publication ; False si `deadline` est passée avant."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if pubsub.get_message(timeout=min(remaining, 1.0)) is not None:
+                return True
+
+
+def make_task_store(redis_url: Optional[str], namespace: str) -> TaskStore:
+    """Redis si `redis_url` en désigne un (même instance que le rate
+    limiter), sinon mémoire locale."""
+    client = _redis_client(redis_url)
+    if client is None:
+        return MemoryTaskStore()
+    return RedisTaskStore(client, prefix=f"toolbox:task:{namespace}:")
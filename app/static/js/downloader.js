@@ -6,6 +6,8 @@
  *   jamais envoyées au serveur)
  * - met à jour un compteur de quota à partir des headers `X-RateLimit-*`
  *   renvoyés par Flask-Limiter sur /downloader/info
+ * - dépose les téléchargements sur /downloader/jobs et affiche la
+ *   progression réelle (octets, vitesse, ETA, phase) reçue en SSE
  *
  * Le serveur a une whitelist stricte côté `_is_allowed_url`. La détection
  * côté client n'a d'autre but que d'améliorer le feedback visuel.
@@ -83,7 +85,19 @@
         platformTints: document.querySelectorAll('[data-dl-platform-tint], [data-dl-platform-cta]'),
     };
 
-    let abortController = null;
+    /** Job suivi en cours : `{ stop, reject, statusUrl }` (annulation). */
+    let activeJob = null;
+    /**
+     * Suivi en SSE seulement si `JOB_EVENTS_SSE=1` : un flux ouvert occupe
+     * un thread gunicorn pendant tout le téléchargement.
+     */
+    const useJobEvents = document.body.dataset.jobEvents === '1';
+    const JOB_POLL_MS = 1000;
+    /**
+     * `info_handle` renvoyé par /downloader/info pour l'URL analysée : le
+     * serveur réutilise alors son extraction au lieu de la refaire.
+     */
+    let analyzed = { url: null, handle: null };
 
     // ───────────────────────────── plateforme ─────────────────────────────
 
@@ -300,6 +314,8 @@
             els.duration.querySelector('span').textContent = `Durée : ${formatDuration(data.duration)}`;
             els.views.querySelector('span').textContent = `Vues : ${formatNumber(data.views)}`;
 
+            analyzed = { url, handle: data.info_handle || null };
+
             showLoading(false);
             els.preview.classList.remove('hidden');
 
@@ -315,6 +331,97 @@
         }
     }
 
+    function formatBytes(bytes) {
+        const value = Number(bytes) || 0;
+        if (value >= 1024 * 1024 * 1024) return `${(value / 1024 ** 3).toFixed(2)} Go`;
+        if (value >= 1024 * 1024) return `${(value / 1024 ** 2).toFixed(1)} Mo`;
+        return `${Math.round(value / 1024)} Ko`;
+    }
+
+    /** Texte d'état à partir des détails remontés par les hooks yt-dlp. */
+    function describeJob(state) {
+        const details = (state && state.details) || {};
+        if (details.phase === 'postprocessing') {
+            return `${state.message || 'Post-traitement'}\u2026`;
+        }
+        if (details.phase !== 'downloading') {
+            return 'En file d\u2019attente\u2026';
+        }
+        let text = 'Téléchargement';
+        if (details.parts > 1) text += ` (${details.part}/${details.parts})`;
+        if (details.downloaded_bytes) {
+            text += ` · ${formatBytes(details.downloaded_bytes)}`;
+            if (details.total_bytes) text += ` / ${formatBytes(details.total_bytes)}`;
+        }
+        if (details.speed) text += ` · ${formatBytes(details.speed)}/s`;
+        if (details.eta != null) text += ` · ${formatDuration(details.eta)} restantes`;
+        return text;
+    }
+
+    /**
+     * Suit un job via Server-Sent Events jusqu'à l'événement `done`.
+     * Le serveur coupe le flux régulièrement : EventSource se reconnecte
+     * seul, on n'abandonne que si la connexion est définitivement fermée.
+     */
+    function followJobEvents(job, onProgress) {
+        return new Promise((resolve, reject) => {
+            const events = new EventSource(job.events_url);
+            activeJob = { stop: () => events.close(), reject, statusUrl: job.status_url };
+            events.addEventListener('progress', (e) => onProgress(JSON.parse(e.data)));
+            events.addEventListener('done', (e) => {
+                events.close();
+                resolve(JSON.parse(e.data));
+            });
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    reject(new Error('Suivi du téléchargement interrompu.'));
+                }
+            };
+        });
+    }
+
+    /**
+     * Interroge `GET /downloader/jobs/<id>` chaque seconde jusqu'à la fin
+     * du job : chaque requête libère aussitôt son thread.
+     */
+    function pollJob(job, onProgress) {
+        return new Promise((resolve, reject) => {
+            let timer = null;
+            let stopped = false;
+            activeJob = {
+                stop: () => {
+                    stopped = true;
+                    clearTimeout(timer);
+                },
+                reject,
+                statusUrl: job.status_url,
+            };
+            const poll = async () => {
+                try {
+                    const response = await fetch(job.status_url, { cache: 'no-store' });
+                    const state = await response.json().catch(() => ({}));
+                    if (stopped) return;
+                    if (!response.ok) {
+                        throw new Error(state.error || 'Suivi du téléchargement interrompu.');
+                    }
+                    if (state.status !== 'pending' && state.status !== 'running') {
+                        resolve(state);
+                        return;
+                    }
+                    onProgress(state);
+                    timer = setTimeout(poll, JOB_POLL_MS);
+                } catch (err) {
+                    reject(err);
+                }
+            };
+            poll();
+        });
+    }
+
+    function followJob(job, onProgress) {
+        return useJobEvents ? followJobEvents(job, onProgress) : pollJob(job, onProgress);
+    }
+
     async function handleDownload(format) {
         const url = els.urlInput.value.trim();
         if (!url) {
@@ -327,38 +434,44 @@
                 ? document.getElementById('videoQuality').value
                 : 'highest';
 
-        abortController = new AbortController();
         els.progressOverlay.classList.remove('hidden');
         els.progressBar.style.width = '0%';
         els.progressText.textContent = 'Démarrage du téléchargement';
 
         try {
-            const response = await fetch('/downloader/download', {
+            const response = await fetch('/downloader/jobs', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ url, format, quality }),
-                signal: abortController.signal,
+                body: JSON.stringify({
+                    url,
+                    format,
+                    quality,
+                    info_handle: analyzed.url === url ? analyzed.handle : undefined,
+                }),
             });
             updateQuotaFromResponse(response);
 
+            const job = await response.json().catch(() => ({}));
             if (!response.ok) {
-                const errorData = await response.json().catch(() => ({}));
-                throw new Error(errorData.error || 'Téléchargement impossible.');
+                throw new Error(job.error || 'Téléchargement impossible.');
             }
 
-            els.progressText.textContent = 'Réception du fichier';
-            els.progressBar.style.width = '60%';
-
-            const blob = await response.blob();
-            const downloadUrl = URL.createObjectURL(blob);
+            const final = await followJob(job, (state) => {
+                els.progressBar.style.width = `${state.progress}%`;
+                els.progressText.textContent = describeJob(state);
+            });
+            if (final.status !== 'completed' || !final.download_url) {
+                throw new Error(final.error || 'Téléchargement impossible.');
+            }
 
+            // Le serveur envoie `Content-Disposition: attachment` : le
+            // navigateur télécharge directement (et peut reprendre), sans blob.
             const a = document.createElement('a');
-            a.href = downloadUrl;
-            a.download = filenameFrom(response.headers.get('content-disposition')) || 'download';
+            a.href = final.download_url;
+            a.download = final.download_name || '';
             document.body.appendChild(a);
             a.click();
             a.remove();
-            URL.revokeObjectURL(downloadUrl);
 
             els.progressBar.style.width = '100%';
             els.progressText.textContent = 'Téléchargement terminé !';
@@ -371,18 +484,16 @@
             }
             els.progressOverlay.classList.add('hidden');
         } finally {
-            abortController = null;
+            activeJob = null;
         }
     }
 
-    function filenameFrom(disposition) {
-        if (!disposition) return null;
-        const match = /filename\*?=(?:UTF-8'')?["']?([^;\n"']+)/i.exec(disposition);
-        return match ? decodeURIComponent(match[1]).replace(/^["']|["']$/g, '') : null;
-    }
-
+    /** Arrête aussi le téléchargement côté serveur (`DELETE /jobs/<id>`). */
     function cancelDownload() {
-        if (abortController) abortController.abort();
+        if (!activeJob) return;
+        fetch(activeJob.statusUrl, { method: 'DELETE', keepalive: true }).catch(() => {});
+        activeJob.stop();
+        activeJob.reject(new DOMException('Suivi annulé', 'AbortError'));
     }
 
     // ───────────────────────────── bootstrap ──────────────────────────────
@@ -408,6 +519,8 @@
         if (els.cancelButton) {
             els.cancelButton.addEventListener('click', cancelDownload);
         }
+        // Onglet fermé pendant un téléchargement : inutile de le finir.
+        window.addEventListener('pagehide', cancelDownload);
         if (els.historyClear) {
             els.historyClear.addEventListener('click', clearHistory);
         }
@@ -8,6 +8,7 @@ dans le blueprint downloader.
 
 from __future__ import annotations
 
+import math
 import os
 import secrets
 import shutil
@@ -25,6 +26,28 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _cgroup_cpu_limit() -> Optional[float]:
+    """Quota CPU du conteneur (cgroup v2 puis v1), None si illimité."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="ascii") as fh:
+            quota, period = fh.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="ascii") as fh:
+            quota_us = int(fh.read().strip())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="ascii") as fh:
+            period_us = int(fh.read().strip())
+        if quota_us > 0 and period_us > 0:
+            return quota_us / period_us
+    except (OSError, ValueError):
+        pass
+    return None
+
+
 @dataclass
 class Config:
     BASE_DIR: str = os.path.abspath(os.path.dirname(__file__))
@@ -40,6 +63,64 @@ class Config:
     DEFAULT_QUALITY: int = 85
     CHUNK_SIZE: int = 8192
 
+    # Pool des conversions asynchrones (`/media/jobs`), par worker gunicorn :
+    # 2 x 4 workers = 8 jobs à la fois. Les encodages FFmpeg sont en plus
+    # bornés pour tout le conteneur par MEDIA_FFMPEG_SLOTS.
+    MEDIA_JOB_WORKERS: int = _env_int("MEDIA_JOB_WORKERS", 2)
+    # FFmpeg simultanés, tous workers confondus. 0 = CPU du conteneur.
+    MEDIA_FFMPEG_SLOTS: int = _env_int("MEDIA_FFMPEG_SLOTS", 0)
+    # Tâches terminées gardées en mémoire (statut + fichier), par
+    # gestionnaire et par worker ; au-delà, les plus anciennes expirent.
+    TASK_MAX_RETAINED: int = _env_int("TASK_MAX_RETAINED", 1000)
+    # Tâches en attente, par gestionnaire et par worker, avant de répondre
+    # 503 + Retry-After (un même client : le quart).
+    TASK_MAX_QUEUED: int = _env_int("TASK_MAX_QUEUED", 100)
+    # Cache disque des conversions (sous TEMP_FOLDER/cache), budget du
+    # dossier, tous workers gunicorn confondus. 0 = désactivé.
+    MEDIA_CACHE_MAX_BYTES: int = _env_int("MEDIA_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+    # Processus d'encodage d'images des jobs `/media/jobs` (hors GIL du
+    # worker gunicorn). 0 = encodage dans le thread du job.
+    MEDIA_CPU_WORKERS: int = _env_int("MEDIA_CPU_WORKERS", 1)
+    # Threads d'encodage pour `/media/batch`. 0 = nombre de CPU du conteneur.
+    MEDIA_BATCH_WORKERS: int = _env_int("MEDIA_BATCH_WORKERS", 0)
+    # Profil d'encodage vidéo par défaut : fast | balanced | small.
+    MEDIA_ENCODER_PROFILE: str = os.environ.get("MEDIA_ENCODER_PROFILE", "balanced")
+    # Suivi des jobs par l'UI : interrogation de `GET .../jobs/<id>` par
+    # défaut ; "1" = flux SSE `/events` (un thread gunicorn par onglet).
+    JOB_EVENTS_SSE: bool = os.environ.get("JOB_EVENTS_SSE", "") == "1"
+
+    # Entrées du cache mémoire de `/downloader/info` (par worker).
+    DOWNLOADER_INFO_CACHE_SIZE: int = _env_int("DOWNLOADER_INFO_CACHE_SIZE", 512)
+    # Téléchargements simultanés de `/downloader/jobs`, par worker gunicorn.
+    DOWNLOADER_JOB_WORKERS: int = _env_int("DOWNLOADER_JOB_WORKERS", 2)
+    # Cache disque des fichiers téléchargés (sous TEMP_FOLDER/downloads),
+    # budget du dossier, tous workers confondus. 0 = désactivé.
+    DOWNLOADER_CACHE_MAX_BYTES: int = _env_int(
+        "DOWNLOADER_CACHE_MAX_BYTES", 1024 * 1024 * 1024
+    )
+    DOWNLOADER_CACHE_TTL_SECONDS: int = _env_int(
+        "DOWNLOADER_CACHE_TTL_SECONDS", 6 * 3600
+    )
+    # Réglages de transfert yt-dlp (`downloader/tuning.py`). 0 = automatique
+    # (par plateforme, ajusté au débit mesuré pour les fragments).
+    DOWNLOADER_FRAGMENTS: int = _env_int("DOWNLOADER_FRAGMENTS", 0)
+    DOWNLOADER_HTTP_CHUNK_SIZE: int = _env_int("DOWNLOADER_HTTP_CHUNK_SIZE", 0)
+    DOWNLOADER_BUFFER_SIZE: int = _env_int("DOWNLOADER_BUFFER_SIZE", 0)
+    # `/downloader/bulk` : téléchargements simultanés (par worker, toutes
+    # requêtes confondues), éléments max par requête et taille max de l'archive.
+    DOWNLOADER_BULK_WORKERS: int = _env_int("DOWNLOADER_BULK_WORKERS", 2)
+    DOWNLOADER_BULK_MAX_ITEMS: int = _env_int("DOWNLOADER_BULK_MAX_ITEMS", 25)
+    DOWNLOADER_BULK_MAX_BYTES: int = _env_int(
+        "DOWNLOADER_BULK_MAX_BYTES", 2 * 1024 * 1024 * 1024
+    )
+
+    # Fichiers produits servis par jeton (`/media/download/<jeton>`).
+    DELIVERY_TTL_SECONDS: int = _env_int("DELIVERY_TTL_SECONDS", 900)
+    # Location nginx `internal` qui pointe sur TEMP_FOLDER (X-Accel-Redirect).
+    DELIVERY_ACCEL_PREFIX: str = os.environ.get("DELIVERY_ACCEL_PREFIX", "")
+    # X-Sendfile (Apache mod_xsendfile, lighttpd) ; lu tel quel par Flask.
+    USE_X_SENDFILE: bool = os.environ.get("USE_X_SENDFILE", "") == "1"
+
     ALLOWED_IMAGE_EXTENSIONS: FrozenSet[str] = frozenset(
         {"jpg", "jpeg", "png", "gif", "webp"}
     )
@@ -72,6 +153,23 @@ class Config:
                 return path
         return None
 
+    @classmethod
+    def available_cpus(cls) -> int:
+        """CPU réellement utilisables : affinité ∩ quota cgroup (min 1).
+
+        `os.cpu_count()` renvoie les cœurs de l'hôte, pas la limite
+        `cpus: '0.75'` de compose.yml : dimensionner un pool dessus
+        sur-souscrit le conteneur.
+        """
+        try:
+            cpus = len(os.sched_getaffinity(0))
+        except (AttributeError, OSError):
+            cpus = os.cpu_count() or 1
+        quota = _cgroup_cpu_limit()
+        if quota is not None:
+            cpus = min(cpus, math.ceil(quota))
+        return max(1, cpus)
+
     @classmethod
     def validate_ffmpeg(cls) -> bool:
         ffmpeg_path = cls.get_ffmpeg_path()
@@ -0,0 +1,42 @@
+"""Configuration gunicorn lue automatiquement depuis le dossier de lancement.
+
+Les options de ligne de commande (`CMD` du Dockerfile) restent prioritaires ;
+ce fichier n'ajoute que les hooks de cycle de vie des workers.
+"""
+
+from __future__ import annotations
+
+
+def post_fork(server, worker):
+    """Prépare yt-dlp dans chaque worker avant sa première requête.
+
+    Sans ça, la première extraction d'un worker paie la construction de
+    `YoutubeDL` et l'import des extracteurs (cf. `downloader/ydl_pool.py`).
+    Les processus d'encodage d'images (`MEDIA_CPU_WORKERS`) démarrent
+    aussi, en arrière-plan. Un échec ici ne doit jamais empêcher le
+    worker de démarrer.
+    """
+    try:
+        from app.services.media_converter.task_manager import task_manager
+
+        task_manager.cpu.warm()
+    except Exception as exc:  # noqa: BLE001
+        server.log.warning(
+            "Worker %s : pool d'encodage non démarré (%s)", worker.pid, exc
+        )
+
+    try:
+        from app.services.downloader.routes import warm_up
+
+        report = warm_up()
+    except Exception as exc:  # noqa: BLE001
+        server.log.warning(
+            "Worker %s : préchauffage yt-dlp impossible (%s)", worker.pid, exc
+        )
+        return
+    server.log.info(
+        "Worker %s : yt-dlp prêt en %.2f s (%s)",
+        worker.pid,
+        report["seconds"],
+        ", ".join(report["extractors"]),
+    )
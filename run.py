@@ -50,7 +50,9 @@ def _build_app(print_banner: bool):
 # Objet exposé à Gunicorn (« run:app »). Pas de bannière ici : gunicorn crée
 # plusieurs workers, on veut l'afficher une seule fois via un hook externe ou
 # en laissant Docker/prod utiliser ses propres logs.
-app = _build_app(print_banner=False)
+# `__mp_main__` : ce fichier réimporté par un processus du pool d'encodage
+# (`spawn`, en mode direct), qui n'a pas besoin de l'application.
+app = None if __name__ == "__mp_main__" else _build_app(print_banner=False)
 
 
 def main() -> None:
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Mesurer le débit de yt-dlp selon les réglages de transfert, en local.
+
+Un serveur HTTP local imite un CDN : flux HLS (`index.m3u8` + segments),
+DASH segmenté (liste de fragments) ou fichier progressif (`Range`), avec
+un débit plafonné *par connexion* et une latence par requête. yt-dlp le
+télécharge via `process_ie_result` (aucun extracteur, aucun réseau) pour
+chaque combinaison de réglages, avec les mêmes hooks que l'application
+(`TransferTuning.as_params()`).
+
+    python scripts/bench_fragments.py --protocol hls --fragments 1 2 4 8 16
+    python scripts/bench_fragments.py --protocol http --chunk-sizes 0 1048576 4194304
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from yt_dlp import YoutubeDL  # noqa: E402
+
+from app.services.downloader.tuning import TransferTuning  # noqa: E402
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, segments: int, segment_bytes: int, rate: int, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.segments = segments
+        self.segment = os.urandom(segment_bytes)
+        self.rate = rate
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server: StandIn = self.server
+        server.requests += 1
+        time.sleep(server.latency)
+        if self.path == "/index.m3u8":
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4"]
+            for index in range(server.segments):
+                lines += ["#EXTINF:4.0,", f"/seg/{index}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            return self._send(
+                ("\n".join(lines) + "\n").encode(), "application/vnd.apple.mpegurl"
+            )
+        if self.path.startswith("/seg/"):
+            return self._send(server.segment, "video/mp2t")
+        if self.path == "/video.mp4":
+            body = server.segment * server.segments
+            start, end = 0, len(body) - 1
+            header = self.headers.get("Range", "")
+            if header.startswith("bytes="):
+                first, _, last = header[6:].partition("-")
+                start = int(first or 0)
+                end = min(int(last), end) if last else end
+                return self._send(
+                    body[start : end + 1], "video/mp4", status=206, total=len(body)
+                )
+            return self._send(body, "video/mp4")
+        self.send_error(404)
+
+    def _send(self, body: bytes, mimetype: str, status: int = 200, total: int = 0):
+        self.send_response(status)
+        self.send_header("Content-Type", mimetype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            start = self.headers["Range"][6:].partition("-")[0] or "0"
+            self.send_header(
+                "Content-Range", f"bytes {start}-{int(start) + len(body) - 1}/{total}"
+            )
+        self.end_headers()
+        # Débit plafonné par connexion, par tranches de 10 ms.
+        step = max(1, self.server.rate // 100)
+        for offset in range(0, len(body), step):
+            started = time.monotonic()
+            self.wfile.write(body[offset : offset + step])
+            time.sleep(max(0.0, 0.01 - (time.monotonic() - started)))
+
+
+def _info(server: StandIn, protocol: str) -> dict:
+    base = {
+        "id": "bench",
+        "title": "bench",
+        "ext": "mp4",
+        "extractor": "bench",
+        "extractor_key": "Bench",
+        "webpage_url": server.base_url,
+    }
+    if protocol == "hls":
+        fmt = {
+            "url": f"{server.base_url}/index.m3u8",
+            "protocol": "m3u8_native",
+            "ext": "mp4",
+        }
+    elif protocol == "dash":
+        fmt = {
+            "url": server.base_url,
+            "protocol": "http_dash_segments",
+            "fragment_base_url": server.base_url,
+            "fragments": [{"path": f"seg/{i}.ts"} for i in range(server.segments)],
+            "ext": "mp4",
+        }
+    else:
+        fmt = {"url": f"{server.base_url}/video.mp4", "protocol": "http", "ext": "mp4"}
+    return {**base, "formats": [{"format_id": protocol, **fmt}]}
+
+
+def run_once(
+    server: StandIn, protocol: str, tuning: TransferTuning
+) -> tuple[float, int]:
+    """Durée du téléchargement (s) et nombre de requêtes HTTP servies."""
+    with tempfile.TemporaryDirectory() as workdir:
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "noprogress": True,
+            "fixup": "never",
+            "outtmpl": os.path.join(workdir, "%(id)s.%(ext)s"),
+            **tuning.as_params(),
+        }
+        server.requests = 0
+        started = time.monotonic()
+        with YoutubeDL(opts) as ydl:
+            ydl.process_ie_result(_info(server, protocol), download=True)
+        return time.monotonic() - started, server.requests
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--protocol", choices=("hls", "dash", "http"), default="hls")
+    parser.add_argument("--segments", type=int, default=32)
+    parser.add_argument("--segment-kb", type=int, default=512)
+    parser.add_argument(
+        "--rate-kbps", type=int, default=4000, help="débit max par connexion (Ko/s)"
+    )
+    parser.add_argument(
+        "--latency-ms", type=int, default=40, help="latence par requête"
+    )
+    parser.add_argument("--fragments", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        "--chunk-sizes", type=int, nargs="+", default=[0], help="0 = pas de découpe"
+    )
+    parser.add_argument("--buffer-sizes", type=int, nargs="+", default=[65536])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server = StandIn(
+        args.segments,
+        args.segment_kb * 1024,
+        args.rate_kbps * 1024,
+        args.latency_ms / 1000,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    total_mb = args.segments * args.segment_kb / 1024
+    print(
+        f"{args.protocol} : {args.segments} × {args.segment_kb} Ko ({total_mb:.0f} Mo), "
+        f"{args.rate_kbps} Ko/s par connexion, {args.latency_ms} ms de latence"
+    )
+    print(
+        f"{'fragments':>10}{'chunk':>10}{'buffer':>9}{'médiane (s)':>13}{'Mo/s':>8}{'requêtes':>10}"
+    )
+    try:
+        for fragments, chunk, buffer in itertools.product(
+            args.fragments, args.chunk_sizes, args.buffer_sizes
+        ):
+            tuning = TransferTuning(fragments, chunk or None, buffer)
+            samples = [
+                run_once(server, args.protocol, tuning) for _ in range(args.runs)
+            ]
+            median = sorted(seconds for seconds, _ in samples)[len(samples) // 2]
+            print(
+                f"{fragments:>10}{chunk:>10}{buffer:>9}{median:>13.2f}"
+                f"{total_mb / median:>8.1f}{samples[-1][1]:>10}"
+            )
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Mesurer le coût de démarrage de yt-dlp dans un worker (froid vs chaud).
+
+Chaque mesure tourne dans un interpréteur neuf, comme un worker gunicorn
+juste forké, une fois avec tous les extracteurs (`all`) et une fois
+restreinte aux plateformes autorisées (`allowed`, option
+`allowed_extractors`, comme en production) :
+
+- `import` : import de `yt_dlp` ;
+- `cold` : construction d'un `YoutubeDL` + résolution de l'extracteur pour
+  une URL de chaque plateforme autorisée (import réel des modules
+  d'extracteurs compris) ;
+- `warm` : même chose avec une instance neuve, modules déjà chargés ;
+- `pooled` : prêt d'une instance du pool (`YdlPool`) déjà préchauffée ;
+- `rss_mb` : pic de mémoire résidente du processus après ces mesures.
+
+Aucun accès réseau par défaut. `--url` ajoute une vraie extraction
+(`extract_info(download=False)`), froide puis chaude.
+
+    python scripts/bench_ytdlp.py --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SAMPLE_URLS = (
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://vimeo.com/76979871",
+    "https://www.dailymotion.com/video/x7tgad0",
+    "https://www.tiktok.com/@scout2015/video/6718335390845095173",
+)
+
+# Exécuté dans le sous-processus : imprime un dict JSON de durées (secondes)
+# et de mémoire (Mo).
+_PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from yt_dlp import YoutubeDL
+from app.services.downloader.ydl_pool import YdlPool, allowed_extractors
+timings = {{"import": time.perf_counter() - started}}
+opts = {{"quiet": True, "no_warnings": True, "noplaylist": True}}
+if {restricted!r}:
+    opts["allowed_extractors"] = list(allowed_extractors())
+urls = {urls!r}
+
+def resolve(ydl):
+    for url in urls:
+        for key, ie in ydl._ies.items():
+            if key != "Generic" and ie.suitable(url):
+                ydl.get_info_extractor(key)
+                break
+
+def timed(name, build):
+    started = time.perf_counter()
+    ydl = build()
+    resolve(ydl)
+    timings[name] = time.perf_counter() - started
+    return ydl
+
+timed("cold", lambda: YoutubeDL(opts))
+timed("warm", lambda: YoutubeDL(opts))
+pool = YdlPool(lambda o: YoutubeDL(o))
+pool.preload(opts)
+started = time.perf_counter()
+with pool.lease(opts) as ydl:
+    resolve(ydl)
+timings["pooled"] = time.perf_counter() - started
+
+network_url = {network_url!r}
+if network_url:
+    for name, build in (("extract_cold", lambda: YoutubeDL(opts)), ("extract_warm", None)):
+        started = time.perf_counter()
+        if build is None:
+            with pool.lease(opts) as ydl:
+                ydl.extract_info(network_url, download=False)
+        else:
+            build().extract_info(network_url, download=False)
+        timings[name] = time.perf_counter() - started
+# ru_maxrss est en Ko sous Linux.
+timings["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(timings))
+"""
+
+
+def run_once(network_url: str | None, restricted: bool) -> dict[str, float]:
+    code = _PROBE.format(
+        root=str(ROOT), urls=SAMPLE_URLS, network_url=network_url, restricted=restricted
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--runs", type=int, default=5, help="interpréteurs neufs à mesurer"
+    )
+    parser.add_argument("--url", help="URL pour une vraie extraction (réseau)")
+    args = parser.parse_args()
+
+    medians = {}
+    for mode, restricted in (("all", False), ("allowed", True)):
+        samples = [run_once(args.url, restricted) for _ in range(args.runs)]
+        medians[mode] = {
+            phase: statistics.median(
+                sample[phase] * (1 if phase == "rss_mb" else 1000) for sample in samples
+            )
+            for phase in samples[0]
+        }
+
+    print(f"{'phase':<14}{'all':>10}{'allowed':>10}{'gain':>10}")
+    for phase, value in medians["all"].items():
+        restricted = medians["allowed"][phase]
+        unit = "Mo" if phase == "rss_mb" else "ms"
+        print(
+            f"{phase:<14}{value:>10.1f}{restricted:>10.1f}{value - restricted:>8.1f} {unit}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
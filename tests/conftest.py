@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import os
 import sys
+import time
 
 import pytest
 
@@ -16,6 +17,60 @@ os.environ.setdefault("FLASK_ENV", "testing")
 os.environ["RATELIMIT_STORAGE_URI"] = "memory://"
 
 
+def wait_until(predicate, timeout: float = 10.0, interval: float = 0.01) -> None:
+    """Attend que `predicate()` soit vrai (tâches de fond, processus)."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition non atteinte à temps")
+        time.sleep(interval)
+
+
+def wait_for_job(client, status_url: str, timeout: float = 10.0) -> dict:
+    """Interroge `status_url` jusqu'à ce que le job soit terminé ; son état final."""
+    last = {}
+
+    def finished():
+        last["state"] = client.get(status_url).get_json()
+        return last["state"]["status"] not in {"pending", "running"}
+
+    wait_until(finished, timeout, interval=0.05)
+    return last["state"]
+
+
+class FakeYoutubeDL:
+    """Faux `yt_dlp.YoutubeDL` : enregistre les hooks et écrit ses fichiers
+    dans le dossier de `outtmpl`. Chaque module de tests définit le
+    comportement de `extract_info` dans une sous-classe."""
+
+    def __init__(self, opts):
+        self.params = {**opts, "outtmpl": {"default": "%(title)s.%(ext)s"}}
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+
+    def add_progress_hook(self, hook):
+        self.progress_hooks.append(hook)
+
+    def add_postprocessor_hook(self, hook):
+        self.postprocessor_hooks.append(hook)
+
+    def close(self):
+        pass
+
+    def sanitize_info(self, info):
+        return dict(info)
+
+    def write_file(self, name: str, data: bytes) -> str:
+        """Écrit `name` comme le ferait un téléchargement ; son chemin."""
+        path = os.path.join(os.path.dirname(self.params["outtmpl"]["default"]), name)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        return path
+
+    def extract_info(self, url, download=True):
+        raise NotImplementedError
+
+
 @pytest.fixture(scope="session")
 def app():
     from app.services.main import create_app
@@ -28,3 +83,65 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def _temp_folder(app, tmp_path_factory, monkeypatch):
+    """Fichiers produits par les routes (uploads, sorties, caches,
+    livraisons) dans un dossier temporaire par test, pas dans
+    `uploads/temp` du dépôt ni dans le `tmp_path` du test. Les
+    caches et magasins de livraison sont des singletons de module liés à
+    `Config.TEMP_FOLDER` à l'import : on les remplace aussi."""
+    from app.core.delivery import DeliveryStore
+    from app.core.filecache import DiskLRUCache
+    from app.core.slots import ProcessSlots
+    from app.services.downloader import routes as downloader_routes
+    from app.services.downloader.artifacts import ArtifactCache
+    from app.services.media_converter import routes as media_routes
+    from config import Config
+
+    upload_folder = tmp_path_factory.mktemp("uploads")
+    temp_folder = upload_folder / "temp"
+    temp_folder.mkdir()
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(upload_folder))
+    monkeypatch.setitem(app.config, "TEMP_FOLDER", str(temp_folder))
+
+    deliveries = str(temp_folder / "deliveries")
+    monkeypatch.setattr(
+        media_routes,
+        "conversion_cache",
+        DiskLRUCache(str(temp_folder / "cache"), Config.MEDIA_CACHE_MAX_BYTES),
+    )
+    monkeypatch.setattr(
+        media_routes,
+        "deliveries",
+        DeliveryStore(deliveries, Config.DELIVERY_TTL_SECONDS),
+    )
+    monkeypatch.setattr(
+        downloader_routes,
+        "artifacts",
+        ArtifactCache(
+            str(temp_folder / "downloads"),
+            Config.DOWNLOADER_CACHE_MAX_BYTES,
+            Config.DOWNLOADER_CACHE_TTL_SECONDS,
+        ),
+    )
+    monkeypatch.setattr(
+        downloader_routes,
+        "deliveries",
+        DeliveryStore(deliveries, Config.DELIVERY_TTL_SECONDS),
+    )
+    monkeypatch.setattr(
+        media_routes,
+        "ffmpeg_slots",
+        ProcessSlots(str(temp_folder / "slots"), media_routes.ffmpeg_slots.slots),
+    )
+
+
+@pytest.fixture(autouse=True)
+def _reset_limiter(app):
+    """Compteurs de rate limit remis à zéro : chaque test part d'un quota plein."""
+    from app.core.rate_limit import limiter
+
+    with app.app_context():
+        limiter.reset()
@@ -0,0 +1,182 @@
+"""Tests de l'annulation coopérative (`app/core/cancellation.py`).
+
+FFmpeg est imité par un script Python qui lance lui-même un processus
+enfant : l'annulation doit tuer les deux (groupe de processus).
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from app.core.cancellation import (
+    DISCONNECT_PROBE_SECONDS,
+    Cancelled,
+    CancelToken,
+    disconnect_token,
+)
+from app.services.downloader.jobs import DownloadProgress
+from app.services.media_converter.ffmpeg import run_ffmpeg
+from app.services.media_converter.task_manager import TaskManager
+from app.services.media_converter.task_store import MemoryTaskStore
+from tests.conftest import wait_until
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().split(") ")[1][0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="lit /proc")
+def test_cancel_kills_ffmpeg_and_its_children(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    script = tmp_path / "fake_ffmpeg.py"
+    script.write_text(
+        textwrap.dedent(
+            f"""
+        import subprocess, sys, time
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        open({str(pid_file)!r}, "w").write(str(child.pid))
+        while True:
+            sys.stdout.write("out_time_us=1000000\\nprogress=continue\\n")
+            sys.stdout.flush()
+            time.sleep(0.1)
+    """
+        ),
+        encoding="utf-8",
+    )
+    token = CancelToken()
+    threading.Timer(0.5, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        run_ffmpeg([sys.executable, str(script)], duration=10.0, cancel=token)
+    assert time.monotonic() - started < 5
+
+    child = int(pid_file.read_text())
+    wait_until(lambda: not _alive(child), timeout=5)
+
+
+def test_disconnect_token_sees_closed_client():
+    server, client = socket.socketpair()
+    try:
+        token = disconnect_token({"gunicorn.socket": server})
+        assert not token.cancelled
+        client.close()
+        time.sleep(DISCONNECT_PROBE_SECONDS + 0.1)
+        assert token.cancelled
+    finally:
+        server.close()
+
+
+def test_disconnect_token_handles_descriptors_above_fd_setsize():
+    # `select.select` lève ValueError au-delà de 1024 : pris pour une déconnexion.
+    server, client = socket.socketpair()
+    high = socket.socket(fileno=os.dup2(server.fileno(), 1500))
+    try:
+        token = disconnect_token({"gunicorn.socket": high})
+        time.sleep(DISCONNECT_PROBE_SECONDS + 0.1)
+        assert not token.cancelled
+        client.close()
+        wait_until(lambda: token.cancelled, timeout=DISCONNECT_PROBE_SECONDS + 2)
+    finally:
+        high.close()
+        server.close()
+
+
+def test_download_hooks_abort_once_cancelled():
+    manager = TaskManager(max_workers=1)
+    task_id = manager.create_task(lambda task: None)
+    task = manager.get_task(task_id)
+    progress = DownloadProgress(task)
+    hooks = progress.hooks()
+    hooks["progress_hooks"][0]({"status": "downloading"})
+
+    task.cancel_token.cancel()
+    with pytest.raises(Cancelled):
+        hooks["progress_hooks"][0]({"status": "downloading"})
+    with pytest.raises(Cancelled):
+        hooks["postprocessor_hooks"][0]({"status": "started"})
+
+
+def test_cancel_queued_task_frees_its_files(tmp_path):
+    manager = TaskManager(max_workers=1)
+    release = threading.Event()
+    upload = tmp_path / "upload.bin"
+    upload.write_bytes(b"x")
+
+    running = manager.create_task(lambda task: release.wait(5))
+    queued = manager.create_task(lambda task: "jamais", artifacts=[str(upload)])
+    assert manager.cancel_task(queued)
+    assert manager.get_task(queued).status == "cancelled"
+    assert not upload.exists()
+
+    release.set()
+    manager.executor.shutdown(wait=True)
+    assert manager.get_task(running).status == "completed"
+    assert not manager.cancel_task(running)
+    stats = manager.stats()
+    assert (stats["cancelled"], stats["completed"], stats["queue_depth"]) == (1, 1, 0)
+
+
+def test_cancel_from_another_worker_stops_running_task():
+    store = MemoryTaskStore()
+    owner, other = TaskManager(max_workers=1, store=store), TaskManager(
+        max_workers=1, store=store
+    )
+    started = threading.Event()
+
+    def job(task):
+        started.set()
+        for step in range(1, 500):
+            # Chaque publication relit la demande d'annulation dans le store.
+            task.update_progress(step % 100, f"étape {step}")
+            task.cancel_token.raise_if_cancelled()
+            time.sleep(0.02)
+        return "fini"
+
+    task_id = owner.create_task(job)
+    assert started.wait(5)
+    assert other.cancel_task(task_id)
+
+    final = next(t for t in other.follow(task_id, timeout=10) if t.status != "running")
+    assert final.status == "cancelled"
+    assert not other.cancel_task(task_id)
+
+
+def test_cancel_from_another_worker_stops_silent_task():
+    # Comme un encodage d'image dans `cpu.run` : aucune progression publiée.
+    store = MemoryTaskStore()
+    owner, other = TaskManager(max_workers=1, store=store), TaskManager(
+        max_workers=1, store=store
+    )
+    started = threading.Event()
+
+    def job(task):
+        started.set()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            task.cancel_token.raise_if_cancelled()
+            time.sleep(0.05)
+        return "fini"
+
+    task_id = owner.create_task(job)
+    assert started.wait(5)
+    assert other.cancel_task(task_id)
+
+    wait_until(lambda: owner.get_task(task_id).status != "running", timeout=5)
+    assert owner.get_task(task_id).status == "cancelled"
+
+
+def test_delete_job_routes(client):
+    assert client.delete("/media/jobs/inconnu").status_code == 404
+    assert client.delete("/downloader/jobs/inconnu").status_code == 404
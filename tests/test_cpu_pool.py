@@ -0,0 +1,79 @@
+"""Tests du pool de processus d'encodage (`app/core/cpu_pool.py`)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+from app.core.cancellation import Cancelled, CancelToken
+from app.core.cpu_pool import CpuPool
+from app.services.media_converter.imaging import encode_image_file, warm
+from tests.conftest import wait_until
+
+
+@pytest.fixture
+def pool():
+    pool = CpuPool(1, initializer=warm)
+    yield pool
+    pool.shutdown()
+
+
+def test_image_is_encoded_in_another_process(pool, tmp_path):
+    source, target = tmp_path / "in.png", tmp_path / "out.webp"
+    Image.new("RGB", (800, 600), (10, 120, 200)).save(source)
+
+    pool.warm()
+    assert pool.run(os.getpid) != os.getpid()
+    assert pool.run(
+        encode_image_file, str(source), str(target), "webp", 80, 400, None
+    ) == str(target)
+
+    with Image.open(target) as img:
+        assert (img.format, img.size) == ("WEBP", (400, 300))
+    stats = pool.stats()
+    assert (stats["submitted"], stats["run"]["count"]) == (2, 2)
+
+
+def _imported_modules():
+    return sorted(sys.modules)
+
+
+def test_workers_do_not_load_the_application(pool):
+    modules = pool.run(_imported_modules)
+    assert "PIL.Image" in modules
+    assert "app.services.media_converter.imaging" in modules
+    for heavy in ("flask", "yt_dlp", "app.services.main", "app.services.downloader"):
+        assert heavy not in modules
+
+
+def test_without_workers_runs_inline():
+    pool = CpuPool(0)
+    assert pool.run(os.getpid) == os.getpid()
+    assert pool.stats()["inline"] == 1
+
+
+def test_cancel_stops_waiting_and_drops_outputs(pool, tmp_path):
+    output = tmp_path / "out.bin"
+    output.write_bytes(b"x")
+    token = CancelToken()
+    threading.Timer(0.3, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        pool.run(time.sleep, 1.5, cancel=token, outputs=[str(output)])
+    assert time.monotonic() - started < 1.2
+
+    wait_until(lambda: not output.exists())
+
+
+def test_dead_worker_pool_is_rebuilt(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.run(os._exit, 1)
+    assert pool.run(sum, [1, 2]) == 3
+    assert pool.stats()["broken"] == 1
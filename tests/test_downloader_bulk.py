@@ -0,0 +1,259 @@
+"""Tests du téléchargement groupé (`POST /downloader/bulk`, `downloader/bulk.py`)."""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.cancellation import Cancelled, CancelToken
+from app.services.downloader import routes
+from app.services.downloader.artifacts import Artifact, ArtifactCache
+from app.services.downloader.bulk import (
+    BulkItem,
+    OverBudget,
+    budget_hook,
+    iter_bulk_entries,
+)
+from app.services.downloader.ydl_pool import YdlPool
+from tests.conftest import FakeYoutubeDL, wait_until
+
+URLS = [
+    "https://www.youtube.com/watch?v=aaaaaaaaaaa",
+    "https://www.youtube.com/watch?v=bbbbbbbbbbb",
+    "https://www.youtube.com/watch?v=privatevid0",
+]
+
+
+def _fake_download(sizes):
+    def _download(url, workdir, cancel, max_bytes):
+        size = sizes[url]
+        if size is None:
+            raise RuntimeError("Private video")
+        path = os.path.join(workdir, "f.mp4")
+        with open(path, "wb") as fh:
+            fh.write(b"\x00" * size)
+        return Artifact(path, url.rsplit("=", 1)[-1] + ".mp4", "video/mp4"), "miss"
+
+    return _download
+
+
+def test_entries_report_errors_and_byte_budget(tmp_path):
+    items = [
+        BulkItem(i, url)
+        for i, url in enumerate(URLS + ["https://youtu.be/ccccccccccc"], 1)
+    ]
+    sizes = dict(zip((item.url for item in items), (100, 100, None, 100)))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        entries = list(
+            iter_bulk_entries(
+                items,
+                _fake_download(sizes),
+                executor=executor,
+                window=1,
+                max_bytes=250,
+                workdir_root=str(tmp_path),
+                describe_error=str,
+            )
+        )
+
+    names = [name for name, _data in entries]
+    assert names == ["1 - aaaaaaaaaaa.mp4", "2 - bbbbbbbbbbb.mp4", "rapport.json"]
+    report = json.loads(entries[-1][1])
+    assert report["bytes"] == 200
+    assert [item["status"] for item in report["items"]] == [
+        "ok",
+        "ok",
+        "error",
+        "skipped",
+    ]
+    assert report["items"][2]["error"] == "Private video"
+    # Dossiers de travail supprimés au fil de l'eau.
+    assert os.listdir(tmp_path) == []
+
+
+def test_closing_the_archive_cancels_running_downloads(tmp_path):
+    stopped = threading.Event()
+
+    def download(url, workdir, cancel, max_bytes):
+        if url == URLS[0]:
+            return _fake_download({url: 10})(url, workdir, cancel, max_bytes)
+        # Comme yt-dlp : le jeton est consulté à chaque bloc reçu.
+        deadline = time.monotonic() + 5
+        while not cancel.cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stopped.set()
+        raise Cancelled("Téléchargement annulé.")
+
+    items = [BulkItem(1, URLS[0]), BulkItem(2, URLS[1])]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        entries = iter_bulk_entries(
+            items,
+            download,
+            executor=executor,
+            window=2,
+            max_bytes=1000,
+            workdir_root=str(tmp_path),
+            describe_error=str,
+        )
+        assert next(entries)[0] == "1 - aaaaaaaaaaa.mp4"
+        started = time.monotonic()
+        entries.close()  # client déconnecté pendant l'envoi
+        assert stopped.wait(5)
+        assert time.monotonic() - started < 1
+    wait_until(lambda: os.listdir(tmp_path) == [])
+
+
+def test_exhausted_budget_stops_downloads_in_flight(tmp_path):
+    budgets, stopped = {}, threading.Event()
+
+    def download(url, workdir, cancel, max_bytes):
+        budgets[url] = max_bytes
+        if url == URLS[0]:
+            raise OverBudget()  # hook `budget_hook` ou `max_filesize` de yt-dlp
+        deadline = time.monotonic() + 5
+        while not cancel.cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stopped.set()
+        if cancel.cancelled:
+            raise Cancelled("Téléchargement annulé.")
+        return _fake_download({url: 10})(url, workdir, cancel, max_bytes)
+
+    items = [BulkItem(i, url) for i, url in enumerate(URLS, 1)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        started = time.monotonic()
+        entries = list(
+            iter_bulk_entries(
+                items,
+                download,
+                executor=executor,
+                window=2,
+                max_bytes=1000,
+                workdir_root=str(tmp_path),
+                describe_error=str,
+            )
+        )
+        assert time.monotonic() - started < 1
+    assert stopped.is_set()
+    assert budgets == {URLS[0]: 1000, URLS[1]: 1000}  # le 3e n'est pas lancé
+    assert [name for name, _data in entries] == ["rapport.json"]
+    report = json.loads(entries[-1][1])
+    assert [item["status"] for item in report["items"]] == ["skipped"] * 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_budget_hook_counts_every_part():
+    hook = budget_hook(150)
+    hook({"filename": "v.mp4", "total_bytes": 100, "downloaded_bytes": 10})
+    hook({"filename": "v.mp4", "downloaded_bytes": 100})
+    with pytest.raises(OverBudget):
+        hook({"filename": "a.m4a", "downloaded_bytes": 60})
+
+
+class PlaylistYoutubeDL(FakeYoutubeDL):
+    max_filesizes: list = []
+
+    def extract_info(self, url, download=True):
+        if not download:  # playlist « à plat »
+            return {
+                "entries": [
+                    {"url": URLS[0]},
+                    {"url": "https://evil.example.com/x"},
+                    {"url": URLS[1]},
+                ]
+            }
+        type(self).max_filesizes.append(self.params.get("max_filesize"))
+        if "private" in url:
+            raise RuntimeError("ERROR: Private video")
+        video_id = url.rsplit("=", 1)[-1]
+        path = self.write_file(f"{video_id}.mp4", video_id.encode())
+        return {
+            "title": f"Vidéo {video_id}",
+            "requested_downloads": [{"filepath": path}],
+        }
+
+
+@pytest.fixture()
+def fake_ydl(monkeypatch, tmp_path):
+    monkeypatch.setattr(PlaylistYoutubeDL, "max_filesizes", [])
+    monkeypatch.setattr(routes, "YoutubeDL", PlaylistYoutubeDL)
+    monkeypatch.setattr(
+        routes, "ydl_pool", YdlPool(lambda opts: routes.YoutubeDL(opts))
+    )
+    monkeypatch.setattr(
+        routes,
+        "artifacts",
+        ArtifactCache(str(tmp_path / "downloads"), 1024 * 1024, 3600),
+    )
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+
+
+def test_bulk_route_streams_zip_with_report(client, fake_ydl):
+    resp = client.post("/downloader/bulk", json={"urls": URLS, "format": "video"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Bulk-Items"] == "3"
+
+    archive = zipfile.ZipFile(io.BytesIO(resp.data))
+    assert archive.read("1 - Video_aaaaaaaaaaa.mp4") == b"aaaaaaaaaaa"
+    report = json.loads(archive.read("rapport.json"))
+    statuses = {item["index"]: item for item in report["items"]}
+    assert statuses[2]["status"] == "ok"
+    assert statuses[3]["status"] == "error"
+    assert "privée" in statuses[3]["error"]
+    # Reste du budget transmis à yt-dlp (`max_filesize`).
+    budget = routes.Config.DOWNLOADER_BULK_MAX_BYTES
+    assert max(PlaylistYoutubeDL.max_filesizes) == budget
+    assert all(size <= budget for size in PlaylistYoutubeDL.max_filesizes)
+
+
+def test_bulk_route_expands_playlist(client, fake_ydl):
+    resp = client.post(
+        "/downloader/bulk",
+        json={
+            "playlist": "https://www.youtube.com/playlist?list=PL0123456789",
+            "format": "video",
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.headers["X-Bulk-Items"] == "2"  # l'URL hors whitelist est ignorée
+    report = json.loads(zipfile.ZipFile(io.BytesIO(resp.data)).read("rapport.json"))
+    assert report["playlist"].endswith("PL0123456789")
+    assert [item["status"] for item in report["items"]] == ["ok", "ok"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"urls": URLS, "playlist": "https://www.youtube.com/playlist?list=PL0"},
+        {"urls": ["https://evil.example.com/x"]},
+        {"urls": [f"https://youtu.be/{i:011d}" for i in range(100)]},
+    ],
+)
+def test_bulk_route_rejects_invalid_requests(client, fake_ydl, body):
+    assert client.post("/downloader/bulk", json=body).status_code == 400
+
+
+def test_file_skipped_by_max_filesize_is_over_budget(
+    app, fake_ydl, monkeypatch, tmp_path
+):
+    class TooBig(FakeYoutubeDL):
+        def extract_info(self, url, download=True):
+            # Comme yt-dlp : fichier abandonné sans erreur au-delà de `max_filesize`.
+            return {
+                "title": "Gros",
+                "requested_formats": [{"filesize": 80}, {"filesize": 40}],
+            }
+
+    monkeypatch.setattr(routes, "YoutubeDL", TooBig)
+    download = routes._bulk_download(app, "/usr/bin/ffmpeg", "video", "highest")
+    with pytest.raises(OverBudget):
+        download(URLS[0], str(tmp_path), CancelToken(), 100)
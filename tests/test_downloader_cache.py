@@ -0,0 +1,195 @@
+"""Tests du cache de métadonnées `/downloader/info`."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.services.downloader import routes
+from app.services.downloader.artifacts import ArtifactCache
+from app.services.downloader.cache import InfoCache
+from app.services.downloader.handles import InfoHandles
+from app.services.downloader.ydl_pool import YdlPool
+from tests.conftest import FakeYoutubeDL
+
+
+class TestInfoCache:
+    def test_concurrent_misses_trigger_a_single_extraction(self):
+        cache = InfoCache()
+        calls = []
+        gate = threading.Event()
+
+        def extract():
+            calls.append(1)
+            gate.wait(2)
+            return {"title": "x"}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_extract("k", 60, extract))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        gate.set()
+        for thread in threads:
+            thread.join(2)
+
+        assert len(calls) == 1
+        assert [value for value, _cached in results] == [{"title": "x"}] * 8
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["coalesced"] == 7
+        assert stats["extraction"]["count"] == 1
+
+    def test_errors_are_shared_but_not_cached(self):
+        cache = InfoCache()
+
+        def boom():
+            raise RuntimeError("Video unavailable")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_extract("k", 60, boom)
+        value, cached = cache.get_or_extract("k", 60, lambda: {"ok": True})
+        assert value == {"ok": True} and not cached
+        assert cache.stats()["errors"] == 1
+
+    def test_ttl_and_lru_bound(self, monkeypatch):
+        cache = InfoCache(max_entries=2)
+        cache.set("a", {"v": 1}, ttl=60)
+        cache.set("b", {"v": 2}, ttl=60)
+        cache.set("c", {"v": 3}, ttl=0)
+        assert cache.get("a") is None  # évincée (LRU)
+        assert cache.get("c") is None  # expirée
+        assert cache.get("b") == {"v": 2}
+
+
+def test_info_route_serves_repeat_requests_from_cache(client, monkeypatch):
+    monkeypatch.setattr(routes, "info_cache", InfoCache())
+    calls = []
+
+    def fake_extract(url):
+        calls.append(url)
+        return {"title": "Demo", "id": "dQw4w9WgXcQ"}
+
+    monkeypatch.setattr(routes, "_extract_info_payload", fake_extract)
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    first = client.get("/downloader/info", query_string={"url": url})
+    # Autre forme de la même vidéo : même clé canonique.
+    second = client.get(
+        "/downloader/info", query_string={"url": "https://youtu.be/dQw4w9WgXcQ?t=5"}
+    )
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_json()["title"] == "Demo"
+    assert len(calls) == 1
+
+    stats = client.get("/downloader/metrics").get_json()["info_cache"]
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_handle_capacity_counts_handles():
+    handles = InfoHandles(max_entries=2)
+    issued = {
+        key: handles.stash(key, {"id": key}) for key in ("youtube:a", "youtube:b")
+    }
+
+    for key, handle in issued.items():
+        assert handles.handle_for(key) == handle
+        assert handles.resolve(handle, key) == {"id": key}
+
+
+class ReplayableYoutubeDL(FakeYoutubeDL):
+    """Compte les extractions complètes et les rejeux d'une info déjà extraite."""
+
+    extractions = 0
+    replays = 0
+
+    def extract_info(self, url, download=False):
+        type(self).extractions += 1
+        info = {"id": "dQw4w9WgXcQ", "title": "Demo", "formats": [{"format_id": "18"}]}
+        return self._download(info) if download else info
+
+    def process_ie_result(self, info, download=True):
+        type(self).replays += 1
+        assert "formats" in info
+        return self._download(info)
+
+    def _download(self, info):
+        path = self.write_file("Demo.mp4", b"video")
+        return {**info, "requested_downloads": [{"filepath": path}]}
+
+
+def test_download_replays_info_extracted_by_info_route(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(routes, "info_cache", InfoCache())
+    monkeypatch.setattr(routes, "info_handles", InfoHandles())
+    monkeypatch.setattr(
+        routes, "artifacts", ArtifactCache(str(tmp_path / "dl"), 1 << 20, 60)
+    )
+    monkeypatch.setattr(routes, "YoutubeDL", ReplayableYoutubeDL)
+    monkeypatch.setattr(
+        routes, "ydl_pool", YdlPool(lambda opts: routes.YoutubeDL(opts))
+    )
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    handle = client.get("/downloader/info", query_string={"url": url}).get_json()[
+        "info_handle"
+    ]
+    assert handle
+    # Handle d'une autre vidéo : ignoré.
+    assert routes.info_handles.resolve(handle, "youtube:otherid0000") is None
+
+    resp = client.post("/downloader/download", json={"url": url, "info_handle": handle})
+    assert resp.status_code == 200
+    assert resp.data == b"video"
+    assert ReplayableYoutubeDL.extractions == 1
+    assert ReplayableYoutubeDL.replays == 1
+    assert routes.info_handles.stats()["reused"] == 1
+
+
+def test_download_reuses_warm_youtubedl_instance(client, monkeypatch, tmp_path):
+    class Counting(ReplayableYoutubeDL):
+        instances = 0
+
+        def __init__(self, opts):
+            super().__init__(opts)
+            type(self).instances += 1
+
+    pool = YdlPool(lambda opts: Counting(opts))
+    monkeypatch.setattr(routes, "ydl_pool", pool)
+    monkeypatch.setattr(routes, "info_handles", InfoHandles())
+    for _ in range(3):
+        routes._extract_info_payload("https://youtu.be/dQw4w9WgXcQ")
+
+    assert Counting.instances == 1
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"]) == (1, 2)
+    assert stats["cold"]["count"] == 1 and stats["warm"]["count"] == 2
+
+
+def test_youtubedl_registers_only_whitelisted_extractors():
+    from yt_dlp import YoutubeDL
+
+    ydl = YoutubeDL(routes._common_ydl_opts())
+    assert "Generic" not in ydl._ies
+    for url in (
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL0123456789",
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://vimeo.com/76979871",
+        "https://www.dailymotion.com/video/x7tgad0",
+        "https://www.tiktok.com/@scout2015/video/6718335390845095173",
+        "https://vm.tiktok.com/ZMabcdef/",
+    ):
+        assert any(ie.suitable(url) for ie in ydl._ies.values()), url
+    assert routes._classify_yt_error("Unsupported URL: https://x")[0] == 400
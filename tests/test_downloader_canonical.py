@@ -0,0 +1,85 @@
+"""Corpus de normalisation des URLs du downloader (`canonical.py`)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.services.downloader.canonical import canonicalize
+
+CANONICAL_CASES = [
+    # YouTube
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://youtube.com/watch?v=dQw4w9WgXcQ&t=30s&list=PL123", "youtube:dQw4w9WgXcQ"),
+    ("https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ?si=abcdef", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://m.youtube.com/shorts/dQw4w9WgXcQ?feature=share", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ?autoplay=1", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/live/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://music.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ#t=10", "youtube:dQw4w9WgXcQ"),
+    # Vimeo
+    ("https://vimeo.com/76979871", "vimeo:76979871"),
+    ("https://vimeo.com/76979871/", "vimeo:76979871"),
+    ("https://player.vimeo.com/video/76979871?h=8f3a", "vimeo:76979871"),
+    ("https://vimeo.com/channels/staffpicks/76979871", "vimeo:76979871"),
+    ("https://vimeo.com/groups/motion/videos/76979871", "vimeo:76979871"),
+    ("https://vimeo.com/76979871/0a1b2c3d4e", "vimeo:76979871"),
+    # Dailymotion
+    ("https://www.dailymotion.com/video/x8abcd1", "dailymotion:x8abcd1"),
+    (
+        "https://www.dailymotion.com/video/x8ABCD1?playlist=x6hynp",
+        "dailymotion:x8abcd1",
+    ),
+    ("https://dai.ly/x8abcd1", "dailymotion:x8abcd1"),
+    ("https://www.dailymotion.com/embed/video/x8abcd1", "dailymotion:x8abcd1"),
+    ("https://geo.dailymotion.com/player.html?video=x8abcd1", "dailymotion:x8abcd1"),
+    # TikTok
+    (
+        "https://www.tiktok.com/@scout2015/video/6718335390845095173",
+        "tiktok:6718335390845095173",
+    ),
+    (
+        "https://www.tiktok.com/@scout2015/video/6718335390845095173?lang=fr",
+        "tiktok:6718335390845095173",
+    ),
+    ("https://m.tiktok.com/v/6718335390845095173.html", "tiktok:6718335390845095173"),
+    (
+        "https://www.tiktok.com/embed/v2/6718335390845095173",
+        "tiktok:6718335390845095173",
+    ),
+]
+
+UNRESOLVABLE = [
+    "https://vm.tiktok.com/ZMabc123/",  # lien court : redirection nécessaire
+    "https://www.youtube.com/@SomeChannel",
+    "https://www.youtube.com/watch?v=tooShort",
+    "https://vimeo.com/channels/staffpicks",
+    # Collections Vimeo : leur numéro n'est pas celui d'une vidéo.
+    "https://vimeo.com/album/76979871",
+    "https://vimeo.com/showcase/76979871",
+    "https://vimeo.com/channels/76979871",
+    "https://vimeo.com/user/collections/76979871",
+    "https://example.com/watch?v=dQw4w9WgXcQ",
+    "not a url",
+]
+
+
+@pytest.mark.parametrize("url, key", CANONICAL_CASES)
+def test_variants_share_the_same_key(url, key):
+    canonical = canonicalize(url)
+    assert canonical is not None, url
+    assert canonical.key == key
+
+
+@pytest.mark.parametrize("url", UNRESOLVABLE)
+def test_unresolvable_urls_have_no_canonical_form(url):
+    assert canonicalize(url) is None
+
+
+def test_download_log_hash_is_shared_across_variants():
+    from app.services.downloader.routes import _url_hash
+
+    assert _url_hash("https://youtu.be/dQw4w9WgXcQ") == _url_hash(
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30"
+    )
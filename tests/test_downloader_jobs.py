@@ -0,0 +1,269 @@
+"""Tests des téléchargements en tâche de fond (`/downloader/jobs`)."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import filecache
+from app.core.delivery import DeliveryStore
+from app.services.downloader import routes
+from app.services.downloader.artifacts import Artifact, ArtifactCache
+from app.services.downloader.jobs import DownloadProgress
+from app.services.downloader.ydl_pool import YdlPool
+from app.services.media_converter.task_manager import Task
+from tests.conftest import FakeYoutubeDL, wait_for_job
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_ydl_pool(monkeypatch):
+    monkeypatch.setattr(
+        routes, "ydl_pool", YdlPool(lambda opts: routes.YoutubeDL(opts))
+    )
+
+
+@pytest.fixture(autouse=True)
+def artifacts(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / "downloads"), 64 * 1024 * 1024, 3600)
+    monkeypatch.setattr(routes, "artifacts", cache)
+    return cache
+
+
+class MergingYoutubeDL(FakeYoutubeDL):
+    """Rejoue une séquence de hooks yt-dlp (vidéo + audio, fusion) et
+    écrit un faux fichier."""
+
+    calls = 0
+
+    def extract_info(self, url, download=True):
+        type(self).calls += 1
+        info = {"title": "Ma vidéo", "requested_formats": [{}, {}]}
+        for name in ("v.f137.mp4", "a.f140.m4a"):
+            for done in (0, 50, 100):
+                for hook in self.progress_hooks:
+                    hook(
+                        {
+                            "status": "downloading",
+                            "filename": name,
+                            "info_dict": info,
+                            "downloaded_bytes": done,
+                            "total_bytes": 100,
+                            "speed": 1024.0,
+                            "eta": 1,
+                        }
+                    )
+            for hook in self.progress_hooks:
+                hook({"status": "finished", "filename": name, "info_dict": info})
+        for hook in self.postprocessor_hooks:
+            hook({"status": "started", "postprocessor": "Merger", "info_dict": info})
+        path = self.write_file("Ma vidéo.mp4", b"\x00" * 2048)
+        info["requested_downloads"] = [{"filepath": path}]
+        return info
+
+
+def test_progress_hooks_weight_each_requested_format():
+    task = Task("t")
+    progress = DownloadProgress(task)
+    info = {"requested_formats": [{}, {}]}
+
+    progress.progress_hook(
+        {
+            "status": "downloading",
+            "filename": "v",
+            "info_dict": info,
+            "downloaded_bytes": 50,
+            "total_bytes": 100,
+            "speed": 10.0,
+            "eta": 5,
+        }
+    )
+    assert task.progress == 22
+    assert task.details["phase"] == "downloading"
+    assert (task.details["part"], task.details["parts"]) == (1, 2)
+    assert task.details["eta"] == 5
+
+    progress.progress_hook({"status": "finished", "filename": "v", "info_dict": info})
+    progress.progress_hook(
+        {
+            "status": "downloading",
+            "filename": "a",
+            "info_dict": info,
+            "downloaded_bytes": 10,
+            "total_bytes_estimate": 10,
+        }
+    )
+    assert task.progress == 90
+    assert task.details["part"] == 2
+
+    progress.postprocessor_hook({"status": "started", "postprocessor": "Merger"})
+    assert task.details["phase"] == "postprocessing"
+    assert task.message == "Fusion audio / vidéo"
+    assert task.progress == 90
+
+
+def test_job_roundtrip_delivers_file_by_token(client, monkeypatch):
+    monkeypatch.setattr(routes, "YoutubeDL", MergingYoutubeDL)
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+
+    resp = client.post("/downloader/jobs", json={"url": URL, "format": "video"})
+    assert resp.status_code == 202
+    job = resp.get_json()
+    assert resp.headers["Location"] == job["status_url"]
+    assert job["events_url"].endswith("/events")
+
+    final = wait_for_job(client, job["status_url"])
+    assert final["status"] == "completed", final
+    assert final["details"]["size"] == 2048
+    assert final["download_name"] == "Ma_video.mp4"
+
+    download = client.get(final["download_url"])
+    assert download.status_code == 200
+    assert download.data == b"\x00" * 2048
+    assert download.headers["Accept-Ranges"] == "bytes"
+
+
+def test_failed_job_reports_human_message(client, monkeypatch):
+    class Unavailable(FakeYoutubeDL):
+        def extract_info(self, url, download=True):
+            raise RuntimeError("ERROR: Private video")
+
+    monkeypatch.setattr(routes, "YoutubeDL", Unavailable)
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+
+    job = client.post("/downloader/jobs", json={"url": URL}).get_json()
+    final = wait_for_job(client, job["status_url"])
+    assert final["status"] == "failed"
+    assert "pas accessible" in final["error"]
+    assert "download_url" not in final
+
+
+def test_submit_job_rejects_disallowed_host(client, monkeypatch):
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+    resp = client.post("/downloader/jobs", json={"url": "https://example.com/v.mp4"})
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_unknown_job_and_bad_token_return_404(client):
+    assert client.get("/downloader/jobs/nope").status_code == 404
+    assert client.get("/downloader/jobs/nope/events").status_code == 404
+    assert client.get("/downloader/download/not-a-token").status_code == 404
+
+
+def test_identical_download_is_served_from_artifact_cache(
+    client, monkeypatch, artifacts
+):
+    class Counting(MergingYoutubeDL):
+        calls = 0
+
+    monkeypatch.setattr(routes, "YoutubeDL", Counting)
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+
+    first = client.post(
+        "/downloader/jobs", json={"url": URL, "quality": "720p"}
+    ).get_json()
+    assert wait_for_job(client, first["status_url"])["status"] == "completed"
+    # Autre forme d'URL, même vidéo : même clé canonique.
+    second = client.post(
+        "/downloader/jobs",
+        json={"url": "https://youtu.be/dQw4w9WgXcQ", "quality": "720p"},
+    ).get_json()
+    final = wait_for_job(client, second["status_url"])
+
+    assert final["status"] == "completed"
+    assert Counting.calls == 1
+    assert client.get(final["download_url"]).data == b"\x00" * 2048
+    assert artifacts.stats()["hits"] == 1
+
+
+def test_publishing_a_cached_download_keeps_its_expiry(app, tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / "cache"), 1024 * 1024, 60)
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"data")
+    cache.store("k", Artifact(str(src), "clip.mp4", "video/mp4"))
+    entry = cache.files._path("k")
+    old = time.time() - 45
+    for path in (entry, cache.files._path(cache._meta_key("k"))):
+        os.utime(path, (old, old))
+
+    store = DeliveryStore(str(tmp_path / "deliveries"), ttl_seconds=600)
+    with app.test_request_context():
+        artifact = cache.lookup("k", str(tmp_path))
+        delivery = store.publish(
+            artifact.path, artifact.download_name, artifact.mimetype
+        )
+        assert os.path.getmtime(entry) == pytest.approx(old, abs=1)
+        assert store.sweep(force=True) == 0
+        assert store.resolve(delivery.token) is not None
+
+    # 30 s plus tard, l'entrée a dépassé son TTL de 60 s malgré la livraison.
+    later = time.time() + 30
+    monkeypatch.setattr(filecache, "time", SimpleNamespace(time=lambda: later))
+    assert not cache.contains("k")
+    assert cache.lookup("k", str(tmp_path)) is None
+
+
+def test_contains_drops_metadata_of_evicted_file(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), 1024 * 1024, 3600)
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"data")
+    cache.store("k", Artifact(str(src), "clip.mp4"))
+    assert cache.contains("k")
+
+    os.remove(cache.files._path("k"))
+    assert not cache.contains("k")
+    assert not os.path.exists(cache.files._path(cache._meta_key("k")))
+
+
+def test_artifact_cache_attaches_concurrent_fetches(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), 1024 * 1024, 3600)
+    gate = threading.Event()
+    calls = []
+
+    def produce(workdir):
+        def _run():
+            calls.append(1)
+            gate.wait(2)
+            path = os.path.join(workdir, "out.mp4")
+            with open(path, "wb") as fh:
+                fh.write(b"data")
+            return Artifact(path, "out.mp4", "video/mp4")
+
+        return _run
+
+    results = []
+
+    def fetch(index):
+        workdir = tmp_path / f"w{index}"
+        workdir.mkdir()
+        results.append(cache.fetch("k", str(workdir), produce(str(workdir)))[1])
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == ["attached", "attached", "attached", "miss"]
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    artifact, origin = cache.fetch("k", str(fresh), produce("unused"))
+    assert origin == "hit"
+    assert open(artifact.path, "rb").read() == b"data"
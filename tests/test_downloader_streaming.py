@@ -0,0 +1,199 @@
+"""Tests du téléchargement en flux (`downloader/streaming.py`).
+
+FFmpeg est remplacé par un petit script Python qui écrit sur stdout, et
+la source « plateforme » par un fichier local (`file://`) : ni binaire
+FFmpeg ni réseau nécessaires.
+"""
+
+from __future__ import annotations
+
+import sys
+import textwrap
+
+import pytest
+
+from app.services.downloader import routes, streaming
+from app.services.downloader.artifacts import ArtifactCache
+from app.services.downloader.streaming import (
+    StreamPlan,
+    StreamSource,
+    StreamUnavailable,
+    ffmpeg_command,
+    open_stream,
+    plan_stream,
+)
+from app.services.downloader.ydl_pool import YdlPool
+from tests.conftest import FakeYoutubeDL
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def _fake_ffmpeg(tmp_path, body: str) -> list[str]:
+    script = tmp_path / "fake_ffmpeg.py"
+    script.write_text(textwrap.dedent(body), encoding="utf-8")
+    return [sys.executable, str(script)]
+
+
+def _ffmpeg_plan() -> StreamPlan:
+    return StreamPlan("ffmpeg", (StreamSource("https://cdn/v", {}),))
+
+
+class TestPlanStream:
+    def test_progressive_mp4_is_proxied(self):
+        plan = plan_stream(
+            {
+                "url": "https://cdn/v.mp4",
+                "ext": "mp4",
+                "protocol": "https",
+                "filesize": 42,
+            },
+            "video",
+        )
+        assert plan.mode == "proxy"
+        assert plan.filesize == 42
+
+    def test_merge_and_audio_go_through_ffmpeg(self):
+        merged = plan_stream(
+            {
+                "requested_formats": [
+                    {
+                        "url": "https://cdn/v",
+                        "protocol": "https",
+                        "http_headers": {"User-Agent": "x"},
+                    },
+                    {"url": "https://cdn/a", "protocol": "m3u8_native"},
+                ]
+            },
+            "video",
+        )
+        assert merged.mode == "ffmpeg"
+        assert [source.url for source in merged.sources] == [
+            "https://cdn/v",
+            "https://cdn/a",
+        ]
+
+        audio = plan_stream(
+            {"url": "https://cdn/a.m4a", "ext": "m4a", "protocol": "https"}, "audio"
+        )
+        assert audio.mode == "ffmpeg"
+
+    def test_unsupported_protocol_falls_back(self):
+        assert (
+            plan_stream(
+                {"url": "https://cdn/manifest.mpd", "protocol": "http_dash_segments"},
+                "video",
+            )
+            is None
+        )
+
+    def test_merge_command_writes_fragmented_mp4_to_stdout(self):
+        plan = plan_stream(
+            {
+                "requested_formats": [
+                    {
+                        "url": "https://cdn/v",
+                        "protocol": "https",
+                        "http_headers": {"User-Agent": "x"},
+                    },
+                    {"url": "https://cdn/a", "protocol": "https"},
+                ]
+            },
+            "video",
+        )
+        command = ffmpeg_command("ffmpeg", plan, "video")
+        assert command[command.index("-headers") + 1] == "User-Agent: x\r\n"
+        assert command.count("-i") == 2
+        assert command[command.index("-movflags") + 1].startswith(
+            "frag_keyframe+empty_moov"
+        )
+        assert command[-3:] == ["-f", "mp4", "pipe:1"]
+
+
+class TestOpenStream:
+    def test_ffmpeg_output_is_forwarded_in_chunks(self, tmp_path, monkeypatch):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys, time
+            for _ in range(3):
+                sys.stdout.buffer.write(b"x" * 10)
+                sys.stdout.buffer.flush()
+                time.sleep(0.05)
+        """,
+        )
+        monkeypatch.setattr(streaming, "ffmpeg_command", lambda *args: command)
+        stream = open_stream(_ffmpeg_plan(), "ffmpeg", "video")
+        assert stream.first == b"x" * 10
+        assert b"".join(stream) == b"x" * 30
+
+    def test_ffmpeg_without_output_is_unavailable(self, tmp_path, monkeypatch):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys
+            sys.stderr.write("403 Forbidden")
+            sys.exit(1)
+        """,
+        )
+        monkeypatch.setattr(streaming, "ffmpeg_command", lambda *args: command)
+        with pytest.raises(StreamUnavailable, match="403 Forbidden"):
+            open_stream(_ffmpeg_plan(), "ffmpeg", "video")
+
+    def test_failure_after_first_bytes_is_reported(self, tmp_path, monkeypatch):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys
+            sys.stdout.buffer.write(b"partial")
+            sys.stdout.buffer.flush()
+            sys.stderr.write("connection reset")
+            sys.exit(1)
+        """,
+        )
+        monkeypatch.setattr(streaming, "ffmpeg_command", lambda *args: command)
+        errors = []
+        stream = open_stream(
+            _ffmpeg_plan(), "ffmpeg", "video", on_error=lambda *e: errors.append(e)
+        )
+        assert b"".join(stream) == b"partial"
+        assert errors and errors[0][0] == 1 and "connection reset" in errors[0][1]
+
+
+class ProgressiveYoutubeDL(FakeYoutubeDL):
+    """Extraction sans téléchargement : un MP4 progressif local."""
+
+    source = ""
+
+    def extract_info(self, url, download=True):
+        assert not download, "le mode flux ne doit pas télécharger via yt-dlp"
+        return {
+            "title": "Ma vidéo",
+            "url": self.source,
+            "ext": "mp4",
+            "protocol": "https",
+        }
+
+
+def test_download_route_streams_progressive_mp4(client, monkeypatch, tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"\x00" * (3 * streaming.STREAM_CHUNK_SIZE + 5))
+    ProgressiveYoutubeDL.source = source.as_uri()
+    monkeypatch.setattr(routes, "YoutubeDL", ProgressiveYoutubeDL)
+    monkeypatch.setattr(
+        routes, "ydl_pool", YdlPool(lambda opts: routes.YoutubeDL(opts))
+    )
+    monkeypatch.setattr(
+        routes,
+        "artifacts",
+        ArtifactCache(str(tmp_path / "downloads"), 1024 * 1024, 3600),
+    )
+    monkeypatch.setattr(
+        routes.Config, "get_ffmpeg_path", classmethod(lambda cls: "/usr/bin/ffmpeg")
+    )
+
+    resp = client.post("/downloader/download", json={"url": URL, "stream": True})
+    assert resp.status_code == 200
+    assert resp.headers["X-Cache"] == "BYPASS"
+    assert resp.headers["Content-Length"] == str(source.stat().st_size)
+    assert 'filename="Ma_video.mp4"' in resp.headers["Content-Disposition"]
+    assert resp.data == source.read_bytes()
@@ -0,0 +1,75 @@
+"""Tests des réglages de transfert yt-dlp (`downloader/tuning.py`)."""
+
+from __future__ import annotations
+
+from app.services.downloader.tuning import (
+    MIN_SAMPLE_BYTES,
+    TransferTuner,
+    TransferTuning,
+)
+from app.services.downloader.ydl_pool import YdlPool
+
+
+def test_starts_from_platform_defaults_and_config_overrides():
+    assert TransferTuner().choose("vimeo").fragments == 8
+    assert TransferTuner().choose("tiktok").fragments == 1
+    assert TransferTuner().choose(None) == TransferTuning()
+
+    tuner = TransferTuner(fragments=3, http_chunk_size=1 << 20)
+    tuner.record("vimeo", 16, 1e9)
+    tuning = tuner.choose("vimeo")
+    assert (tuning.fragments, tuning.http_chunk_size) == (3, 1 << 20)
+
+
+def test_follows_fastest_level_and_explores_neighbours():
+    tuner = TransferTuner(explore_every=3)
+    tuner.record("youtube", 4, 10e6)
+    tuner.record("youtube", 8, 20e6)
+    assert tuner.choose("youtube").fragments == 8
+    assert tuner.choose("youtube").fragments == 8
+    # Troisième choix : exploration du voisin jamais mesuré (16).
+    assert tuner.choose("youtube").fragments == 16
+    assert tuner.stats()["platforms"]["youtube"]["fragments"] == 8
+
+
+def test_probe_measures_only_fragmented_parts():
+    tuner = TransferTuner()
+    tuning = tuner.choose("dailymotion")
+    probe = tuner.probe("dailymotion", tuning)
+    size = MIN_SAMPLE_BYTES * 2
+    probe({"status": "downloading", "filename": "progressive.mp4"})
+    probe(
+        {
+            "status": "finished",
+            "filename": "progressive.mp4",
+            "total_bytes": size,
+            "elapsed": 1,
+        }
+    )
+    assert tuner.stats()["platforms"] == {}
+
+    probe({"status": "downloading", "filename": "hls.mp4", "fragment_count": 10})
+    probe(
+        {"status": "finished", "filename": "hls.mp4", "total_bytes": size, "elapsed": 2}
+    )
+    assert tuner.stats()["platforms"]["dailymotion"]["samples"] == 1
+
+
+def test_pool_lease_applies_and_restores_params():
+    class Fake:
+        def __init__(self, opts):
+            self.params = {**opts, "outtmpl": {"default": "x"}}
+
+        def add_progress_hook(self, hook):
+            pass
+
+        def add_postprocessor_hook(self, hook):
+            pass
+
+    pool = YdlPool(Fake)
+    opts = {"quiet": True, "buffersize": 1024}
+    with pool.lease(opts, params=TransferTuning(8, None, 65536).as_params()) as ydl:
+        assert ydl.params["concurrent_fragment_downloads"] == 8
+        assert ydl.params["buffersize"] == 65536
+    assert "concurrent_fragment_downloads" not in ydl.params
+    assert ydl.params["buffersize"] == 1024
@@ -0,0 +1,133 @@
+"""Tests du traitement d'images en lot (`/media/batch`)."""
+
+from __future__ import annotations
+
+import io
+import zipfile
+
+from PIL import Image
+
+from app.core.zipstream import stream_zip
+
+
+def _png(color, size=(32, 24)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _post_batch(client, files, **form):
+    return client.post(
+        "/media/batch",
+        data={"files[]": files, **form},
+        content_type="multipart/form-data",
+    )
+
+
+def test_batch_converts_every_file(client):
+    files = [(io.BytesIO(_png((i * 40, 10, 10))), f"img{i}.png") for i in range(5)]
+    resp = _post_batch(client, files, output_format="JPEG")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/zip"
+    assert resp.is_streamed
+    assert "processed_images.zip" in resp.headers["Content-Disposition"]
+
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        names = sorted(zf.namelist())
+        assert names == [f"converted_img{i}.png" for i in range(5)]
+        for name in names:
+            assert zf.read(name)[:3] == b"\xff\xd8\xff"
+
+
+def test_batch_skips_undecodable_file(client):
+    files = [
+        (io.BytesIO(_png((0, 0, 255))), "ok.png"),
+        # Signature PNG valide, contenu tronqué : échoue au décodage.
+        (io.BytesIO(_png((0, 255, 0))[:40]), "broken.png"),
+    ]
+    resp = _post_batch(client, files)
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        assert zf.namelist() == ["converted_ok.png"]
+
+
+def test_batch_pool_is_sized_from_config(monkeypatch):
+    from app.services.media_converter import routes
+    from config import Config
+
+    monkeypatch.setattr(routes, "_batch_executor", None)
+    monkeypatch.setattr(Config, "MEDIA_BATCH_WORKERS", 3)
+    executor = routes._get_batch_executor()
+    try:
+        assert executor._max_workers == 3
+        assert routes._get_batch_executor() is executor
+    finally:
+        executor.shutdown(wait=False)
+
+
+def test_stream_zip_yields_one_chunk_per_entry():
+    entries = [("a.txt", b"alpha" * 100), ("b.bin", bytes(range(256)))]
+    chunks = list(stream_zip(iter(entries)))
+    assert len(chunks) == 3  # deux entrées + répertoire central
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.read("a.txt") == b"alpha" * 100
+        assert zf.read("b.bin") == bytes(range(256))
+
+
+def _jpeg(size) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (90, 140, 30)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_fit_within_uses_jpeg_draft_and_keeps_ratio():
+    from app.services.media_converter.routes import fit_within
+
+    with Image.open(io.BytesIO(_jpeg((4000, 3000)))) as img:
+        fit_within(img, max_width=500)
+        # draft() a réduit le décodage avant le rééchantillonnage final.
+        assert img.decoderconfig and img.decoderconfig[0] > 1
+        assert img.size == (500, 375)
+
+    with Image.open(io.BytesIO(_jpeg((300, 200)))) as img:
+        fit_within(img, max_width=500, max_height=500)
+        assert img.size == (300, 200)  # jamais agrandie
+
+
+def test_batch_and_convert_honour_max_size(client):
+    resp = _post_batch(
+        client,
+        [(io.BytesIO(_jpeg((1600, 1200))), "big.jpg")],
+        output_format="PNG",
+        max_height="300",
+    )
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        with Image.open(io.BytesIO(zf.read("converted_big.jpg"))) as out:
+            assert out.size == (400, 300)
+
+    resp = client.post(
+        "/media/convert",
+        data={
+            "file": (io.BytesIO(_jpeg((1600, 1200))), "big.jpg"),
+            "format": "webp",
+            "max_width": "800",
+        },
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200
+    with Image.open(io.BytesIO(resp.data)) as out:
+        assert out.size == (800, 600)
+
+
+def test_invalid_max_size_is_rejected(client):
+    resp = client.post(
+        "/media/convert",
+        data={
+            "file": (io.BytesIO(_jpeg((64, 64))), "a.jpg"),
+            "format": "png",
+            "max_width": "-5",
+        },
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
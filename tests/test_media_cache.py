@@ -0,0 +1,119 @@
+"""Tests du cache de conversions (`app/core/filecache.py`)."""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+
+from PIL import Image
+
+from app.core.filecache import DiskLRUCache, cache_key
+
+
+def _write(path, size: int) -> str:
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+class TestDiskLRUCache:
+    def test_key_depends_on_params(self):
+        assert cache_key("abc", format="webp", quality=80) == cache_key(
+            "abc", quality=80, format="webp"
+        )
+        assert cache_key("abc", format="webp", quality=80) != cache_key(
+            "abc", format="webp", quality=81
+        )
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=250)
+        for name in ("a", "b"):
+            cache.put(name * 64, _write(tmp_path / name, 100))
+        assert cache.get("a" * 64)  # "a" redevient le plus récent
+        cache.put("c" * 64, _write(tmp_path / "c", 100))
+
+        assert cache.get("b" * 64) is None
+        assert cache.get("a" * 64) and cache.get("c" * 64)
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] == 200
+
+    def test_entries_expire_after_max_age(self, tmp_path):
+        cache = DiskLRUCache(
+            str(tmp_path / "cache"), max_bytes=1000, max_age_seconds=60
+        )
+        cache.put("a" * 64, _write(tmp_path / "a", 10))
+        path = cache.get("a" * 64)
+        assert path
+        os.utime(path, (time.time() - 120, time.time() - 120))
+
+        assert cache.get("a" * 64) is None
+        assert not os.path.exists(path)
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["bytes"] == 0
+
+    def test_source_file_is_left_untouched(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000)
+        src = _write(tmp_path / "out.bin", 10)
+        cache.put("d" * 64, src)
+        (tmp_path / "out.bin").unlink()
+        dest = tmp_path / "copy.bin"
+        assert cache.copy_to("d" * 64, str(dest))
+        assert dest.read_bytes() == b"x" * 10
+
+    def test_index_is_rebuilt_from_disk(self, tmp_path):
+        root = str(tmp_path / "cache")
+        DiskLRUCache(root, max_bytes=1000).put_bytes("e" * 64, b"hello")
+        reloaded = DiskLRUCache(root, max_bytes=1000)
+        assert reloaded.stats()["entries"] == 1
+        assert reloaded.get("e" * 64)
+
+    def test_budget_covers_entries_of_other_workers(self, tmp_path):
+        root = str(tmp_path / "cache")
+        workers = [DiskLRUCache(root, max_bytes=250) for _ in range(3)]
+        for worker, name in zip(workers, "abc"):
+            worker.put(name * 64, _write(tmp_path / name, 100))
+
+        on_disk = sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for dirpath, _dirs, files in os.walk(root)
+            for name in files
+        )
+        assert on_disk == 200
+        assert workers[2].get("a" * 64) is None  # la plus ancienne
+        assert workers[2].get("c" * 64)
+
+    def test_disabled_when_budget_is_zero(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=0)
+        cache.put_bytes("f" * 64, b"data")
+        assert cache.get("f" * 64) is None
+        assert not (tmp_path / "cache").exists()
+
+
+def test_repeat_conversion_is_served_from_cache(client, tmp_path, monkeypatch):
+    from app.services.media_converter import routes
+
+    monkeypatch.setattr(
+        routes, "conversion_cache", DiskLRUCache(str(tmp_path / "cache"), 10_000_000)
+    )
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), (10, 120, 200)).save(buf, format="PNG")
+    png = buf.getvalue()
+
+    def convert():
+        return client.post(
+            "/media/convert",
+            data={
+                "file": (io.BytesIO(png), "same.png"),
+                "format": "webp",
+                "quality": "61",
+            },
+            content_type="multipart/form-data",
+        )
+
+    first = convert()
+    second = convert()
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    stats = client.get("/media/metrics").get_json()["cache"]
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
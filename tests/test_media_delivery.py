@@ -0,0 +1,81 @@
+"""Tests de la livraison par jeton (`app/core/delivery.py`)."""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+from app.core import delivery as delivery_module
+from app.core.delivery import DeliveryStore
+
+
+def _convert_twice(client):
+    buf = io.BytesIO()
+    Image.new("RGB", (80, 60), (5, 90, 160)).save(buf, format="PNG")
+
+    def convert():
+        return client.post(
+            "/media/convert",
+            data={"file": (io.BytesIO(buf.getvalue()), "clip.png"), "format": "webp"},
+            content_type="multipart/form-data",
+        )
+
+    convert()
+    return convert()  # hit de cache : servi via une livraison
+
+
+def test_cached_result_gets_resumable_download_url(client):
+    resp = _convert_twice(client)
+    assert resp.status_code == 200
+    url = resp.headers["X-Download-URL"]
+    assert url.startswith("/media/download/")
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.data == resp.data
+    assert full.headers["Accept-Ranges"] == "bytes"
+    etag = full.headers["ETag"]
+
+    part = client.get(url, headers={"Range": "bytes=0-9"})
+    assert part.status_code == 206
+    assert part.data == full.data[:10]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_unknown_or_tampered_token_is_404(client):
+    assert client.get("/media/download/not-a-token").status_code == 404
+    url = _convert_twice(client).headers["X-Download-URL"]
+    assert client.get(url[:-2] + "xx").status_code == 404
+
+
+def test_accel_redirect_hands_body_to_nginx(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, "DELIVERY_ACCEL_PREFIX", "/_internal/")
+    url = _convert_twice(client).headers["X-Download-URL"]
+    resp = client.get(url)
+    assert resp.headers["X-Accel-Redirect"].startswith("/_internal/deliveries/")
+    assert resp.data == b""
+    assert resp.mimetype == "image/webp"
+
+
+def test_expired_token_and_sweep(app, tmp_path, monkeypatch):
+    store = DeliveryStore(str(tmp_path / "deliveries"), ttl_seconds=60)
+    src = tmp_path / "out.mp4"
+    src.write_bytes(b"\x00" * 32)
+    with app.test_request_context():
+        delivery = store.publish(str(src), "out.mp4")
+        assert not src.exists()  # déplacé, pas copié
+        assert store.resolve(delivery.token).path == delivery.path
+
+        store.ttl_seconds = -1
+        assert store.resolve(delivery.token) is None
+
+    later = time.time() + 3600
+    monkeypatch.setattr(delivery_module, "time", SimpleNamespace(time=lambda: later))
+    store.ttl_seconds = 60
+    assert store.sweep(force=True) == 1
+    assert not os.path.exists(delivery.path)
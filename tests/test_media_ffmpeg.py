@@ -0,0 +1,115 @@
+"""Tests du canal de progression FFmpeg (`media_converter/ffmpeg.py`).
+
+`run_ffmpeg` est exercé avec un petit script Python qui imite la sortie
+`-progress pipe:1` : pas besoin du binaire FFmpeg pour ces tests.
+"""
+
+from __future__ import annotations
+
+import sys
+import textwrap
+
+import pytest
+
+from app.services.media_converter import ffmpeg
+from app.services.media_converter.ffmpeg import (
+    FFmpegError,
+    FFmpegProgress,
+    FFmpegTimeout,
+    ProgressParser,
+    run_ffmpeg,
+)
+
+_BLOCK = (
+    b"frame=120\nfps=48.5\nout_time_us=5000000\nout_time_ms=5000000\n"
+    b"speed=1.94x\nprogress=continue\n"
+)
+
+
+def _fake_ffmpeg(tmp_path, body: str) -> list[str]:
+    script = tmp_path / "fake_ffmpeg.py"
+    script.write_text(textwrap.dedent(body), encoding="utf-8")
+    return [sys.executable, str(script)]
+
+
+class TestProgressParser:
+    def test_parses_block_split_across_chunks(self):
+        parser = ProgressParser()
+        assert parser.feed(_BLOCK[:17]) == []
+        snapshots = parser.feed(_BLOCK[17:])
+        assert len(snapshots) == 1
+        snap = snapshots[0]
+        assert snap.out_time == pytest.approx(5.0)
+        assert snap.speed == pytest.approx(1.94)
+        assert snap.fps == pytest.approx(48.5)
+        assert not snap.done
+
+    def test_end_marker_and_na_values(self):
+        parser = ProgressParser()
+        (snap,) = parser.feed(b"speed=N/A\nout_time_us=N/A\nprogress=end\n")
+        assert snap.done
+        assert snap.speed is None
+        assert snap.percent(10.0) == 100
+
+    def test_percent_needs_duration(self):
+        snap = FFmpegProgress(out_time=5.0)
+        assert snap.percent(None) is None
+        assert snap.percent(20.0) == 25
+
+
+class TestRunFFmpeg:
+    def test_reports_progress_until_end(self, tmp_path):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys, time
+            for us in (1_000_000, 2_000_000):
+                sys.stdout.write(f"out_time_us={us}\\nspeed=2.0x\\nprogress=continue\\n")
+                sys.stdout.flush()
+                time.sleep(0.05)
+            sys.stdout.write("out_time_us=4000000\\nprogress=end\\n")
+        """,
+        )
+        seen: list[FFmpegProgress] = []
+        run_ffmpeg(command, duration=4.0, on_progress=seen.append)
+        assert [s.percent(4.0) for s in seen] == [25, 50, 100]
+
+    def test_nonzero_exit_raises_with_stderr(self, tmp_path):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys
+            sys.stderr.write("Unknown encoder 'libfoo'\\n")
+            sys.exit(1)
+        """,
+        )
+        with pytest.raises(FFmpegError) as excinfo:
+            run_ffmpeg(command)
+        assert "libfoo" in excinfo.value.stderr
+
+    def test_slow_encode_is_aborted_early(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ffmpeg, "SLOW_ENCODE_GRACE_SECONDS", 0.0)
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import sys, time
+            while True:
+                sys.stdout.write("out_time_us=1000000\\nspeed=0.1x\\nprogress=continue\\n")
+                sys.stdout.flush()
+                time.sleep(0.05)
+        """,
+        )
+        with pytest.raises(FFmpegTimeout, match="trop lent"):
+            run_ffmpeg(command, duration=600.0, timeout=60)
+
+    def test_hang_after_stdout_closes_is_a_timeout(self, tmp_path):
+        command = _fake_ffmpeg(
+            tmp_path,
+            """
+            import os, time
+            os.close(1)
+            time.sleep(30)
+        """,
+        )
+        with pytest.raises(FFmpegTimeout, match="trop de temps"):
+            run_ffmpeg(command, timeout=0.5)
@@ -0,0 +1,182 @@
+"""Tests du pipeline de conversion asynchrone (`/media/jobs`)."""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+
+from PIL import Image
+
+from app.services.media_converter.task_manager import TaskManager
+from app.services.media_converter.task_store import MemoryTaskStore
+from tests.conftest import wait_for_job, wait_until
+
+
+def _png_bytes(size=(64, 48)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_submit_image_job_roundtrip(client):
+    resp = client.post(
+        "/media/jobs",
+        data={"file": (io.BytesIO(_png_bytes()), "photo.png"), "format": "webp"},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 202
+    job = resp.get_json()
+    assert resp.headers["Location"] == job["status_url"]
+
+    final = wait_for_job(client, job["status_url"])
+    assert final["status"] == "completed", final
+    assert final["progress"] == 100
+
+    result = client.get(final["result_url"])
+    assert result.status_code == 200
+    assert result.data[:4] == b"RIFF" and result.data[8:12] == b"WEBP"
+    assert "converted_photo.webp" in result.headers["Content-Disposition"]
+
+
+def test_submit_job_rejects_bad_magic(client):
+    resp = client.post(
+        "/media/jobs",
+        data={
+            "file": (io.BytesIO(b"not an image at all" * 4), "photo.png"),
+            "format": "webp",
+        },
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/media/jobs/does-not-exist").status_code == 404
+    assert client.get("/media/jobs/does-not-exist/result").status_code == 404
+
+
+def test_metrics_endpoint_exposes_pool_counters(client):
+    data = client.get("/media/metrics").get_json()
+    jobs = data["jobs"]
+    for key in ("workers", "queue_depth", "running", "submitted", "wait", "run"):
+        assert key in jobs
+
+
+def test_task_manager_counts_queue_depth_and_latency():
+    manager = TaskManager(max_workers=1)
+    release = threading.Event()
+
+    def blocking(task):
+        release.wait(5)
+        return "ok"
+
+    first = manager.create_task(blocking)
+    second = manager.create_task(blocking)
+    time.sleep(0.05)
+    stats = manager.stats()
+    assert stats["running"] == 1
+    assert stats["queue_depth"] == 1
+
+    release.set()
+    manager.executor.shutdown(wait=True)
+    assert manager.get_task(first).status == "completed"
+    assert manager.get_task(second).result == "ok"
+    stats = manager.stats()
+    assert stats["completed"] == 2
+    assert stats["queue_depth"] == 0
+    assert stats["wait"]["count"] == 2
+
+
+def test_finished_tasks_expire_with_their_files(tmp_path):
+    manager = TaskManager(max_workers=1, ttl_seconds=0.1)
+    output = tmp_path / "out.bin"
+    output.write_bytes(b"x")
+
+    task_id = manager.create_task(lambda task: str(output), artifacts=[str(output)])
+    wait_until(lambda: manager.stats()["completed"] == 1)
+    assert manager.get_task(task_id).status == "completed"
+
+    wait_until(lambda: manager.get_task(task_id) is None)
+    assert not output.exists()
+    assert manager.stats()["expired"] == 1
+
+
+def test_burst_of_tasks_keeps_thread_count_flat():
+    # Un `threading.Timer` par tâche terminée faisait grimper le nombre de
+    # threads avec le débit ; un seul thread d'expiration doit suffire.
+    workers, total, retained = 4, 2000, 100
+    baseline = threading.active_count()
+    manager = TaskManager(
+        max_workers=workers, ttl_seconds=3600, max_retained=retained, max_queued=total
+    )
+
+    for _ in range(total):
+        manager.create_task(lambda task: "ok")
+    wait_until(lambda: manager.stats()["completed"] == total, timeout=30)
+
+    assert threading.active_count() <= baseline + workers + 1
+    stats = manager.stats()
+    assert stats["retained"] == len(manager.tasks) == retained
+    assert stats["evicted"] == total - retained
+    manager.executor.shutdown(wait=True)
+
+
+def test_task_state_is_visible_from_another_worker():
+    # Deux `TaskManager` sur le même store : deux workers gunicorn.
+    store = MemoryTaskStore()
+    owner, other = TaskManager(max_workers=1, store=store), TaskManager(
+        max_workers=1, store=store
+    )
+    step = threading.Event()
+
+    def job(task):
+        task.meta["download_name"] = "out.jpg"
+        task.update_progress(40, "Encodage", speed=1.5)
+        step.wait(5)
+        return "/tmp/out.jpg"
+
+    task_id = owner.create_task(job)
+    updates = other.follow(task_id, timeout=5)
+    seen = next(updates)
+    while seen.progress < 40:
+        seen = next(updates)
+    assert (seen.status, seen.message, seen.details["speed"]) == (
+        "running",
+        "Encodage",
+        1.5,
+    )
+    assert seen is not owner.get_task(task_id)
+
+    step.set()
+    final = next(state for state in updates if state.status == "completed")
+    assert final.result == "/tmp/out.jpg"
+    assert final.meta["download_name"] == "out.jpg"
+    assert other.get_task(task_id).status == "completed"
+    assert other.get_task("inconnu") is None
+
+    owner._expire(task_id)
+    assert other.get_task(task_id) is None
+
+
+def test_job_events_stream_ends_with_done(client):
+    resp = client.post(
+        "/media/jobs",
+        data={"file": (io.BytesIO(_png_bytes()), "photo.png"), "format": "jpeg"},
+        content_type="multipart/form-data",
+    )
+    job = resp.get_json()
+
+    events = client.get(f"{job['status_url']}/events")
+    assert events.status_code == 200
+    assert events.mimetype == "text/event-stream"
+    body = events.get_data(as_text=True)
+    assert "event: done" in body
+    assert '"status": "completed"' in body
+
+
+def test_ui_polls_jobs_unless_sse_is_enabled(client, app, monkeypatch):
+    assert 'data-job-events="0"' in client.get("/media/").get_data(as_text=True)
+
+    monkeypatch.setitem(app.config, "JOB_EVENTS_SSE", True)
+    assert 'data-job-events="1"' in client.get("/media/").get_data(as_text=True)
@@ -0,0 +1,55 @@
+"""Tests des profils d'encodage vidéo (`media_converter/profiles.py`)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.services.media_converter import routes
+from app.services.media_converter.profiles import (
+    PROFILES,
+    encoder_speed_args,
+    resolve_profile,
+)
+from config import Config
+
+
+def test_vp9_threads_and_tiles_follow_cpu_budget():
+    args = encoder_speed_args("libvpx-vp9", PROFILES["fast"], threads=4)
+    assert args[args.index("-threads") + 1] == "4"
+    assert args[args.index("-tile-columns") + 1] == "2"
+    assert args[args.index("-row-mt") + 1] == "1"
+    assert args[args.index("-deadline") + 1] == "realtime"
+
+    single = encoder_speed_args("libvpx-vp9", PROFILES["small"], threads=1)
+    assert single[single.index("-tile-columns") + 1] == "0"
+
+
+def test_default_profile_comes_from_config(monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_ENCODER_PROFILE", "small")
+    assert resolve_profile().name == "small"
+    assert resolve_profile("FAST").name == "fast"
+    monkeypatch.setattr(Config, "MEDIA_ENCODER_PROFILE", "bogus")
+    assert resolve_profile().name == "balanced"
+    with pytest.raises(KeyError):
+        resolve_profile("ultra")
+
+
+def test_process_video_uses_profile_settings(app, tmp_path, monkeypatch):
+    seen = {}
+
+    def fake_run(command, **_kwargs):
+        seen["command"] = command
+        open(command[-1], "wb").close()
+
+    monkeypatch.setattr(routes, "run_ffmpeg", fake_run)
+    monkeypatch.setattr(routes, "probe_media", lambda *_a: None)
+    monkeypatch.setattr(routes, "encoder_threads", lambda: 2)
+    monkeypatch.setitem(app.config, "FFMPEG_PATH", __file__)  # existence seule
+
+    with app.app_context():
+        routes.process_video(
+            str(tmp_path / "in.mkv"), str(tmp_path / "out.mp4"), profile="fast"
+        )
+    command = seen["command"]
+    assert command[command.index("-preset") + 1] == "veryfast"
+    assert command[command.index("-threads") + 1] == "2"
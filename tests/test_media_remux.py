@@ -0,0 +1,135 @@
+"""Tests du remux sans ré-encodage (`media_converter/remux.py`)."""
+
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from app.services.media_converter import routes
+from app.services.media_converter.ffmpeg import (
+    MediaInfo,
+    StreamInfo,
+    parse_probe_output,
+)
+from app.services.media_converter.remux import plan_streams
+
+MKV_BYTES = b"\x1a\x45\xdf\xa3" + bytes(60)  # en-tête EBML
+
+
+def _info(*codecs: tuple[str, str]) -> MediaInfo:
+    return MediaInfo(
+        12.0, tuple(StreamInfo(i, kind, name) for i, (kind, name) in enumerate(codecs))
+    )
+
+
+def test_parse_probe_output_skips_cover_art():
+    raw = json.dumps(
+        {
+            "format": {"duration": "42.5"},
+            "streams": [
+                {
+                    "index": 0,
+                    "codec_type": "video",
+                    "codec_name": "mjpeg",
+                    "disposition": {"attached_pic": 1},
+                },
+                {
+                    "index": 1,
+                    "codec_type": "video",
+                    "codec_name": "h264",
+                    "disposition": {"attached_pic": 0},
+                },
+                {"index": 2, "codec_type": "audio", "codec_name": "aac"},
+            ],
+        }
+    )
+    info = parse_probe_output(raw)
+    assert info.duration == pytest.approx(42.5)
+    assert info.first("video").codec_name == "h264"
+    assert info.first("audio").index == 2
+
+
+@pytest.mark.parametrize(
+    "container, codecs, expected",
+    [
+        ("mp4", [("video", "h264"), ("audio", "aac")], "remux"),
+        ("mp4", [("video", "h264"), ("audio", "opus")], "partial"),
+        ("webm", [("video", "vp9"), ("audio", "aac")], "partial"),
+        ("mp4", [("video", "vp9"), ("audio", "opus")], None),
+        ("avi", [("video", "h264"), ("audio", "aac")], None),
+        ("mp4", [("video", "h264")], "remux"),
+    ],
+)
+def test_plan_streams(container, codecs, expected):
+    plan = plan_streams(_info(*codecs), container)
+    assert (plan.mode if plan else None) == expected
+
+
+def _run_process_video(app, tmp_path, monkeypatch, info, output_name):
+    seen = {}
+
+    def fake_run(command, **_kwargs):
+        seen["command"] = command
+        open(command[-1], "wb").close()
+
+    monkeypatch.setattr(routes, "run_ffmpeg", fake_run)
+    monkeypatch.setattr(routes, "probe_media", lambda *_a: info)
+    monkeypatch.setitem(app.config, "FFMPEG_PATH", __file__)
+    with app.app_context():
+        routes.process_video(str(tmp_path / "in.mkv"), str(tmp_path / output_name))
+    return seen["command"]
+
+
+def test_compatible_mkv_is_remuxed_to_mp4(app, tmp_path, monkeypatch):
+    info = _info(("video", "h264"), ("audio", "aac"), ("subtitle", "ass"))
+    command = _run_process_video(app, tmp_path, monkeypatch, info, "out.mp4")
+    assert "libx264" not in command
+    assert command[command.index("-c:v") + 1] == "copy"
+    assert command[command.index("-c:a") + 1] == "copy"
+    assert command.count("-map") == 2  # sous-titres ASS écartés
+    assert "+faststart" in command
+
+
+def test_only_incompatible_stream_is_transcoded(app, tmp_path, monkeypatch):
+    info = _info(("video", "vp9"), ("audio", "aac"))
+    command = _run_process_video(app, tmp_path, monkeypatch, info, "out.webm")
+    assert command[command.index("-c:v") + 1] == "copy"
+    assert command[command.index("-c:a") + 1] == "libopus"
+
+
+def test_same_container_is_always_reencoded(app, tmp_path, monkeypatch):
+    info = _info(("video", "h264"), ("audio", "aac"))
+    command = _run_process_video(app, tmp_path, monkeypatch, info, "out.mkv")
+    assert "copy" not in command
+
+
+@pytest.mark.parametrize(
+    "fields, video_codec",
+    [({}, "copy"), ({"quality": "40"}, "libx264"), ({"profile": "small"}, "libx264")],
+)
+def test_requested_quality_or_profile_disables_remux(
+    client, monkeypatch, fields, video_codec
+):
+    seen = {}
+
+    def fake_run(command, **_kwargs):
+        seen["command"] = command
+        with open(command[-1], "wb") as fh:
+            fh.write(b"converted")
+
+    monkeypatch.setattr(routes, "run_ffmpeg", fake_run)
+    monkeypatch.setattr(
+        routes, "probe_media", lambda *_a: _info(("video", "h264"), ("audio", "aac"))
+    )
+    monkeypatch.setitem(client.application.config, "FFMPEG_PATH", __file__)
+
+    resp = client.post(
+        "/media/convert",
+        data={"file": (io.BytesIO(MKV_BYTES), "clip.mkv"), "format": "mp4", **fields},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200
+    command = seen["command"]
+    assert command[command.index("-c:v") + 1] == video_codec
@@ -0,0 +1,99 @@
+"""Tests de l'ordonnanceur des tâches (`media_converter/scheduler.py`)."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.media_converter import task_manager as task_manager_module
+from app.services.media_converter.scheduler import (
+    PRIORITY_FAST,
+    PRIORITY_SLOW,
+    UNKNOWN_COST_SECONDS,
+    FairScheduler,
+    QueueFull,
+    estimate_cost,
+    priority_for,
+)
+
+
+def _drain(scheduler: FairScheduler) -> list:
+    order = []
+    while (payload := scheduler.pop()) is not None:
+        order.append(payload)
+    return order
+
+
+def test_clients_are_served_in_turn():
+    scheduler = FairScheduler(workers=1, max_queued=20)
+    for index in range(4):
+        scheduler.push(f"a{index}", f"a{index}", client="a", cost=30)
+    scheduler.push("b0", "b0", client="b", cost=30)
+    scheduler.push("b1", "b1", client="b", cost=30)
+
+    assert _drain(scheduler) == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_short_tasks_go_first():
+    scheduler = FairScheduler(workers=1, max_queued=20)
+    scheduler.push(
+        "encode",
+        "encode",
+        client="a",
+        cost=estimate_cost("video", size=500 * 1024 * 1024),
+    )
+    scheduler.push(
+        "image", "image", client="a", cost=estimate_cost("image", size=2 * 1024 * 1024)
+    )
+
+    assert _drain(scheduler) == ["image", "encode"]
+
+
+def test_removed_task_is_skipped():
+    scheduler = FairScheduler(workers=1, max_queued=20)
+    scheduler.push("a", "a")
+    scheduler.push("b", "b")
+    assert scheduler.remove("a") == "a"
+    assert scheduler.remove("a") is None
+    assert _drain(scheduler) == ["b"]
+    assert len(scheduler) == 0
+
+
+def test_full_queue_reports_retry_after():
+    scheduler = FairScheduler(workers=2, max_queued=3, max_queued_per_client=2)
+    scheduler.push("a0", "a0", client="a", cost=100)
+    scheduler.push("a1", "a1", client="a", cost=100)
+    with pytest.raises(QueueFull) as per_client:
+        scheduler.push("a2", "a2", client="a", cost=100)
+    assert per_client.value.retry_after == 100
+
+    scheduler.push("b0", "b0", client="b", cost=100)
+    with pytest.raises(QueueFull):
+        scheduler.push("c0", "c0", client="c", cost=100)
+    assert scheduler.stats()["clients"] == 2
+
+
+def test_cost_estimate_prefers_duration():
+    assert estimate_cost("download", duration=600) == pytest.approx(61.0)
+    assert estimate_cost("download") == UNKNOWN_COST_SECONDS
+    assert priority_for(estimate_cost("image", size=1024)) == PRIORITY_FAST
+    assert priority_for(estimate_cost("video", size=200 * 1024 * 1024)) == PRIORITY_SLOW
+
+
+def test_submit_job_returns_503_when_queue_is_full(client, monkeypatch):
+    scheduler = FairScheduler(workers=1, max_queued=1)
+    scheduler.push("occupant", None)
+    monkeypatch.setattr(task_manager_module.task_manager, "_scheduler", scheduler)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(buf, format="PNG")
+    resp = client.post(
+        "/media/jobs",
+        data={"file": (io.BytesIO(buf.getvalue()), "photo.png"), "format": "webp"},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert "error" in resp.get_json()
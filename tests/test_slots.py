@@ -0,0 +1,68 @@
+"""Tests du sémaphore inter-workers (`app/core/slots.py`)."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.core import slots as slots_module
+from app.core.cancellation import Cancelled, CancelToken
+from app.core.slots import ProcessSlots
+from tests.conftest import wait_until
+
+pytestmark = pytest.mark.skipif(slots_module.fcntl is None, reason="fcntl")
+
+
+def _enter(slots, entered):
+    with slots.acquire():
+        entered.set()
+
+
+def test_second_holder_waits_for_a_free_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(slots_module, "SLOT_POLL_SECONDS", 0.01)
+    # Deux instances sur le même dossier : deux workers gunicorn.
+    first, second = (ProcessSlots(str(tmp_path), 1) for _ in range(2))
+    release = threading.Event()
+    acquired = threading.Event()
+
+    def hold():
+        with first.acquire():
+            acquired.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait(5)
+
+    entered = threading.Event()
+    waiter = threading.Thread(target=lambda: _enter(second, entered))
+    waiter.start()
+    wait_until(lambda: second.stats()["waiting"] == 1)
+    assert not entered.is_set()
+
+    release.set()
+    holder.join(5)
+    wait_until(entered.is_set)
+    waiter.join(5)
+    assert second.stats() == {"slots": 1, "acquired": 1, "waited": 1, "waiting": 0}
+
+
+def test_waiting_for_a_slot_honours_cancellation(tmp_path, monkeypatch):
+    monkeypatch.setattr(slots_module, "SLOT_POLL_SECONDS", 0.01)
+    slots = ProcessSlots(str(tmp_path), 1)
+    token = CancelToken()
+    with slots.acquire():
+        token.cancel()
+        with pytest.raises(Cancelled):
+            with slots.acquire(token):
+                pass
+    with slots.acquire(token):  # slot rendu à la sortie du bloc
+        pass
+
+
+def test_zero_slots_means_no_limit(tmp_path):
+    slots = ProcessSlots(str(tmp_path / "slots"), 0)
+    with slots.acquire(), slots.acquire():
+        pass
+    assert not (tmp_path / "slots").exists()
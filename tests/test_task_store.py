@@ -0,0 +1,271 @@
+"""Tests de `RedisTaskStore` (`media_converter/task_store.py`).
+
+Le client Redis est remplacé par un faux en mémoire qui implémente le
+sous-ensemble de redis-py utilisé : hashes, TTL, transactions et pub/sub.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+import pytest
+
+from app.services.media_converter.task_manager import TaskManager
+from app.services.media_converter.task_store import (
+    MemoryTaskStore,
+    RedisTaskStore,
+    TaskStore,
+    make_task_store,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.now = 0.0  # horloge des TTL, avancée à la main
+        self.changed = threading.Condition()
+        self.hashes = {}
+        self.expires = {}
+        self.channels = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= self.now:
+            self.hashes.pop(key, None)
+            self.expires.pop(key, None)
+        return self.hashes.get(key)
+
+    def hgetall(self, key):
+        self._check()
+        with self.changed:
+            return dict(self._live(key) or {})
+
+    def delete(self, key):
+        self._check()
+        with self.changed:
+            self.hashes.pop(key, None)
+            self.expires.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self._check()
+        return FakePubSub(self)
+
+    def register_script(self, script):
+        # Seul script du store : `_UPDATE_IF_EXISTS`, rejoué ici en Python.
+        def run(keys, args):
+            self._check()
+            key, (ttl, message, *pairs) = keys[0], args
+            with self.changed:
+                if self._live(key) is None:
+                    return 0
+                self._hset(key, dict(zip(pairs[::2], pairs[1::2])))
+                self._hincrby(key, "version", 1)
+                self._expire(key, int(ttl))
+                self._publish(key, message)
+                return 1
+
+        return run
+
+    # Commandes appliquées par `FakePipeline.execute`, verrou tenu.
+    def _hset(self, key, mapping):
+        fields = self._live(key)
+        if fields is None:
+            fields = self.hashes[key] = {}
+        fields.update(
+            {name.encode(): str(value).encode() for name, value in mapping.items()}
+        )
+
+    def _hincrby(self, key, name, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[name.encode()] = str(
+            int(fields.get(name.encode(), b"0")) + amount
+        ).encode()
+
+    def _expire(self, key, ttl):
+        self.expires[key] = self.now + ttl
+
+    def _publish(self, channel, message):
+        for pubsub in self.channels.get(channel, ()):
+            pubsub.messages.append(
+                {"type": "message", "channel": channel, "data": message}
+            )
+        self.changed.notify_all()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, f"_{name}")
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+
+    def execute(self):
+        self.redis._check()
+        with self.redis.changed:
+            for method, args, kwargs in self.commands:
+                method(*args, **kwargs)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = deque()
+        self.closed = False
+
+    def subscribe(self, channel):
+        with self.redis.changed:
+            self.redis.channels.setdefault(channel, []).append(self)
+
+    def get_message(self, timeout=0.0):
+        with self.redis.changed:
+            self.redis.changed.wait_for(lambda: self.messages, timeout=timeout)
+            return self.messages.popleft() if self.messages else None
+
+    def close(self):
+        self.closed = True
+        with self.redis.changed:
+            for subscribers in self.redis.channels.values():
+                if self in subscribers:
+                    subscribers.remove(self)
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def store(redis):
+    return RedisTaskStore(redis, prefix="test:")
+
+
+def test_task_store_is_abstract():
+    with pytest.raises(TypeError):
+        TaskStore()
+
+
+def test_save_merges_fields_and_bumps_version(store):
+    store.save(
+        "t1", {"status": "running", "progress": 10, "details": {"speed": 1.5}}, ttl=60
+    )
+    store.save("t1", {"progress": 40}, ttl=60)
+
+    state = store.load("t1")
+    assert state == {
+        "status": "running",
+        "progress": 40,
+        "details": {"speed": 1.5},
+        "version": 2,
+    }
+    assert store.load("inconnu") is None
+
+    store.delete("t1")
+    assert store.load("t1") is None
+
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_update_never_recreates_a_missing_task(store, backend):
+    if backend == "memory":
+        store = MemoryTaskStore()
+    assert not store.update("t1", {"cancel_requested": True}, ttl=60)
+    assert store.load("t1") is None
+
+    store.save("t1", {"id": "t1", "status": "running"}, ttl=60)
+    assert store.update("t1", {"cancel_requested": True}, ttl=60)
+    state = store.load("t1")
+    assert (state["status"], state["cancel_requested"], state["version"]) == (
+        "running",
+        True,
+        2,
+    )
+
+
+def test_partial_state_is_an_unknown_task(store):
+    # Écrit par une version précédente de `cancel_task` après expiration.
+    store.save("t1", {"cancel_requested": True}, ttl=60)
+    manager = TaskManager(max_workers=1, store=store)
+    assert manager.get_task("t1") is None
+    assert not manager.cancel_task("t1")
+
+
+def test_each_save_refreshes_the_ttl(store, redis):
+    store.save("t1", {"status": "running"}, ttl=60)
+    redis.now = 50
+    store.save("t1", {"progress": 90}, ttl=60)
+    redis.now = 100
+    assert store.load("t1")["progress"] == 90
+
+    redis.now = 111
+    assert store.load("t1") is None
+
+
+def test_follow_yields_each_new_version_until_timeout(store, redis):
+    store.save("t1", {"status": "running", "progress": 0}, ttl=60)
+    updates = store.follow("t1", timeout=0.5)
+    assert next(updates)["version"] == 1
+
+    store.save("t1", {"progress": 50}, ttl=60)
+    assert next(updates)["progress"] == 50
+
+    # Deux publications avant la lecture : une seule nouvelle version.
+    store.save("t1", {"progress": 80}, ttl=60)
+    store.save("t1", {"status": "completed", "progress": 100}, ttl=60)
+    last = next(updates)
+    assert (last["status"], last["version"]) == ("completed", 4)
+
+    assert list(updates) == []
+    assert redis.channels["test:t1"] == []  # désabonné
+
+
+def test_manager_follows_a_task_of_another_worker(redis):
+    store = RedisTaskStore(redis, prefix="test:")
+    owner, other = TaskManager(max_workers=1, store=store), TaskManager(
+        max_workers=1, store=store
+    )
+    release = threading.Event()
+
+    def job(task):
+        task.update_progress(30, "Encodage")
+        release.wait(5)
+        return "/tmp/out.mp4"
+
+    task_id = owner.create_task(job)
+    updates = other.follow(task_id, timeout=5)
+    seen = next(updates)
+    while seen.progress < 30:
+        seen = next(updates)
+    assert (seen.status, seen.message) == ("running", "Encodage")
+
+    release.set()
+    final = next(state for state in updates if state.status == "completed")
+    assert final.result == "/tmp/out.mp4"
+
+
+def test_redis_errors_fall_back_for_a_while(store, redis):
+    redis.down = True
+    store.save("t1", {"status": "running"}, ttl=60)
+    assert store.load("t1") is None
+    assert list(store.follow("t1", timeout=0.1)) == []
+
+    # Pendant `REDIS_RETRY_SECONDS`, plus aucun appel à Redis.
+    redis.down = False
+    store.save("t1", {"status": "running"}, ttl=60)
+    assert "test:t1" not in redis.hashes
+
+    store._down_until = 0.0  # délai écoulé
+    store.save("t1", {"status": "running"}, ttl=60)
+    assert store.load("t1")["status"] == "running"
+
+
+def test_make_task_store_without_redis_is_local():
+    assert isinstance(make_task_store("memory://", "media"), MemoryTaskStore)
+    assert isinstance(make_task_store(None, "media"), MemoryTaskStore)
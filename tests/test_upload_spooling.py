@@ -0,0 +1,84 @@
+"""Tests de l'écriture directe des uploads sur disque (`DiskUpload`)."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+from app.core.uploads import DiskUpload
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40
+
+
+def _part_files(directory) -> list[str]:
+    return [name for name in os.listdir(directory) if name.endswith(".part")]
+
+
+class TestDiskUpload:
+    def test_hashes_while_writing_and_claims_by_rename(self, tmp_path):
+        upload = DiskUpload(str(tmp_path), "a.png", {"png"})
+        for chunk in (PNG_HEAD[:5], PNG_HEAD[5:], b"rest" * 100):
+            upload.write(chunk)
+        upload.seek(0)
+        assert upload.read(8) == PNG_HEAD[:8]
+
+        dest = tmp_path / "final.png"
+        digest = upload.claim(str(dest))
+        expected = PNG_HEAD + b"rest" * 100
+        assert digest == hashlib.sha256(expected).hexdigest()
+        assert dest.read_bytes() == expected
+        upload.close()
+        assert dest.exists() and not _part_files(tmp_path)
+
+    def test_bad_magic_aborts_on_first_chunk(self, tmp_path):
+        upload = DiskUpload(str(tmp_path), "a.png", {"png"})
+        with pytest.raises(BadRequest):
+            upload.write(b"GIF89a" + b"\x00" * 64)
+        assert not _part_files(tmp_path)
+
+    def test_size_limit_aborts_mid_stream(self, tmp_path):
+        upload = DiskUpload(str(tmp_path), "a.png", {"png"}, max_bytes=100)
+        upload.write(PNG_HEAD)
+        with pytest.raises(RequestEntityTooLarge):
+            upload.write(b"x" * 100)
+        assert not _part_files(tmp_path)
+
+    def test_extension_checked_before_any_write(self, tmp_path):
+        with pytest.raises(BadRequest):
+            DiskUpload(str(tmp_path), "a.exe", {"png"})
+
+
+def test_convert_rejects_bad_magic_without_leftovers(client, app):
+    temp = app.config["TEMP_FOLDER"]
+    before = set(_part_files(temp))
+    resp = client.post(
+        "/media/convert",
+        data={
+            "file": (io.BytesIO(b"definitely not a png" * 10), "x.png"),
+            "format": "jpeg",
+        },
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+    assert "magic" in resp.get_json()["error"]
+    assert set(_part_files(temp)) == before
+
+
+def test_convert_reads_spooled_upload(client, app):
+    buf = io.BytesIO()
+    Image.new("RGB", (20, 20), (1, 2, 3)).save(buf, format="PNG")
+    temp = app.config["TEMP_FOLDER"]
+    before = set(_part_files(temp))
+    resp = client.post(
+        "/media/convert",
+        data={"file": (io.BytesIO(buf.getvalue()), "x.png"), "format": "jpeg"},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200
+    assert resp.data[:3] == b"\xff\xd8\xff"
+    assert set(_part_files(temp)) == before